@@ -0,0 +1,136 @@
+"""Benchmark fixed vs adaptive (AIMD) concurrency against a throttling provider.
+
+A batch of calls is submitted at once (like batch mode or a job queue with
+many workers) to a fake chat model whose provider serves at most
+``--capacity`` concurrent requests: beyond that it answers 429 right away,
+and latency grows with its load. Clients retry 429s with linear backoff.
+Each strategy gates the calls through AdaptiveConcurrencyLimiter, as
+create_llm does:
+
+- fixed-low:  limit pinned well below capacity (underuses the provider)
+- fixed-high: limit pinned at the batch width (rate-limit storm)
+- adaptive:   AIMD from a low start
+
+Usage:
+    python benchmarks/adaptive_concurrency.py [--calls 200] [--capacity 16] [--latency 0.1]
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.agents.concurrency import AdaptiveConcurrencyLimiter
+
+
+class ThrottlingProvider:
+    """Serves ``capacity`` concurrent requests; more get an immediate 429."""
+
+    def __init__(self, capacity: int, latency: float, load_penalty: float = 0.02):
+        self.capacity = capacity
+        self.latency = latency
+        self.load_penalty = load_penalty
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def serve(self) -> str:
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.throttled += 1
+                throttled = True
+            else:
+                self.in_flight += 1
+                load = self.in_flight
+                throttled = False
+
+        if throttled:
+            time.sleep(0.005)
+            raise RuntimeError("Error code: 429 - Rate limit reached. Please try again in 0.2s.")
+
+        try:
+            # Latency grows with load, like a shared inference backend
+            time.sleep(self.latency * (1 + self.load_penalty * load))
+            return "ok"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class ThrottlingChatModel(BaseChatModel):
+    """Chat model backed by a ThrottlingProvider."""
+
+    provider: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "throttling-fake"
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.provider.serve()))])
+
+
+def run_batch(limiter: AdaptiveConcurrencyLimiter, args) -> dict:
+    provider = ThrottlingProvider(args.capacity, args.latency)
+    model = ThrottlingChatModel(provider=provider, rate_limiter=limiter, callbacks=[limiter.release_handler])
+    limits = []
+
+    def job():
+        for attempt in range(1, 50):
+            try:
+                return model.invoke("hello")
+            except RuntimeError:
+                time.sleep(0.05 * attempt)
+            finally:
+                limits.append(limiter.limit)
+        raise RuntimeError("gave up")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(lambda _: job(), range(args.calls)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "throughput": args.calls / elapsed,
+        "throttled": provider.throttled,
+        "mean_limit": statistics.mean(limits),
+        "final_limit": int(limiter.limit),
+        "latency": limiter.latency or 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=64, help="Callers submitting at once")
+    parser.add_argument("--capacity", type=int, default=16, help="Concurrent requests before 429s")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per call when idle")
+    args = parser.parse_args()
+
+    strategies = {
+        "fixed-low": AdaptiveConcurrencyLimiter("fake", initial=2, min_limit=2, max_limit=2),
+        "fixed-high": AdaptiveConcurrencyLimiter("fake", initial=args.workers, min_limit=args.workers,
+                                                 max_limit=args.workers),
+        "adaptive": AdaptiveConcurrencyLimiter("fake", initial=2, max_limit=args.workers),
+    }
+
+    print(f"\n📊 {args.calls} calls from {args.workers} callers, provider capacity {args.capacity}, "
+          f"{args.latency * 1000:.0f} ms idle latency")
+    for name, limiter in strategies.items():
+        result = run_batch(limiter, args)
+        print(f"   {name:<10} {result['seconds']:6.2f} s  {result['throughput']:6.1f} calls/s  "
+              f"{result['throttled']:5d} 429s  limit mean {result['mean_limit']:5.1f} "
+              f"final {result['final_limit']:3d}  latency {result['latency'] * 1000:4.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Replay a recorded session from an LLM cassette through the workflow.
+
+Record a real session first by running the app or API with
+LLM_CASSETTE_RECORD=true (every LLM call and workflow run is stored in
+LLM_CASSETTE_PATH), or record a synthetic one offline with
+``--record-fake N``. Each recorded run is then replayed end to end through
+DecisionWorkflowRunner with LLM_PROVIDER=replay, once per latency scale:
+
+- 1.0: the recorded provider latencies, for comparing workflow changes
+  against the original session without network variance
+- 0.0: no LLM latency, so only the workflow's own overhead remains
+
+Replays must make the same calls as the recording; misses mean a prompt
+changed since it was recorded.
+
+Usage:
+    python benchmarks/cassette_replay.py [--cassette data/cassette.db] [--scales 1.0 0.0]
+    python benchmarks/cassette_replay.py --cassette /tmp/session.db --record-fake 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Replays must plan every run from scratch and never shrink stages for a
+# deadline, or the calls would differ from the recording. Checkpoints go
+# to a scratch database and replayed calls are not usage.
+os.environ["PLANNER_CACHE_SIZE"] = "0"
+os.environ["TIMEOUT_SECONDS"] = "0"
+os.environ["USAGE_LEDGER"] = "false"
+os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+os.environ.setdefault("LLM_PROVIDER", "replay")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from src.agents.cassette import get_cassette
+from src.schemas import DecisionInput
+from src.workflow import DecisionWorkflowRunner
+
+DECISIONS = [
+    "Should I switch careers from software engineering to AI research?",
+    "Should I buy a house now or keep renting for two more years?",
+    "Should I move to another city for a higher-paying job?",
+    "Should I go back to school for a master's degree?",
+]
+
+
+def record_fake(count: int):
+    """Record ``count`` analyses against the fake provider."""
+    settings.LLM_PROVIDER = "fake"
+    settings.LLM_CASSETTE_RECORD = True
+    try:
+        for i in range(count):
+            runner = DecisionWorkflowRunner(model_name="fake", quick=i % 2 == 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = runner.run(DecisionInput(decision=DECISIONS[i % len(DECISIONS)]))
+            if state.error:
+                raise RuntimeError(state.error)
+    finally:
+        settings.LLM_PROVIDER = "replay"
+        settings.LLM_CASSETTE_RECORD = False
+
+
+def replay(runs: list, scale: float) -> dict:
+    """Replay every recorded run at one latency scale."""
+    settings.LLM_CASSETTE_LATENCY_SCALE = scale
+    cassette = get_cassette()
+    cassette.rewind()
+    hits, misses = cassette.hits, cassette.misses
+    errors = 0
+
+    start = time.perf_counter()
+    for inputs in runs:
+        runner = DecisionWorkflowRunner(
+            model_name=inputs["model_name"],
+            temperature=inputs["temperature"],
+            pipeline_research=inputs["pipeline_research"],
+            scoring_mode=inputs["scoring_mode"],
+            quick=inputs["quick"]
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = runner.run(
+                DecisionInput(**inputs["decision_input"]), prior_analysis=inputs["prior_analysis"]
+            )
+        errors += bool(state.error)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "hits": cassette.hits - hits,
+        "misses": cassette.misses - misses,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cassette", default=settings.LLM_CASSETTE_PATH)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.0],
+                        help="Multipliers on the recorded latencies")
+    parser.add_argument("--record-fake", type=int, default=0, metavar="N",
+                        help="First record N analyses against the fake provider")
+    args = parser.parse_args()
+
+    settings.LLM_CASSETTE_PATH = args.cassette
+    settings.LLM_PROVIDER = "replay"
+    if args.record_fake:
+        record_fake(args.record_fake)
+
+    cassette = get_cassette()
+    runs = cassette.runs()
+    if not runs:
+        sys.exit(f"No recorded runs in {args.cassette}; record with LLM_CASSETTE_RECORD=true")
+
+    stats = cassette.stats()
+    print(f"\n📼 {args.cassette}: {stats['runs']} runs, {stats['interactions']} recorded LLM calls, "
+          f"{os.path.getsize(args.cassette) / 1024:.0f} KiB")
+    for scale in args.scales:
+        result = replay(runs, scale)
+        print(f"   latency x{scale:<4g} {result['seconds']:7.2f} s  {result['hits']:4d} hits  "
+              f"{result['misses']:3d} misses  {result['errors']} failed runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark sync vs async history access under concurrent API-style load.
+
+Simulates FastAPI handlers that each fetch a decision, a history page and
+the analytics summary, and runs many of them concurrently on one event loop:
+
+- sync:  HistoryManager called directly from coroutines (blocks the loop)
+- async: AsyncHistoryManager awaited (SQLAlchemy asyncio + aiosqlite)
+
+Besides wall time it reports event-loop lag, measured by a heartbeat task
+that should wake every 5 ms; large lag means other requests were stalled.
+
+Usage:
+    python benchmarks/db_concurrency.py [--decisions 300] [--concurrency 50] [--rounds 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Use a throwaway database before anything imports the settings
+_tmpdir = tempfile.mkdtemp(prefix="futureself-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.auth.database import init_db, get_session, User
+from src.history import HistoryManager, AsyncHistoryManager
+from tests.test_backend import create_mock_state
+
+
+HEARTBEAT_SECONDS = 0.005
+
+
+def seed(decisions: int) -> tuple[int, list[int]]:
+    """Create a user with the requested number of saved decisions."""
+    init_db()
+    session = get_session()
+    try:
+        user = User(username="bench", email="bench@example.com", password_hash="x")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+    finally:
+        session.close()
+
+    state = create_mock_state()
+    ids = [
+        HistoryManager.save_decision(user_id, state, tags=["bench", f"t{i % 7}"])
+        for i in range(decisions)
+    ]
+    return user_id, ids
+
+
+async def sync_handler(user_id: int, decision_id: int):
+    """Old-style handler: blocking calls inside a coroutine."""
+    HistoryManager.get_decision_by_id(decision_id)
+    HistoryManager.get_user_history(user_id, limit=50)
+    HistoryManager.get_analytics_summary(user_id)
+
+
+async def async_handler(user_id: int, decision_id: int):
+    """New handler: awaits the async repository."""
+    await AsyncHistoryManager.get_decision_by_id(decision_id)
+    await AsyncHistoryManager.get_user_history(user_id, limit=50)
+    await AsyncHistoryManager.get_analytics_summary(user_id)
+
+
+async def run_round(handler, user_id: int, ids: list[int], concurrency: int) -> dict:
+    """Run one burst of concurrent handlers and measure wall time and loop lag."""
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            expected = time.perf_counter() + HEARTBEAT_SECONDS
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        handler(user_id, ids[i % len(ids)])
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+
+    return {
+        "elapsed": elapsed,
+        "max_lag": max(lags) if lags else elapsed,
+        "p50_lag": statistics.median(lags) if lags else elapsed
+    }
+
+
+async def main(decisions: int, concurrency: int, rounds: int):
+    print(f"Seeding {decisions} decisions into {os.environ['DATABASE_URL']} ...")
+    user_id, ids = seed(decisions)
+
+    # Warm up both paths (engine creation, rollup backfill)
+    await sync_handler(user_id, ids[0])
+    await async_handler(user_id, ids[0])
+
+    print(f"\n{concurrency} concurrent requests x {rounds} rounds\n")
+    print(f"{'mode':<8}{'wall (ms)':>12}{'req/s':>10}{'max lag (ms)':>15}{'p50 lag (ms)':>15}")
+
+    for name, handler in (("sync", sync_handler), ("async", async_handler)):
+        results = [
+            await run_round(handler, user_id, ids, concurrency)
+            for _ in range(rounds)
+        ]
+        wall = statistics.median(r["elapsed"] for r in results)
+        max_lag = max(r["max_lag"] for r in results)
+        p50_lag = statistics.median(r["p50_lag"] for r in results)
+        print(
+            f"{name:<8}{wall * 1000:>12.1f}{concurrency / wall:>10.1f}"
+            f"{max_lag * 1000:>15.1f}{p50_lag * 1000:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--decisions", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.decisions, args.concurrency, args.rounds))
@@ -0,0 +1,135 @@
+"""Benchmark LLM connection reuse with and without shared HTTP pools.
+
+Starts a local stub server speaking the OpenAI, Groq and Ollama chat
+APIs and runs simulated workflows against it: every workflow creates a
+chat model per agent with create_llm, as the real workflow does, and
+calls each once. The server counts the TCP connections it accepts, so
+the difference shows how many handshakes the shared pools save (each is
+a TLS handshake too against a real provider).
+
+Usage:
+    python benchmarks/http_pool.py [--workflows 5] [--agents 6] [--server-latency 0.02]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Only HTTP is measured: no rate limits, usage rows or model warm-up
+os.environ["RATE_LIMIT_BACKEND"] = "none"
+os.environ["ADAPTIVE_CONCURRENCY"] = "false"
+os.environ["USAGE_LEDGER"] = "false"
+os.environ["OLLAMA_STRUCTURED_OUTPUT"] = "true"
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from src.agents.llm_factory import create_llm
+
+PROVIDERS = ("openai", "groq", "ollama")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+    latency = 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real APIs; headers and body are separate writes,
+    # which Nagle's algorithm would hold back on a reused connection
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        if self.path == "/api/chat":
+            reply = {
+                "model": body["model"], "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": "OK"},
+                "done": True, "done_reason": "stop", "prompt_eval_count": 10, "eval_count": 1
+            }
+        else:
+            reply = {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "OK"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11}
+            }
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def run(server: StubServer, provider: str, pooled: bool, args) -> dict:
+    settings.LLM_PROVIDER = provider
+    settings.LLM_HTTP_POOL = pooled
+    connections = server.connections
+    latencies = []
+
+    for _ in range(args.workflows):
+        # One chat model per agent, like a workflow run
+        models = [create_llm(model_name="stub-model") for _ in range(args.agents)]
+        for model in models:
+            start = time.perf_counter()
+            model.invoke("Hello")
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "connections": server.connections - connections,
+        "calls": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workflows", type=int, default=5)
+    parser.add_argument("--agents", type=int, default=6, help="Chat models created per workflow")
+    parser.add_argument("--server-latency", type=float, default=0.02, help="Seconds per stub response")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.latency = args.server_latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    os.environ["OPENAI_API_KEY"] = os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["OPENAI_API_BASE"] = f"{url}/v1"
+    os.environ["GROQ_API_BASE"] = url
+    settings.GROQ_API_KEY = "stub"
+    settings.OLLAMA_BASE_URL = url
+
+    print(f"\n🔌 {args.workflows} workflows x {args.agents} chat models, "
+          f"{args.server_latency * 1000:.0f} ms stub latency")
+    print(f"   {'provider':<8} {'HTTP clients':<13} {'connections':>11} {'calls':>6} {'mean':>9} {'p50':>9}")
+    for provider in PROVIDERS:
+        for pooled in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run(server, provider, pooled, args)
+            print(f"   {provider:<8} {'shared pool' if pooled else 'per model':<13} {result['connections']:>11} "
+                  f"{result['calls']:>6} {result['mean_ms']:>7.1f} ms {result['p50_ms']:>6.1f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the first LLM call against a cold and a warmed-up Ollama model.
+
+Each round unloads the model, times the first token of a short call
+(cold: the call pays the model load), then loads it with WarmupManager
+and times the same call again (warm). Needs a running Ollama server with
+the model pulled.
+
+Usage:
+    python benchmarks/ollama_warmup.py [--model llama3.2] [--rounds 3] [--base-url http://localhost:11434]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from config import settings
+from src.agents.ollama import ConstrainedChatOllama, WarmupManager, tagged_model
+
+PROMPT = "In one sentence, what is the most important factor when deciding whether to change careers?"
+
+
+def unload(base_url: str, model: str):
+    """Unload a model and wait until Ollama no longer lists it."""
+    with httpx.Client(base_url=base_url, timeout=60.0) as client:
+        client.post("/api/generate", json={"model": model, "keep_alive": 0}).raise_for_status()
+        for _ in range(100):
+            if tagged_model(model) not in {m["name"] for m in client.get("/api/ps").json().get("models", [])}:
+                return
+            time.sleep(0.1)
+    raise RuntimeError(f"{model} is still loaded")
+
+
+def first_token(llm: ConstrainedChatOllama) -> float:
+    """Seconds until the first streamed token of a short call."""
+    start = time.perf_counter()
+    for _ in llm.stream(PROMPT):
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=settings.MODEL_NAME)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--base-url", default=settings.OLLAMA_BASE_URL)
+    args = parser.parse_args()
+
+    try:
+        httpx.get(f"{args.base_url}/api/version", timeout=5.0).raise_for_status()
+    except httpx.HTTPError as e:
+        sys.exit(f"Ollama is not reachable at {args.base_url}: {e}")
+
+    llm = ConstrainedChatOllama(model=args.model, base_url=args.base_url, temperature=0, num_predict=8)
+    manager = WarmupManager(args.base_url, [args.model], interval=60)
+    cold, warm, loads = [], [], []
+
+    for _ in range(args.rounds):
+        unload(args.base_url, args.model)
+        cold.append(first_token(llm))
+
+        unload(args.base_url, args.model)
+        loads.append(manager.warm(args.model))
+        warm.append(first_token(llm))
+
+    print(f"\n🔥 {args.model} on {args.base_url}, {args.rounds} rounds (median)")
+    print(f"   first token, cold model   {statistics.median(cold):6.2f} s")
+    print(f"   first token, warmed up    {statistics.median(warm):6.2f} s")
+    print(f"   warm-up (model load)      {statistics.median(loads):6.2f} s, paid at startup instead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark sequential vs pipelined planner/research execution.
+
+Runs the full decision workflow end to end against a fake streaming LLM
+with configurable time-to-first-token and per-token latency:
+
+- sequential: planner finishes, then one research call covers all factors
+- pipelined:  each factor is researched as soon as it is complete in the
+              planner's token stream (PIPELINE_RESEARCH=true)
+
+Usage:
+    python benchmarks/pipelined_research.py [--factors 8] [--ttft 0.3] [--per-token 0.01] [--rounds 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Agents need a provider that can be constructed without API keys; the fake
+# model replaces it before any call is made. Disable the planner cache so
+# every round plans from scratch.
+os.environ.setdefault("LLM_PROVIDER", "ollama")
+os.environ["PLANNER_CACHE_SIZE"] = "0"
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.agents.base as agent_base
+from config import settings
+from src.schemas import DecisionInput
+from src.workflow import DecisionWorkflowRunner
+from src.agents.fake_llm import FakeChatModel
+
+
+def run_once(pipelined: bool, args) -> tuple[float, int, str]:
+    fake = FakeChatModel(
+        factors=args.factors, first_token_s=args.ttft, per_token_s=args.per_token, structured_output=False
+    )
+    agent_base.create_llm = lambda **kwargs: fake
+    settings.RESEARCH_CONCURRENCY = args.concurrency
+
+    runner = DecisionWorkflowRunner(pipeline_research=pipelined)
+    decision = DecisionInput(decision="Should I switch careers from software engineering to AI research?")
+
+    # Keep the agents' progress prints out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        state = runner.run(decision)
+        elapsed = time.perf_counter() - start
+
+    if state.error:
+        raise RuntimeError(state.error)
+    return elapsed, fake.calls, state.recommendation.recommendation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, default=8)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds to first token")
+    parser.add_argument("--per-token", type=float, default=0.01, help="Seconds per output token")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel per-factor research calls")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, pipelined in (("sequential", False), ("pipelined", True)):
+        timings = []
+        for _ in range(args.rounds):
+            elapsed, calls, _ = run_once(pipelined, args)
+            timings.append(elapsed)
+        results[mode] = (statistics.median(timings), calls)
+
+    print(f"\n📊 {args.factors} factors, ttft {args.ttft * 1000:.0f} ms, "
+          f"{args.per_token * 1000:.0f} ms/token, research concurrency {args.concurrency}")
+    for mode, (median, calls) in results.items():
+        print(f"   {mode:<11} {median:6.2f} s end to end ({calls} LLM calls)")
+    saved = results["sequential"][0] - results["pipelined"][0]
+    print(f"   pipelining saves {saved:.2f} s ({saved / results['sequential'][0]:.0%})")
+
+
+if __name__ == "__main__":
+    main()
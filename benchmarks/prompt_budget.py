@@ -0,0 +1,115 @@
+"""Benchmark downstream prompt sizes with and without prompt budgets.
+
+Runs the risk, opportunity and strategist agents on verbose research
+(``--sentences`` per factor insight) against a fake LLM whose prompt
+processing time grows with input tokens (``--prefill``), once with
+budgets disabled and once with the PROMPT_BUDGET_* defaults.
+
+Usage:
+    python benchmarks/prompt_budget.py [--factors 8] [--sentences 12] [--prefill 0.0005]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+# Agents need a provider that can be constructed without API keys; the fake
+# model replaces it before any call is made
+os.environ.setdefault("LLM_PROVIDER", "ollama")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.agents.base as agent_base
+from config import settings
+from src.agents.fake_llm import FakeChatModel
+from src.agents.opportunity import OpportunityAgent
+from src.agents.prompt_budget import PromptBudget
+from src.agents.risk import RiskAgent
+from src.agents.strategist import StrategistAgent
+from src.schemas import EvaluationFactor, FactorAnalysis, PlannerOutput, ResearchOutput
+
+BUDGETS = ("PROMPT_BUDGET_RISK", "PROMPT_BUDGET_OPPORTUNITY", "PROMPT_BUDGET_STRATEGIST")
+
+SENTENCES = [
+    "Switching careers resets seniority, so the first two years likely pay less than the current role.",
+    "Demand for applied research skills has grown steadily, especially for engineers who can ship models.",
+    "A portfolio of published work or open-source contributions matters more than formal credentials here.",
+    "Savings covering twelve months of expenses would absorb a temporary drop in income.",
+    "Networking through conferences and reading groups shortens the time to a first research role.",
+    "Existing software skills transfer directly to research engineering positions.",
+]
+
+
+def verbose_research(factors: int, sentences: int) -> tuple[PlannerOutput, ResearchOutput]:
+    names = [f"Factor {i + 1}" for i in range(factors)]
+    planner = PlannerOutput(
+        factors=[
+            EvaluationFactor(name=name, description=f"How {name.lower()} affects the move", category="financial")
+            for name in names
+        ],
+        decision_summary="Career change into AI research."
+    )
+    research = ResearchOutput(
+        analyses=[
+            FactorAnalysis(
+                factor_name=name,
+                insights=" ".join(SENTENCES[(i + j) % len(SENTENCES)] for j in range(sentences)),
+                data_points=["A relevant data point"]
+            )
+            for i, name in enumerate(names)
+        ],
+        overall_context=" ".join(SENTENCES * 2)
+    )
+    return planner, research
+
+
+def run_once(budgeted: bool, defaults: dict, args) -> dict:
+    for name in BUDGETS:
+        setattr(settings, name, defaults[name] if budgeted else 0)
+
+    fake = FakeChatModel(
+        factors=args.factors, first_token_s=0.05, per_token_s=0.0, prefill_per_token_s=args.prefill
+    )
+    agent_base.create_llm = lambda **kwargs: fake
+    budget = PromptBudget()
+    agent_base.prompt_budget = budget
+
+    planner, research = verbose_research(args.factors, args.sentences)
+    decision = "Should I switch careers from software engineering to AI research?"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        risk = RiskAgent().run(decision, planner, research)
+        opportunity = OpportunityAgent().run(decision, planner, research)
+        StrategistAgent().run(decision, research, risk, opportunity)
+        elapsed = time.perf_counter() - start
+
+    return {"seconds": elapsed, "stats": budget.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, default=8)
+    parser.add_argument("--sentences", type=int, default=12, help="Sentences per factor insight")
+    parser.add_argument("--prefill", type=float, default=0.0005, help="Seconds per input token")
+    args = parser.parse_args()
+
+    defaults = {name: getattr(settings, name) for name in BUDGETS}
+    unbudgeted = run_once(False, defaults, args)
+    budgeted = run_once(True, defaults, args)
+
+    print(f"\n📊 {args.factors} factors, {args.sentences} sentences per insight, "
+          f"{args.prefill * 1000:.1f} ms prefill per input token")
+    for agent, before in unbudgeted["stats"].items():
+        after = budgeted["stats"][agent]
+        print(f"   {agent:<12} {before['avg_tokens_after']:7.0f} → {after['avg_tokens_after']:6.0f} prompt tokens")
+    saved = unbudgeted["seconds"] - budgeted["seconds"]
+    print(f"   three calls: {unbudgeted['seconds']:.2f} s → {budgeted['seconds']:.2f} s "
+          f"({saved / unbudgeted['seconds']:.0%} faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""A/B harness: separate Risk + Opportunity calls vs one combined scoring call.
+
+For each round, scores the same decision, factors and research with both
+modes and reports:
+
+- latency:   wall time of the scoring stage
+- tokens:    provider-reported usage when available, otherwise an estimate
+             (tiktoken cl100k, or ~4 characters per token) of prompt + output
+- agreement: absolute difference of overall and per-factor scores, and
+             whether ScoringEngine.get_recommendation_category agrees.
+             "separate vs separate" (consecutive rounds) is the run-to-run
+             noise floor to compare against.
+
+Usage:
+    python benchmarks/scoring_ab.py                   # fake LLM, no API key needed
+    python benchmarks/scoring_ab.py --provider live   # provider configured in .env
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+if "--provider" not in sys.argv or "fake" in sys.argv:
+    # The fake model replaces the client; the provider only needs to construct without keys
+    os.environ["LLM_PROVIDER"] = "ollama"
+
+from langchain_core.callbacks import get_usage_metadata_callback
+import src.agents.base as agent_base
+from config import settings
+from src.agents import RiskAgent, OpportunityAgent, RiskOpportunityAgent
+from src.scoring import ScoringEngine
+from tests.test_backend import create_mock_state
+from src.agents.fake_llm import FakeChatModel
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+except Exception:
+    def count_tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+
+def prompt_inputs(state) -> dict:
+    """The prompt variables the scoring agents build from planner and research output."""
+    return {
+        "decision": state.decision_input.decision,
+        "factors": "\n".join(f"- {f.name}: {f.description}" for f in state.planner_output.factors),
+        "research": "\n".join(f"- {a.factor_name}: {a.insights}" for a in state.research_output.analyses),
+    }
+
+
+def score(agents, state) -> dict:
+    """Run one scoring mode and collect latency, tokens and scores."""
+    inputs = prompt_inputs(state)
+    estimated = 0
+    outputs = []
+
+    with get_usage_metadata_callback() as usage, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for agent in agents:
+            output = agent.run(
+                decision=state.decision_input.decision,
+                planner_output=state.planner_output,
+                research_output=state.research_output
+            )
+            outputs.extend(output if isinstance(output, tuple) else (output,))
+            estimated += count_tokens(agent.get_prompt().format(**inputs))
+            estimated += count_tokens(str(agent.get_output_schema().model_json_schema()))
+        elapsed = time.perf_counter() - start
+
+    risk = next(o for o in outputs if hasattr(o, "risk_scores"))
+    opportunity = next(o for o in outputs if hasattr(o, "opportunity_scores"))
+    estimated += count_tokens(risk.model_dump_json()) + count_tokens(opportunity.model_dump_json())
+    reported = sum(u.get("total_tokens", 0) for u in usage.usage_metadata.values())
+
+    return {
+        "latency": elapsed,
+        "tokens": reported or estimated,
+        "tokens_source": "reported" if reported else "estimated",
+        "risk": risk,
+        "opportunity": opportunity,
+    }
+
+
+def agreement(a: dict, b: dict) -> dict:
+    """Score differences between two runs."""
+    def per_factor(scores_a, scores_b):
+        by_name = {s.factor_name.strip().lower(): s.score for s in scores_b}
+        diffs = [abs(s.score - by_name[s.factor_name.strip().lower()])
+                 for s in scores_a if s.factor_name.strip().lower() in by_name]
+        return statistics.mean(diffs) if diffs else float("nan")
+
+    category = lambda r: ScoringEngine.get_recommendation_category(
+        r["risk"].overall_risk_level, r["opportunity"].overall_opportunity_level
+    )
+    return {
+        "overall_risk": abs(a["risk"].overall_risk_level - b["risk"].overall_risk_level),
+        "overall_opportunity": abs(
+            a["opportunity"].overall_opportunity_level - b["opportunity"].overall_opportunity_level
+        ),
+        "factor_risk": per_factor(a["risk"].risk_scores, b["risk"].risk_scores),
+        "factor_opportunity": per_factor(a["opportunity"].opportunity_scores, b["opportunity"].opportunity_scores),
+        "category": category(a) == category(b),
+    }
+
+
+def report_agreement(label: str, pairs: list):
+    if not pairs:
+        return
+    rows = [agreement(a, b) for a, b in pairs]
+    mean = lambda key: statistics.mean(r[key] for r in rows)
+    print(f"   {label:<22} Δrisk {mean('overall_risk'):.2f}  Δopp {mean('overall_opportunity'):.2f}  "
+          f"Δfactor risk {mean('factor_risk'):.2f}  Δfactor opp {mean('factor_opportunity'):.2f}  "
+          f"category agree {sum(r['category'] for r in rows)}/{len(rows)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--provider", choices=["fake", "live"], default="fake")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Fake LLM seconds to first token")
+    parser.add_argument("--per-token", type=float, default=0.01, help="Fake LLM seconds per output token")
+    parser.add_argument("--prefill", type=float, default=0.0005, help="Fake LLM seconds per input token")
+    args = parser.parse_args()
+
+    state = create_mock_state()
+
+    if args.provider == "fake":
+        fake = FakeChatModel(
+            factors=len(state.planner_output.factors),
+            first_token_s=args.ttft,
+            per_token_s=args.per_token,
+            prefill_per_token_s=args.prefill,
+            structured_output=False
+        )
+        agent_base.create_llm = lambda **kwargs: fake
+
+    model = dict(model_name=settings.MODEL_NAME, temperature=settings.TEMPERATURE)
+    separate_agents = [RiskAgent(**model), OpportunityAgent(**model)]
+    combined_agents = [RiskOpportunityAgent(**model)]
+
+    separate, combined = [], []
+    for _ in range(args.rounds):
+        separate.append(score(separate_agents, state))
+        combined.append(score(combined_agents, state))
+
+    print(f"\n📊 Scoring A/B ({args.provider}, {args.rounds} rounds, "
+          f"{len(state.planner_output.factors)} factors)")
+    for label, runs in (("separate (2 calls)", separate), ("combined (1 call)", combined)):
+        print(f"   {label:<22} latency {statistics.median(r['latency'] for r in runs):.2f} s  "
+              f"tokens {statistics.median(r['tokens'] for r in runs):.0f} ({runs[0]['tokens_source']})")
+
+    report_agreement("combined vs separate", list(zip(combined, separate)))
+    report_agreement("separate vs separate", list(zip(separate, separate[1:])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark recall and latency of near-duplicate decision detection.
+
+Builds a synthetic history of distinct decisions, then queries it with
+lightly reworded copies (synonyms, filler phrases, typos, reordered
+context) and with fresh decisions that are not in the index. Fresh
+decisions come from the same templates, so they differ from indexed ones
+only in the field, city and numbers; that is the hard case for a
+threshold.
+
+- recall@1:  reworded query finds its original as the top match above the threshold
+- false hit: a fresh decision matches anything above the threshold
+
+Latency is measured per query against the in-memory SimilarityIndex used by
+HistoryManager.find_similar_decisions.
+
+Usage:
+    python benchmarks/similarity_index.py [--sizes 100 1000 5000] [--queries 300]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.text_similarity import SimilarityIndex
+
+ACTIONS = [
+    "switch careers from {a} to {b}", "move from {city} to {city2}",
+    "go back to school for a degree in {b}", "buy a house in {city}",
+    "accept the job offer at a {b} startup", "start my own {b} business",
+    "quit my {a} job to travel", "take a sabbatical from {a}",
+    "invest my savings in {b}", "hire a second engineer for my {b} team",
+]
+FIELDS = [
+    "software engineering", "nursing", "accounting", "teaching", "marketing",
+    "law", "data science", "graphic design", "civil engineering", "finance",
+    "photography", "real estate", "robotics", "biotech", "journalism",
+]
+CITIES = [
+    "Austin", "Berlin", "Lisbon", "Toronto", "Denver", "Seattle", "Tokyo",
+    "Madrid", "Chicago", "Dublin", "Sydney", "Boston",
+]
+CONTEXTS = [
+    "{n} years experience, {k} kids, mortgage of ${m}k",
+    "currently earning ${m}k, partner works in {a}",
+    "savings of ${m}k, {n} years until retirement",
+]
+SYNONYMS = {
+    "switch": "change", "careers": "profession", "move": "relocate",
+    "buy": "purchase", "house": "home", "job": "position", "start": "launch",
+    "quit": "leave", "savings": "money", "experience": "experience working",
+    "kids": "children", "business": "company",
+}
+PREFIXES = ["", "I'm thinking about whether to ", "Would it be wise to ", "Considering: should I "]
+
+
+def make_decision(rng: random.Random) -> str:
+    """One random decision with context."""
+    a, b = rng.sample(FIELDS, 2)
+    city, city2 = rng.sample(CITIES, 2)
+    action = rng.choice(ACTIONS).format(a=a, b=b, city=city, city2=city2)
+    context = rng.choice(CONTEXTS).format(
+        n=rng.randint(1, 30), k=rng.randint(0, 4), m=rng.randint(20, 900), a=rng.choice(FIELDS)
+    )
+    return f"Should I {action}?\n{context}"
+
+
+def reword(text: str, rng: random.Random) -> str:
+    """Lightly reword a decision the way users resubmit them."""
+    question, context = text.split("\n", 1)
+    words = question.removeprefix("Should I ").rstrip("?").split()
+
+    words = [SYNONYMS.get(w, w) if rng.random() < 0.5 else w for w in words]
+    if rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        if len(words[i]) > 4:
+            j = rng.randrange(1, len(words[i]) - 1)
+            words[i] = words[i][:j] + words[i][j + 1:]
+
+    clauses = context.split(", ")
+    if rng.random() < 0.5:
+        rng.shuffle(clauses)
+    clauses = [" ".join(SYNONYMS.get(w, w) for w in c.split()) for c in clauses]
+
+    prefix = rng.choice(PREFIXES) or "Should I "
+    return f"{prefix}{' '.join(words)}?\n{', '.join(clauses)}"
+
+
+def run(size: int, queries: int, thresholds: list[float], seed: int = 7):
+    rng = random.Random(seed)
+    corpus = {}
+    while len(corpus) < size:
+        corpus.setdefault(make_decision(rng), len(corpus))
+    texts = list(corpus)
+
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    for key, text in enumerate(texts):
+        index.add(key, text)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Warm the lazily built weighted matrix so latency reflects steady state
+    index.query(texts[0], limit=1)
+
+    targets = [rng.randrange(size) for _ in range(queries)]
+    reworded = [reword(texts[t], rng) for t in targets]
+    fresh = []
+    while len(fresh) < queries:
+        text = make_decision(rng)
+        if text not in corpus:
+            fresh.append(text)
+
+    latencies = []
+    top = []
+    for text in reworded:
+        start = time.perf_counter()
+        top.append(index.query(text, limit=1))
+        latencies.append((time.perf_counter() - start) * 1000)
+    fresh_top = [index.query(text, limit=1) for text in fresh]
+
+    print(f"\n📚 {size} indexed decisions (build {build_ms:.0f} ms, "
+          f"{index._rows.nbytes / 1e6:.1f} MB)")
+    print(f"   query latency: p50 {statistics.median(latencies):.2f} ms, "
+          f"p95 {statistics.quantiles(latencies, n=20)[18]:.2f} ms")
+    print(f"   {'threshold':>9} {'recall@1':>9} {'false hit':>10}")
+    for threshold in thresholds:
+        recall = sum(
+            1 for target, match in zip(targets, top)
+            if match and match[0][0] == target and match[0][1] >= threshold
+        ) / queries
+        false_hits = sum(1 for match in fresh_top if match and match[0][1] >= threshold) / queries
+        print(f"   {threshold:>9.2f} {recall:>9.1%} {false_hits:>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.thresholds)
+
+
+if __name__ == "__main__":
+    main()
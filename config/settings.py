@@ -23,10 +23,111 @@ class Settings:
     
     # Ollama Configuration
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # Constrain output to agents' JSON schemas: "auto" (detect per model), "true" or "false"
+    OLLAMA_STRUCTURED_OUTPUT: str = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "auto").lower()
+    # How long models stay loaded after a call: seconds or a duration like "30m" (-1 = forever)
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Load MODEL_NAME (and these comma-separated models) at startup and reload them if unloaded
+    OLLAMA_WARMUP: bool = os.getenv("OLLAMA_WARMUP", "true").lower() == "true"
+    OLLAMA_WARMUP_MODELS: str = os.getenv("OLLAMA_WARMUP_MODELS", "")
+    OLLAMA_WARMUP_INTERVAL: float = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "60"))
+    
+    # LLM rate limits: requests/tokens per minute (0 uses the provider's default tier)
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    # "memory" (per process), "sqlite" (shared by workers) or "none"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    RATE_LIMIT_PATH: str = os.getenv("RATE_LIMIT_PATH", "data/rate_limits.db")
+    
+    # One pooled HTTP client per provider shared by every chat model (openai, groq, ollama)
+    LLM_HTTP_POOL: bool = os.getenv("LLM_HTTP_POOL", "true").lower() == "true"
+    # HTTP/2 for HTTPS providers; needs the h2 package (pip install httpx[http2])
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+    LLM_HTTP_KEEPALIVE_SECONDS: float = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "60"))
+    
+    # Adaptive (AIMD) limit on concurrent LLM calls per provider
+    ADAPTIVE_CONCURRENCY: bool = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+    LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    # Seconds a queued LLM call waits before it is promoted one priority class
+    LLM_PRIORITY_AGING_SECONDS: float = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "30"))
+    
+    # Fake provider (LLM_PROVIDER=fake): offline schema-valid answers for tests and benchmarks
+    FAKE_LLM_FACTORS: int = int(os.getenv("FAKE_LLM_FACTORS", "5"))
+    FAKE_LLM_TTFT: float = float(os.getenv("FAKE_LLM_TTFT", "0.3"))
+    FAKE_LLM_PER_TOKEN: float = float(os.getenv("FAKE_LLM_PER_TOKEN", "0.01"))
+    FAKE_LLM_PREFILL_PER_TOKEN: float = float(os.getenv("FAKE_LLM_PREFILL_PER_TOKEN", "0"))
+    # "fixed", "uniform" or "lognormal" time to first token
+    FAKE_LLM_LATENCY: str = os.getenv("FAKE_LLM_LATENCY", "fixed").lower()
+    FAKE_LLM_JITTER: float = float(os.getenv("FAKE_LLM_JITTER", "0.5"))
+    FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+    FAKE_LLM_RATE_LIMIT_RATE: float = float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", "0"))
+    FAKE_LLM_CAPACITY: int = int(os.getenv("FAKE_LLM_CAPACITY", "0"))
+    FAKE_LLM_SEED: int = int(os.getenv("FAKE_LLM_SEED", "0"))
+    
+    # Prompt budgets: research and reasoning text is compacted so the rendered
+    # prompt of each downstream agent fits in this many tokens (0 = unlimited)
+    PROMPT_BUDGET_RISK: int = int(os.getenv("PROMPT_BUDGET_RISK", "1200"))
+    PROMPT_BUDGET_OPPORTUNITY: int = int(os.getenv("PROMPT_BUDGET_OPPORTUNITY", "1200"))
+    PROMPT_BUDGET_RISK_OPPORTUNITY: int = int(os.getenv("PROMPT_BUDGET_RISK_OPPORTUNITY", "1600"))
+    PROMPT_BUDGET_STRATEGIST: int = int(os.getenv("PROMPT_BUDGET_STRATEGIST", "1500"))
+    # "approx" (local estimate) or a tiktoken encoding such as "cl100k_base"
+    PROMPT_TOKENIZER: str = os.getenv("PROMPT_TOKENIZER", "approx")
+    
+    # JSON fallback: most missing fields a response may have before giving up; they
+    # are asked for in one small follow-up call instead of repeating the whole call (0 = never)
+    JSON_REASK_MAX_FIELDS: int = int(os.getenv("JSON_REASK_MAX_FIELDS", "8"))
+    
+    # Usage ledger: tokens, latency and cost of every LLM call per user, run and agent
+    USAGE_LEDGER: bool = os.getenv("USAGE_LEDGER", "true").lower() == "true"
+    # Per-user limits per UTC day, enforced before starting analyses and chats (0 = unlimited)
+    USER_DAILY_TOKEN_QUOTA: int = int(os.getenv("USER_DAILY_TOKEN_QUOTA", "0"))
+    USER_DAILY_COST_QUOTA: float = float(os.getenv("USER_DAILY_COST_QUOTA", "0"))
+    
+    # LLM cassettes: record real calls, replay them offline with LLM_PROVIDER=replay
+    LLM_CASSETTE_RECORD: bool = os.getenv("LLM_CASSETTE_RECORD", "false").lower() == "true"
+    LLM_CASSETTE_PATH: str = os.getenv("LLM_CASSETTE_PATH", "data/cassette.db")
+    # Multiplier on recorded latencies when replaying (0 = instant)
+    LLM_CASSETTE_LATENCY_SCALE: float = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0"))
+    
+    # Database Configuration
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///data/futureself.db")
+    
+    # Decision detail cache: "memory" (per process), "sqlite" (shared by workers) or "none"
+    DECISION_CACHE_BACKEND: str = os.getenv("DECISION_CACHE_BACKEND", "memory").lower()
+    DECISION_CACHE_SIZE: int = int(os.getenv("DECISION_CACHE_SIZE", "256"))
+    DECISION_CACHE_PATH: str = os.getenv("DECISION_CACHE_PATH", "data/decision_cache.db")
+    
+    # Idempotency-Key records for POST /api/v1/decisions/analyze
+    IDEMPOTENCY_DB_PATH: str = os.getenv("IDEMPOTENCY_DB_PATH", "data/idempotency.db")
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    
+    # Near-duplicate detection: minimum similarity (0-1) to surface a past decision
+    SIMILAR_DECISION_THRESHOLD: float = float(os.getenv("SIMILAR_DECISION_THRESHOLD", "0.75"))
+    
+    # Planner cache: reuse factors for decisions this similar (0-1); size 0 disables it
+    PLANNER_CACHE_SIZE: int = int(os.getenv("PLANNER_CACHE_SIZE", "512"))
+    PLANNER_CACHE_THRESHOLD: float = float(os.getenv("PLANNER_CACHE_THRESHOLD", "0.75"))
     
     # Workflow Configuration
     MAX_RETRIES: int = 3
-    TIMEOUT_SECONDS: int = 300
+    # End-to-end analysis budget; stages degrade to meet it (0 disables)
+    TIMEOUT_SECONDS: int = int(os.getenv("TIMEOUT_SECONDS", "300"))
+    
+    # Share one workflow execution among concurrent identical analyses
+    COALESCE_ANALYSES: bool = os.getenv("COALESCE_ANALYSES", "true").lower() == "true"
+    
+    # Checkpoint runs after every node so failed runs can be resumed
+    CHECKPOINTS_ENABLED: bool = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+    CHECKPOINT_DB_PATH: str = os.getenv("CHECKPOINT_DB_PATH", "data/checkpoints.db")
+    
+    # Research each factor as soon as the planner streams it (one call per factor)
+    PIPELINE_RESEARCH: bool = os.getenv("PIPELINE_RESEARCH", "false").lower() == "true"
+    RESEARCH_CONCURRENCY: int = int(os.getenv("RESEARCH_CONCURRENCY", "4"))
+    
+    # "separate" (Risk and Opportunity agents) or "combined" (one scoring call)
+    SCORING_MODE: str = os.getenv("SCORING_MODE", "separate").lower()
     
     @classmethod
     def validate(cls) -> bool:
@@ -47,7 +148,9 @@ class Settings:
             "ollama": "Ollama (Local)",
             "huggingface": "HuggingFace (Local)",
             "groq": "Groq (Cloud - Free)",
-            "huggingface_api": "HuggingFace API (Cloud - Free)"
+            "huggingface_api": "HuggingFace API (Cloud - Free)",
+            "fake": "Fake (Offline)",
+            "replay": "Replay (Cassette)"
         }
         return names.get(cls.LLM_PROVIDER, cls.LLM_PROVIDER.title())
 
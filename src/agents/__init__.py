@@ -3,12 +3,17 @@ from .planner import PlannerAgent
 from .research import ResearchAgent
 from .risk import RiskAgent
 from .opportunity import OpportunityAgent
+from .risk_opportunity import RiskOpportunityAgent
 from .strategist import StrategistAgent
+from .quick import QuickPlannerAgent, QuickStrategistAgent
 
 __all__ = [
     "PlannerAgent",
     "ResearchAgent",
     "RiskAgent",
     "OpportunityAgent",
+    "RiskOpportunityAgent",
     "StrategistAgent",
+    "QuickPlannerAgent",
+    "QuickStrategistAgent",
 ]
@@ -1,10 +1,27 @@
 """Base agent class."""
 from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from pydantic import BaseModel
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, ValidationError
+from config import settings
 from .llm_factory import create_llm
+from .json_stream import IncrementalJSONParser
+from .json_repair import coerce_scores, missing_fields, repair_json, set_path
+from .prompt_budget import prompt_budget
+from .scheduler import request_timeout
 import json
+import re
+
+# Follow-up asking only for the fields an otherwise usable response left out
+REASK_PROMPT = """{prompt}
+
+Your JSON response was incomplete. This part was received:
+{partial}
+
+Respond ONLY with a JSON object giving the missing values, keyed by these paths:
+{fields}"""
 
 
 class BaseAgent(ABC):
@@ -13,6 +30,15 @@ class BaseAgent(ABC):
     def __init__(self, model_name: str = None, temperature: float = None):
         self.llm = create_llm(model_name=model_name, temperature=temperature)
     
+    @property
+    def name(self) -> str:
+        """Agent name in the usage ledger, e.g. "risk_opportunity" for RiskOpportunityAgent."""
+        return re.sub(r"(?<!^)(?=[A-Z])", "_", type(self).__name__.removesuffix("Agent")).lower()
+    
+    def _config(self) -> Dict:
+        """Runnable config tagging this agent's LLM calls for the usage ledger."""
+        return {"metadata": {"agent": self.name}}
+    
     @abstractmethod
     def get_prompt(self) -> ChatPromptTemplate:
         """Return the agent's prompt template."""
@@ -23,27 +49,30 @@ class BaseAgent(ABC):
         """Return the Pydantic schema for structured output."""
         pass
     
+    def _fit_prompt(self, budget: int, kwargs: Dict, sections: Dict[str, List[Tuple[str, str]]]) -> Dict:
+        """Prompt variables with ``sections`` compacted to fit ``budget`` tokens (see PromptBudget)."""
+        return prompt_budget.fit(self.name, self.get_prompt(), budget, kwargs, sections)
+    
     def run(self, **kwargs) -> BaseModel:
         """Execute the agent with fallback for structured output."""
-        prompt = self.get_prompt()
-        schema = self.get_output_schema()
-        
+        return self._invoke(self.get_prompt(), self.get_output_schema(), kwargs)
+    
+    def _invoke(self, prompt: ChatPromptTemplate, schema: type[BaseModel], kwargs: Dict) -> BaseModel:
+        """Call the LLM for a prompt/schema pair, preferring structured output."""
         try:
             # Try structured output first (works with OpenAI, some others)
             structured_llm = self.llm.with_structured_output(schema)
             chain = prompt | structured_llm
-            result = chain.invoke(kwargs)
+            result = chain.invoke(kwargs, config=self._config())
             return result
         except (AttributeError, NotImplementedError) as e:
             # Fallback: Use JSON parsing for providers that don't support structured output
             print(f"⚠️ Structured output not supported, using JSON parsing fallback")
             
-            # Add JSON instructions to prompt
-            json_prompt = prompt.format(**kwargs)
-            json_prompt += f"\n\nIMPORTANT: Respond ONLY with valid JSON matching this schema:\n{schema.model_json_schema()}"
-            
             # Get response
-            response = self.llm.invoke(json_prompt)
+            llm, constrained = self._json_llm(schema)
+            json_prompt = self._json_prompt(prompt, schema, kwargs, constrained)
+            response = llm.invoke(json_prompt, config=self._config())
             
             # Extract content
             if hasattr(response, 'content'):
@@ -51,19 +80,111 @@ class BaseAgent(ABC):
             else:
                 content = str(response)
             
-            # Try to parse JSON from response
+            return self._parse_json(content, schema, json_prompt)
+    
+    def run_streaming(
+        self,
+        array_key: str,
+        on_item: Callable[[Dict], None],
+        **kwargs
+    ) -> BaseModel:
+        """
+        Execute the agent on a raw token stream, reporting array items early.
+        
+        The model is asked for plain JSON (held to the schema while decoding
+        where the provider supports it) and its output is parsed
+        incrementally: on_item is called with each element of the top-level
+        array_key as soon as that element is complete, while the rest of the
+        response is still being generated. The stream is closed with a
+        TimeoutError once the call's ``llm_deadline`` passes, even while
+        tokens keep arriving.
+        
+        Args:
+            array_key: Top-level array whose elements are reported (e.g. "factors")
+            on_item: Callback receiving each element as a dict
+            **kwargs: Prompt variables
+            
+        Returns:
+            The complete, validated output
+        """
+        prompt = self.get_prompt()
+        schema = self.get_output_schema()
+        parser = IncrementalJSONParser(array_key)
+        llm, constrained = self._json_llm(schema)
+        json_prompt = self._json_prompt(prompt, schema, kwargs, constrained)
+        
+        for chunk in llm.stream(json_prompt, config=self._config()):
+            if request_timeout() == 0.0:
+                raise TimeoutError("LLM call deadline passed while streaming")
+            content = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            for item in parser.feed(content):
+                on_item(item)
+        
+        return self._parse_json(parser.text, schema, json_prompt)
+    
+    def _json_llm(self, schema: type[BaseModel]) -> Tuple[Runnable, bool]:
+        """
+        The LLM for raw JSON answers, and whether it is held to the schema.
+        
+        Models that can constrain decoding (see ConstrainedChatOllama)
+        are bound to the schema or at least to JSON; others are used as is.
+        """
+        json_output = getattr(self.llm, "json_output", None)
+        if json_output is None:
+            return self.llm, False
+        return json_output(schema)
+    
+    @staticmethod
+    def _json_prompt(
+        prompt: ChatPromptTemplate,
+        schema: type[BaseModel],
+        kwargs: Dict,
+        constrained: bool = False
+    ) -> str:
+        """Format a prompt with instructions to answer in schema-shaped JSON."""
+        json_prompt = prompt.format(**kwargs)
+        if constrained:
+            # Decoding already follows the schema; spelling it out only costs tokens
+            json_prompt += "\n\nRespond in JSON."
+        else:
+            json_prompt += f"\n\nIMPORTANT: Respond ONLY with valid JSON matching this schema:\n{schema.model_json_schema()}"
+        return json_prompt
+    
+    def _parse_json(self, content: str, schema: type[BaseModel], json_prompt: str) -> BaseModel:
+        """
+        Extract and validate the JSON object in a model response.
+        
+        The JSON is repaired if needed (fences, trailing commas, cut-off
+        output; see repair_json) and score strings are coerced to clamped
+        floats. If the only problem left is a few missing fields, e.g.
+        because the response was cut off, the model is asked for just
+        those fields instead of repeating the whole call.
+        """
+        try:
+            data = coerce_scores(repair_json(content), schema)
             try:
-                # Find JSON in response (might have extra text)
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                if start >= 0 and end > start:
-                    json_str = content[start:end]
-                    data = json.loads(json_str)
-                    return schema(**data)
-                else:
-                    raise ValueError("No JSON found in response")
-            except Exception as parse_error:
-                raise ValueError(
-                    f"Failed to parse response as JSON: {parse_error}\n"
-                    f"Response: {content[:500]}"
-                )
+                return schema.model_validate(data)
+            except ValidationError as e:
+                missing = missing_fields(e, schema)
+                if not missing or len(missing) > settings.JSON_REASK_MAX_FIELDS:
+                    raise
+            
+            print(f"🩹 Response missing {len(missing)} field(s), asking for: {', '.join(missing)}")
+            fields = "\n".join(
+                f'- "{path}": {description}' if description else f'- "{path}"'
+                for path, description in missing.items()
+            )
+            response = self.llm.invoke(
+                REASK_PROMPT.format(prompt=json_prompt, partial=json.dumps(data), fields=fields),
+                config=self._config()
+            )
+            answers = repair_json(response.content if hasattr(response, 'content') else str(response))
+            for path in missing:
+                if path in answers:
+                    set_path(data, path, answers[path])
+            return schema.model_validate(coerce_scores(data, schema))
+        except Exception as parse_error:
+            raise ValueError(
+                f"Failed to parse response as JSON: {parse_error}\n"
+                f"Response: {content[:500]}"
+            )
@@ -0,0 +1,336 @@
+"""Record-and-replay of LLM calls (cassettes).
+
+With LLM_CASSETTE_RECORD=true, every chat model from create_llm records
+each call - the prompt messages, the structured-output schema if any, the
+response message and its timing - to a local SQLite cassette, along with
+the inputs of each workflow run. LLM_PROVIDER=replay then answers from the
+cassette with the recorded latencies (scaled by LLM_CASSETTE_LATENCY_SCALE)
+and no network, so a real session can be replayed through
+DecisionWorkflowRunner reproducibly.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+from config import settings
+from .scheduler import simulated_wait
+
+
+# When the call in this context got past the limiters (set by RecordingGate)
+_call_started: ContextVar[Optional[float]] = ContextVar("cassette_call_started", default=None)
+
+
+class CassetteMiss(LookupError):
+    """The cassette has no recording for a request."""
+
+
+def request_key(messages: List[BaseMessage], schema_name: Optional[str]) -> str:
+    """Identity of a request: the prompt messages and the structured-output schema."""
+    payload = json.dumps(
+        {"messages": [[m.type, m.content] for m in messages], "schema": schema_name},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, default=str).encode())
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+class Cassette:
+    """
+    Recorded LLM calls and workflow runs in a local SQLite file.
+
+    Requests and responses are stored as zlib-compressed JSON. A request
+    recorded several times is replayed in recording order, cycling when
+    replayed more often than it was recorded.
+    """
+
+    def __init__(self, path: str = "data/cassette.db"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._replayed: Dict[str, int] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS interactions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, provider TEXT, model TEXT, "
+                "request BLOB NOT NULL, response BLOB NOT NULL, first_token_s REAL NOT NULL, "
+                "total_s REAL NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_interactions_key ON interactions (key, id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, inputs BLOB NOT NULL, created REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit-per-statement mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record(
+        self,
+        key: str,
+        request: Dict,
+        response: Dict,
+        first_token_s: float,
+        total_s: float,
+        provider: str = None,
+        model: str = None
+    ):
+        """Store one call."""
+        self._connect().execute(
+            "INSERT INTO interactions (key, provider, model, request, response, first_token_s, total_s, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, _pack(request), _pack(response), first_token_s, total_s, time.time())
+        )
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """The next recording of a request to replay, or None if it was never recorded."""
+        rows = self._connect().execute(
+            "SELECT response, first_token_s, total_s FROM interactions WHERE key = ? ORDER BY id",
+            (key,)
+        ).fetchall()
+
+        with self._lock:
+            if not rows:
+                self.misses += 1
+                return None
+            self.hits += 1
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+
+        response, first_token_s, total_s = rows[index % len(rows)]
+        return {"response": _unpack(response), "first_token_s": first_token_s, "total_s": total_s}
+
+    def record_run(self, inputs: Dict):
+        """Store the inputs of one workflow run, for replaying the session."""
+        self._connect().execute(
+            "INSERT INTO runs (inputs, created) VALUES (?, ?)", (_pack(inputs), time.time())
+        )
+
+    def runs(self) -> List[Dict]:
+        """Recorded workflow run inputs, oldest first."""
+        rows = self._connect().execute("SELECT inputs FROM runs ORDER BY id").fetchall()
+        return [_unpack(row[0]) for row in rows]
+
+    def rewind(self):
+        """Replay every request from its first recording again."""
+        with self._lock:
+            self._replayed.clear()
+
+    def stats(self) -> Dict:
+        conn = self._connect()
+        return {
+            "interactions": conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0],
+            "runs": conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class RecordingGate(BaseRateLimiter):
+    """
+    Marks when a call actually starts, after the limiters it waits for.
+
+    Wraps the chat model's rate limiter so recorded latencies exclude time
+    spent queued in this process.
+    """
+
+    def __init__(self, inner: Optional[BaseRateLimiter] = None):
+        self.inner = inner
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if self.inner is not None and not self.inner.acquire(blocking=blocking):
+            return False
+        _call_started.set(time.time())
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if self.inner is not None and not await self.inner.aacquire(blocking=blocking):
+            return False
+        _call_started.set(time.time())
+        return True
+
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Callback that records each finished call of a chat model to a cassette."""
+
+    def __init__(self, cassette: Cassette, provider: str, model: str):
+        self.cassette = cassette
+        self.provider = provider
+        self.model = model
+        self._calls: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, options=None, **kwargs):
+        # JSON schema of a with_structured_output call, titled after the model
+        schema = ((options or {}).get("ls_structured_output_format") or {}).get("schema") or {}
+        self._calls[run_id] = {"messages": messages[0], "schema": schema.get("title"), "first_token": None}
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        call = self._calls.get(run_id)
+        if call is not None and call["first_token"] is None:
+            call["first_token"] = time.time()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        now = time.time()
+        started = _call_started.get() or now
+        message = response.generations[0][0].message
+
+        self.cassette.record(
+            request_key(call["messages"], call["schema"]),
+            {"messages": [[m.type, m.content] for m in call["messages"]], "schema": call["schema"]},
+            {
+                "content": message.content,
+                "tool_calls": getattr(message, "tool_calls", []),
+                "usage_metadata": getattr(message, "usage_metadata", None),
+                "response_metadata": message.response_metadata
+            },
+            first_token_s=(call["first_token"] or now) - started,
+            total_s=now - started,
+            provider=self.provider,
+            model=self.model
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._calls.pop(run_id, None)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model answering from a cassette with the recorded (scaled) latencies.
+
+    Like the fake provider, a replayed call times out at its ``llm_deadline``,
+    so deadline and degraded-mode runs can be reproduced from a cassette.
+    """
+
+    cassette: Any
+    latency_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def with_structured_output(self, schema, **kwargs):
+        structured = {"kwargs": {"method": "json_schema"}, "schema": schema}
+        return self.bind(response_schema=schema, ls_structured_output_format=structured) | RunnableLambda(
+            lambda message: _parse_structured(message, schema)
+        )
+
+    def _replay(self, messages: List[BaseMessage], schema: Optional[type[BaseModel]]) -> Dict:
+        recording = self.cassette.lookup(request_key(messages, schema.__name__ if schema else None))
+        if recording is not None:
+            return recording
+        if schema is not None:
+            # Recorded through the agents' JSON-prompt fallback instead
+            raise NotImplementedError(f"No structured recording for {schema.__name__}")
+        raise CassetteMiss(
+            "No recording for this prompt; record it with LLM_CASSETTE_RECORD=true"
+        )
+
+    def _message(self, recording: Dict) -> AIMessage:
+        response = recording["response"]
+        return AIMessage(
+            content=response["content"],
+            tool_calls=response.get("tool_calls") or [],
+            usage_metadata=response.get("usage_metadata"),
+            response_metadata=response.get("response_metadata") or {}
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs
+    ) -> ChatResult:
+        recording = self._replay(messages, response_schema)
+        simulated_wait(recording["total_s"] * self.latency_scale, "Replayed")
+        return ChatResult(generations=[ChatGeneration(message=self._message(recording))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        recording = self._replay(messages, response_schema)
+        message = self._message(recording)
+        text = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+
+        # Spread the recorded generation time evenly over the chunks
+        simulated_wait(recording["first_token_s"] * self.latency_scale, "Replayed")
+        per_chunk = max(0.0, recording["total_s"] - recording["first_token_s"]) * self.latency_scale
+        per_chunk /= max(len(pieces), 1)
+
+        for piece in pieces:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            simulated_wait(per_chunk, "Replayed")
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=message.usage_metadata,
+            response_metadata=message.response_metadata
+        ))
+
+
+def _parse_structured(message: AIMessage, schema: type[BaseModel]) -> BaseModel:
+    """Structured output from a replayed tool call or JSON answer."""
+    if message.tool_calls:
+        return schema.model_validate(message.tool_calls[0]["args"])
+    content = message.content
+    return schema.model_validate_json(content[content.find("{"):content.rfind("}") + 1])
+
+
+_cassette: Optional[Cassette] = None
+_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Process-wide cassette at LLM_CASSETTE_PATH."""
+    global _cassette
+
+    with _lock:
+        if _cassette is None or _cassette.path != settings.LLM_CASSETTE_PATH:
+            _cassette = Cassette(settings.LLM_CASSETTE_PATH)
+
+    return _cassette
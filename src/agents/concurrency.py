@@ -0,0 +1,277 @@
+"""Adaptive (AIMD) concurrency limiting for LLM calls."""
+import asyncio
+import contextvars
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from config import settings
+from .rate_limit import get_rate_limiter, retry_after
+from .scheduler import FairQueue, current_priority, request_timeout
+
+# Weight of each successful call in the latency moving average
+LATENCY_SMOOTHING = 0.1
+
+# (limiter, started, epoch) of the call holding a slot in this context
+_slot: ContextVar = ContextVar("llm_slot", default=None)
+
+
+def detached_context() -> contextvars.Context:
+    """
+    Copy of the current context for LLM calls started from it in other threads.
+
+    Keeps the caller's priority and deadline but not the slot of a call
+    still running here (e.g. the planner's stream): a started call that
+    fails before getting its own slot would otherwise release that one.
+    """
+    context = contextvars.copy_context()
+    context.run(_slot.set, None)
+    return context
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether an error means the provider is overloaded (429 or timeout)."""
+    if retry_after(error) is not None or isinstance(error, TimeoutError):
+        return True
+    return "timeout" in type(error).__name__.lower() or "timed out" in str(error).lower()
+
+
+class ReleaseHandler(BaseCallbackHandler):
+    """Returns a call's slot to its limiter when the call ends."""
+
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter"):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        self.limiter.release()
+
+    def on_llm_error(self, error, **kwargs):
+        self.limiter.release(error)
+
+
+class AdaptiveConcurrencyLimiter(BaseRateLimiter):
+    """
+    Limit on concurrent calls to one LLM provider, adjusted by AIMD.
+
+    While calls succeed within ``latency_tolerance`` times the average
+    latency and the limit is fully used, each success raises the limit by
+    1/limit (about +1 per limit's worth of calls). A 429 or timeout halves
+    it, once per window: calls that started before a decrease do not
+    decrease it again. Latency is measured from the moment a call gets its
+    slot, so time spent queueing does not count against the provider.
+
+    Calls over the limit wait in a FairQueue and get freed slots by the
+    priority and user set with ``llm_priority``, so every agent and the
+    chat assistant are scheduled here. A call stops waiting with a
+    TimeoutError when its ``llm_deadline`` passes.
+
+    Passed to chat models as ``rate_limiter`` with ``release_handler`` as a
+    callback. ``inner`` (the provider's rate limiter) is acquired after the
+    slot.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        inner: Optional[BaseRateLimiter] = None,
+        aging_seconds: float = 30.0
+    ):
+        self.provider = provider
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.inner = inner
+        self.release_handler = ReleaseHandler(self)
+
+        self.in_flight = 0
+        self.queue = FairQueue(aging_seconds)
+        self.latency: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.errors = 0
+
+        self._cond = threading.Condition()
+        self._epoch = 0
+
+    def _enter(self, blocking: bool):
+        """
+        Take a free slot, or queue for one; caller holds the lock.
+
+        Returns:
+            The slot's epoch, a Waiter to wait on, or None (full, not blocking)
+        """
+        priority, user_id = current_priority()
+        if not len(self.queue) and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.queue.served(priority, user_id)
+            return self._epoch
+        if not blocking:
+            return None
+        return self.queue.push(priority, user_id)
+
+    def _dispatch(self):
+        """Hand free slots to queued calls; caller holds the lock."""
+        granted = False
+        while len(self.queue) and self.in_flight < int(self.limit):
+            waiter = self.queue.pop()
+            self.in_flight += 1
+            waiter.epoch = self._epoch
+            waiter.granted = True
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _start(self, epoch: int):
+        _slot.set((self, time.time(), epoch))
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        with self._cond:
+            entry = self._enter(blocking)
+            if entry is None:
+                return False
+            if not isinstance(entry, int):
+                while not entry.granted:
+                    timeout = request_timeout()
+                    if timeout == 0.0:
+                        self.queue.remove(entry)
+                        raise TimeoutError("LLM call deadline passed while waiting for a slot")
+                    self._cond.wait(timeout)
+                entry = entry.epoch
+
+        try:
+            acquired = self.inner is None or self.inner.acquire(blocking=blocking)
+        except BaseException:
+            self._return_slot()
+            raise
+        if not acquired:
+            self._return_slot()
+            return False
+        self._start(entry)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        with self._cond:
+            entry = self._enter(blocking)
+            if entry is None:
+                return False
+
+        if not isinstance(entry, int):
+            waiter = entry
+            try:
+                while not waiter.granted:
+                    if request_timeout() == 0.0:
+                        raise TimeoutError("LLM call deadline passed while waiting for a slot")
+                    await asyncio.sleep(0.01)
+            except (asyncio.CancelledError, TimeoutError):
+                with self._cond:
+                    if waiter.granted:
+                        self.in_flight -= 1
+                        self._dispatch()
+                    else:
+                        self.queue.remove(waiter)
+                raise
+            entry = waiter.epoch
+
+        try:
+            acquired = self.inner is None or await self.inner.aacquire(blocking=blocking)
+        except BaseException:
+            self._return_slot()
+            raise
+        if not acquired:
+            self._return_slot()
+            return False
+        self._start(entry)
+        return True
+
+    def _return_slot(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def release(self, error: Optional[BaseException] = None):
+        """
+        End the call holding a slot in this context and adjust the limit.
+
+        Does nothing if the context holds no slot (e.g. a cached response).
+        """
+        slot = _slot.get()
+        if slot is None or slot[0] is not self:
+            return
+        _slot.set(None)
+        _, started, epoch = slot
+        latency = time.time() - started
+
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+
+            if error is None:
+                healthy = self.latency is None or latency <= self.latency_tolerance * self.latency
+                self.last_latency = latency
+                self.latency = latency if self.latency is None else (
+                    (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * latency
+                )
+                if healthy and saturated and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.increases += 1
+            else:
+                self.errors += 1
+                # A call cut off at its own llm_deadline says nothing about the provider
+                if is_overload(error) and epoch == self._epoch and request_timeout() != 0.0:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._epoch += 1
+                    self.decreases += 1
+
+            self._dispatch()
+
+    def stats(self) -> Dict:
+        """Current limit, load and latency for this process."""
+        with self._cond:
+            return {
+                "provider": self.provider,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self.queue),
+                "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+                "last_latency_seconds": round(self.last_latency, 3) if self.last_latency is not None else None,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "errors": self.errors,
+                **self.queue.stats()
+            }
+
+
+_limiters: Dict[str, Optional[AdaptiveConcurrencyLimiter]] = {}
+_lock = threading.Lock()
+
+
+def get_concurrency_limiter(provider: str = None) -> Optional[AdaptiveConcurrencyLimiter]:
+    """
+    Process-wide concurrency limiter for a provider, or None if disabled.
+
+    Wraps the provider's rate limiter, so chat models need only this one.
+    """
+    if not settings.ADAPTIVE_CONCURRENCY:
+        return None
+
+    provider = provider or settings.LLM_PROVIDER
+
+    with _lock:
+        if provider not in _limiters:
+            _limiters[provider] = AdaptiveConcurrencyLimiter(
+                provider,
+                initial=min(settings.LLM_INITIAL_CONCURRENCY, settings.LLM_MAX_CONCURRENCY),
+                max_limit=settings.LLM_MAX_CONCURRENCY,
+                inner=get_rate_limiter(provider),
+                aging_seconds=settings.LLM_PRIORITY_AGING_SECONDS
+            )
+
+    return _limiters[provider]
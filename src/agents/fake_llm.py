@@ -0,0 +1,278 @@
+"""Offline, deterministic fake chat model (LLM_PROVIDER=fake).
+
+Answers every agent with schema-valid JSON, chosen by the schema it was
+asked for: the schema passed to with_structured_output, or the JSON schema
+appended to the prompt on the JSON-prompt path. Prompts without a schema
+(e.g. chat follow-ups) get a plain-text answer.
+
+Simulated provider behaviour:
+
+- latency: prompt processing time per input token, a time to first token
+  drawn from a fixed, uniform or lognormal distribution, then a fixed time
+  per output token, where a token is ~4 characters
+- streaming: the answer arrives in ~4 character chunks
+- failures: injected errors and 429s at configurable rates, and 429s for
+  calls over ``capacity`` concurrent requests
+- timeouts: inside an ``llm_deadline`` block a call that would outlast
+  the deadline waits until it and raises TimeoutError, like a client
+  whose request timed out
+
+Random draws come from one generator seeded with ``seed``, so a run with
+the same calls in the same order behaves the same.
+"""
+import json
+import math
+import random
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+from .scheduler import simulated_wait
+
+# The top-level schema title is the last one in the appended JSON schema
+_TITLE_RE = re.compile(r"'title': '(\w+)'")
+# The user's question in chat prompts
+_QUESTION_RE = re.compile(r"question:\s*(.+)", re.IGNORECASE)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+class FakeProviderError(RuntimeError):
+    """An error injected by the fake provider."""
+
+
+def fake_payload(title: str, factors: int) -> dict:
+    """Schema-valid output for one agent schema."""
+    names = [f"Factor {i + 1}" for i in range(factors)]
+
+    if title == "PlannerOutput":
+        return {
+            "factors": [
+                {"name": name, "description": f"Why {name.lower()} matters for this decision",
+                 "category": "financial"}
+                for name in names
+            ],
+            "decision_summary": "A decision with several independent evaluation factors."
+        }
+    if title == "QuickPlanOutput":
+        return {
+            "factors": [
+                {"name": name, "description": f"Why {name.lower()} matters for this decision",
+                 "category": "financial", "insights": f"A brief insight on {name.lower()}."}
+                for name in names[:6]
+            ],
+            "decision_summary": "A decision with several independent evaluation factors."
+        }
+    if title == "FactorAnalysis":
+        return {
+            "factor_name": names[0],
+            "insights": "Detailed insight about how this factor affects the decision. " * 3,
+            "data_points": ["A relevant data point", "Another relevant data point"]
+        }
+    if title == "ResearchOutput":
+        return {
+            "analyses": [
+                {**fake_payload("FactorAnalysis", 1), "factor_name": name} for name in names
+            ],
+            "overall_context": "Overall context for the decision."
+        }
+    if title == "RiskOutput":
+        return {
+            "risk_scores": [
+                {"factor_name": name, "score": 5.0, "reasoning": "Moderate risk.", "severity": "medium"}
+                for name in names
+            ],
+            "overall_risk_level": 5.0,
+            "risk_summary": "Moderate overall risk."
+        }
+    if title == "OpportunityOutput":
+        return {
+            "opportunity_scores": [
+                {"factor_name": name, "score": 7.0, "reasoning": "Good upside.", "potential": "high"}
+                for name in names
+            ],
+            "overall_opportunity_level": 7.0,
+            "opportunity_summary": "Good overall opportunity."
+        }
+    if title == "RiskOpportunityOutput":
+        return {
+            "risk": fake_payload("RiskOutput", factors),
+            "opportunity": fake_payload("OpportunityOutput", factors)
+        }
+    if title == "Recommendation":
+        return {
+            "decision": "The decision",
+            "recommendation": "Proceed with caution",
+            "confidence_level": 0.7,
+            "key_insights": ["Insight one", "Insight two", "Insight three"],
+            "risk_reward_balance": "Opportunity outweighs risk.",
+            "next_steps": [{"action": "Do research", "priority": "high", "timeframe": "1 month"}],
+            "overall_risk_score": 5.0,
+            "overall_opportunity_score": 7.0
+        }
+    raise ValueError(f"No fake payload for schema {title}")
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers agent schemas offline with simulated latency."""
+
+    model_name: str = "fake"
+    factors: int = 5
+    first_token_s: float = 0.3
+    per_token_s: float = 0.01
+    prefill_per_token_s: float = 0.0
+    latency_distribution: str = "fixed"
+    # Spread of the time to first token: +/- fraction (uniform) or sigma (lognormal)
+    latency_jitter: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Concurrent calls served before answering 429 (0 = unlimited)
+    capacity: int = 0
+    # Answer with_structured_output; False forces agents onto the JSON-prompt path
+    structured_output: bool = True
+    seed: int = 0
+    calls: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unsupported latency distribution: {self.latency_distribution}. "
+                f"Use one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "factors": self.factors}
+
+    def with_structured_output(self, schema, **kwargs):
+        if not self.structured_output:
+            raise NotImplementedError("Structured output disabled for this fake model")
+        # Reported to callbacks like the real providers' structured output
+        structured = {"kwargs": {"method": "json_schema"}, "schema": schema}
+        return self.bind(response_schema=schema, ls_structured_output_format=structured) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
+
+    def _draw(self) -> float:
+        """Uniform draw in [0, 1) from the seeded generator."""
+        with self._lock:
+            return self._rng.random()
+
+    def _time_to_first_token(self, prompt_tokens: int) -> float:
+        base = self.first_token_s
+        if self.latency_distribution == "uniform":
+            base *= 1 + self.latency_jitter * (2 * self._draw() - 1)
+        elif self.latency_distribution == "lognormal":
+            # Median first_token_s, long right tail
+            with self._lock:
+                base *= math.exp(self._rng.gauss(0.0, self.latency_jitter))
+        return max(0.0, base) + self.prefill_per_token_s * prompt_tokens
+
+    def _response(self, messages: List[BaseMessage], schema: Optional[type[BaseModel]]) -> str:
+        """Count the call, inject failures and build the answer text."""
+        with self._lock:
+            self.calls += 1
+            over_capacity = self.capacity and self._in_flight > self.capacity
+
+        if over_capacity or (self.rate_limit_rate and self._draw() < self.rate_limit_rate):
+            raise FakeProviderError(
+                "Error code: 429 - Rate limit reached for model fake. Please try again in 1.0s."
+            )
+        if self.error_rate and self._draw() < self.error_rate:
+            raise FakeProviderError("Error code: 503 - Fake provider unavailable")
+
+        if schema is not None:
+            return json.dumps(fake_payload(schema.__name__, self.factors))
+
+        prompt = "\n".join(str(m.content) for m in messages)
+        titles = _TITLE_RE.findall(prompt)
+        if titles:
+            return json.dumps(fake_payload(titles[-1], self.factors))
+
+        question = _QUESTION_RE.search(prompt)
+        asked = question.group(1).strip() if question else prompt.strip()[-200:]
+        return f"This is an offline answer from the fake provider. You asked: {asked}"
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(text) // 4 + 1
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    @staticmethod
+    def _wait(seconds: float):
+        """Take ``seconds`` like a request would, timing out at the call's deadline."""
+        simulated_wait(seconds, "Fake provider")
+
+    def _enter(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs
+    ) -> ChatResult:
+        self._enter()
+        try:
+            text = self._response(messages, response_schema)
+            usage = self._usage(messages, text)
+            self._wait(self._time_to_first_token(usage["input_tokens"]) + self.per_token_s * usage["output_tokens"])
+        finally:
+            self._exit()
+
+        message = AIMessage(
+            content=text, usage_metadata=usage, response_metadata={"model_name": self.model_name}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        self._enter()
+        try:
+            text = self._response(messages, response_schema)
+            usage = self._usage(messages, text)
+            self._wait(self._time_to_first_token(usage["input_tokens"]))
+
+            for i in range(0, len(text), 4):
+                self._wait(self.per_token_s)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + 4]))
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            self._exit()
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=usage, response_metadata={"model_name": self.model_name}
+        ))
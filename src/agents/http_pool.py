@@ -0,0 +1,135 @@
+"""Pooled HTTP connections shared by every chat model of a provider."""
+import threading
+from typing import Dict, Optional
+import httpx
+from config import settings
+from .scheduler import request_timeout
+
+# Providers whose chat models talk HTTP through clients we can hand them
+POOLED_PROVIDERS = ("openai", "groq", "ollama")
+
+
+def _http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (it needs the optional h2 package)."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPPool:
+    """
+    One sync and one async HTTP connection pool for one LLM provider.
+
+    Every agent and the chat assistant create their own chat model, and
+    by default each model opens its own connections, so a workflow pays
+    several TCP and TLS handshakes to the same host. Models created with
+    ``chat_model_kwargs()`` share these pools instead; idle connections
+    are kept alive for LLM_HTTP_KEEPALIVE_SECONDS and reused by the next
+    call. HTTP/2 multiplexes concurrent calls over one connection where
+    the provider and the h2 package allow it (not for plain-HTTP Ollama).
+
+    Inside an ``llm_deadline`` block every request's timeouts are cut to
+    the time left, so a call still running at the deadline is cancelled
+    by its client and ends (releasing its limiter slot) instead of
+    running on.
+
+    The async pool belongs to the event loop that first uses it, e.g. the
+    API's.
+    """
+
+    def __init__(self, provider: str, http2: bool):
+        self.provider = provider
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._requests = 0
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS
+        )
+        self.transport = httpx.HTTPTransport(limits=limits, http2=http2)
+        self.async_transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def _on_request(self, request: httpx.Request):
+        with self._lock:
+            self._requests += 1
+
+        timeout = request_timeout()
+        if timeout is not None:
+            if timeout == 0.0:
+                raise httpx.TimeoutException("LLM call deadline passed", request=request)
+            request.extensions["timeout"] = {
+                name: timeout if limit is None else min(limit, timeout)
+                for name, limit in request.extensions.get("timeout", {}).items()
+            } or httpx.Timeout(timeout).as_dict()
+
+    async def _async_on_request(self, request: httpx.Request):
+        self._on_request(request)
+
+    @property
+    def client(self) -> httpx.Client:
+        """Shared sync client on the pooled transport."""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    transport=self.transport, event_hooks={"request": [self._on_request]}
+                )
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Shared async client on the pooled transport."""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    transport=self.async_transport, event_hooks={"request": [self._async_on_request]}
+                )
+            return self._async_client
+
+    def chat_model_kwargs(self) -> Dict:
+        """Chat model constructor kwargs that route its HTTP calls through this pool."""
+        if self.provider == "ollama":
+            # The ollama package builds its own clients; they share our transports
+            return {
+                "sync_client_kwargs": {"transport": self.transport, "event_hooks": {"request": [self._on_request]}},
+                "async_client_kwargs": {
+                    "transport": self.async_transport, "event_hooks": {"request": [self._async_on_request]}
+                }
+            }
+        return {"http_client": self.client, "http_async_client": self.async_client}
+
+    def stats(self) -> Dict:
+        """Requests through the shared clients and currently open connections."""
+        connections = getattr(getattr(self.transport, "_pool", None), "connections", [])
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "http2": self.http2,
+                "requests": self._requests,
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle())
+            }
+
+
+_pools: Dict[str, HTTPPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_http_pool(provider: str = None) -> Optional[HTTPPool]:
+    """Process-wide HTTP pool for a provider, or None if disabled or not HTTP-based."""
+    provider = provider or settings.LLM_PROVIDER
+    if not settings.LLM_HTTP_POOL or provider not in POOLED_PROVIDERS:
+        return None
+
+    with _pools_lock:
+        if provider not in _pools:
+            http2 = settings.LLM_HTTP2 and provider != "ollama"
+            if http2 and not _http2_available():
+                print("⚠️ LLM_HTTP2 needs the h2 package (pip install httpx[http2]), using HTTP/1.1")
+                http2 = False
+            _pools[provider] = HTTPPool(provider, http2)
+    return _pools[provider]
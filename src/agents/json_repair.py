@@ -0,0 +1,250 @@
+"""Tolerant parsing of the JSON in model responses."""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, get_args, get_origin
+from annotated_types import Ge, Le
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import FieldInfo
+from ..scoring import ScoreValidator
+
+# A fenced block, possibly cut off before its closing fence
+_FENCE_RE = re.compile(r"```[\w-]*[^\S\n]*\n?(.*?)(?:```|$)", re.DOTALL)
+# Numbers and literals that can appear as bare JSON values
+_LITERAL_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+# Bare scores that are not valid JSON numbers, e.g. 7/10 or 80%
+_BARE_SCORE_RE = re.compile(r"-?\d+(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?|\s*%)")
+# A number in a score string such as "7.5", "7/10" or "80%"
+_SCORE_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*(%|/\s*(\d+(?:\.\d+)?))?")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_code_fences(text: str) -> str:
+    """The contents of the first fenced block holding JSON, or the text itself."""
+    for match in _FENCE_RE.finditer(text):
+        if "{" in match.group(1):
+            return match.group(1)
+    return text
+
+
+def _read_string(text: str, i: int) -> Tuple[str, bool]:
+    """The string literal starting at text[i] and whether it is terminated."""
+    j = i + 1
+    while j < len(text):
+        if text[j] == "\\":
+            j += 2
+        elif text[j] == '"':
+            return text[i:j + 1], True
+        else:
+            j += 1
+    # Cut off, possibly in the middle of an escape sequence
+    return re.sub(r"\\(u[0-9a-fA-F]{0,3})?$", "", text[i:]) + '"', False
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse the first JSON object in a model response, repairing it if needed.
+
+    Code fences and text around the object are ignored, and so are stray
+    words between its values. Trailing commas are dropped, missing ones
+    added, and bare scores like 7/10 quoted for coerce_scores. A response that
+    was cut off is closed after its last complete value: a cut-off string
+    value is kept up to where it ends, while a dangling key, a cut-off
+    number or literal is dropped.
+
+    Raises:
+        ValueError: If the response contains no JSON object
+    """
+    text = strip_code_fences(text)
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON found in response")
+
+    out: List[str] = []
+    # Open containers: [bracket, expected next ("key", "colon", "value" or "comma"), comma pending]
+    stack: List[List] = []
+    # Output length and open brackets where closing them yields valid JSON
+    safe: Tuple[int, Tuple[str, ...]] = (0, ())
+
+    def mark_safe():
+        nonlocal safe
+        safe = (len(out), tuple(c[0] for c in stack))
+
+    def begin(kind: str) -> bool:
+        """Start a key or value if one is expected here, adding a deferred comma."""
+        if not stack:
+            return kind == "value" and not out
+        container = stack[-1]
+        if container[1] == "comma" and kind == ("key" if container[0] == "{" else "value"):
+            # A missing comma
+            container[2] = True
+        elif container[1] != kind:
+            return False
+        if container[2]:
+            out.append(",")
+            container[2] = False
+        return True
+
+    def value_done():
+        if stack:
+            stack[-1][1] = "comma"
+        mark_safe()
+
+    i = start
+    while i < len(text):
+        char = text[i]
+
+        if char == '"':
+            literal, terminated = _read_string(text, i)
+            i += len(literal) if terminated else len(text)
+            if begin("key"):
+                out.append(literal)
+                stack[-1][1] = "colon"
+            elif begin("value"):
+                out.append(literal)
+                value_done()
+            continue
+
+        if char in "{[":
+            if begin("value"):
+                out.append(char)
+                stack.append([char, "key" if char == "{" else "value", False])
+                mark_safe()
+        elif char in "}]":
+            if not stack:
+                break
+            if stack[-1][1] in ("colon", "value") and stack[-1][0] == "{":
+                # A key without a value
+                del out[safe[0]:]
+            out.append(_CLOSERS[stack.pop()[0]])
+            value_done()
+            if not stack:
+                break
+        elif char == ":":
+            if stack and stack[-1][1] == "colon":
+                out.append(char)
+                stack[-1][1] = "value"
+        elif char == ",":
+            if stack and stack[-1][1] == "comma":
+                stack[-1][1] = "key" if stack[-1][0] == "{" else "value"
+                stack[-1][2] = True
+        else:
+            match = _BARE_SCORE_RE.match(text, i) or _LITERAL_RE.match(text, i)
+            # A literal at the very end may have been cut off ("tr", "7" of "75")
+            if match and match.end() < len(text) and stack and stack[-1][1] == "value" and begin("value"):
+                literal = match.group()
+                out.append(json.dumps(literal) if match.re is _BARE_SCORE_RE else literal)
+                value_done()
+                i = match.end()
+                continue
+        i += 1
+
+    if stack:
+        length, brackets = safe
+        out = out[:length] + [_CLOSERS[b] for b in reversed(brackets)]
+    return json.loads("".join(out), strict=False)
+
+
+def _bounds(field: FieldInfo) -> Tuple[Optional[float], Optional[float]]:
+    low = high = None
+    for constraint in field.metadata:
+        if isinstance(constraint, Ge):
+            low = constraint.ge
+        elif isinstance(constraint, Le):
+            high = constraint.le
+    return low, high
+
+
+def _coerce_score(value: Any, field: FieldInfo) -> Any:
+    """A float field's value as a number within its bounds."""
+    low, high = _bounds(field)
+
+    if isinstance(value, str):
+        match = _SCORE_RE.search(value)
+        if not match:
+            return value
+        number = float(match.group(1))
+        if match.group(2) == "%":
+            number = number / 100 * (high if high is not None else 100)
+        elif match.group(3) and float(match.group(3)) and high is not None:
+            # "7/10" on a 0-10 scale, "4/5" on a 0-1 scale
+            number = number / float(match.group(3)) * high
+        value = number
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return ScoreValidator.clamp_score(
+            float(value),
+            low if low is not None else float("-inf"),
+            high if high is not None else float("inf")
+        )
+    return value
+
+
+def _model_type(annotation) -> Optional[type[BaseModel]]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def coerce_scores(data: Any, schema: type[BaseModel]) -> Any:
+    """
+    Convert the score strings in parsed JSON to floats and clamp them.
+
+    Every float field of ``schema`` and of its nested models and lists of
+    models is converted ("7.5", "7/10", "80%") and clamped into the
+    field's bounds with ScoreValidator. ``data`` is updated in place.
+    """
+    if not isinstance(data, dict):
+        return data
+
+    for name, field in schema.model_fields.items():
+        if name not in data:
+            continue
+        annotation = field.annotation
+        if annotation is float:
+            data[name] = _coerce_score(data[name], field)
+        elif _model_type(annotation):
+            coerce_scores(data[name], annotation)
+        elif get_origin(annotation) in (list, List) and _model_type(get_args(annotation)[0]):
+            for item in data[name] if isinstance(data[name], list) else []:
+                coerce_scores(item, get_args(annotation)[0])
+    return data
+
+
+def _describe(schema: type[BaseModel], loc: Tuple) -> str:
+    """The description of the field at a validation error location."""
+    field = None
+    for part in loc:
+        if isinstance(part, int) or schema is None:
+            continue
+        field = schema.model_fields.get(part)
+        if field is None:
+            return ""
+        annotation = field.annotation
+        schema = _model_type(annotation) or (
+            _model_type(get_args(annotation)[0]) if get_origin(annotation) in (list, List) else None
+        )
+    return (field.description or "") if field else ""
+
+
+def missing_fields(error: ValidationError, schema: type[BaseModel]) -> Optional[Dict[str, str]]:
+    """
+    Paths ("risk_scores.4.severity") and descriptions of missing fields.
+
+    Returns None if the data has other errors too, since asking for the
+    missing fields alone would not make it valid.
+    """
+    errors = error.errors()
+    if any(e["type"] != "missing" for e in errors):
+        return None
+    return {".".join(str(part) for part in e["loc"]): _describe(schema, e["loc"]) for e in errors}
+
+
+def set_path(data: Dict, path: str, value: Any):
+    """Set a value at a path from missing_fields, creating objects on the way."""
+    parts = [int(part) if part.isdigit() else part for part in path.split(".")]
+    for part in parts[:-1]:
+        if isinstance(data, list):
+            data = data[part]
+        else:
+            data = data.setdefault(part, {})
+    data[parts[-1]] = value
@@ -0,0 +1,88 @@
+"""Incremental JSON parsing for streamed agent outputs."""
+import json
+from typing import Any, List, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Emits the elements of one top-level array as soon as each is complete.
+
+    Feed it raw model output chunk by chunk. For a response like
+    ``{"factors": [{...}, {...}], "decision_summary": "..."}`` and
+    ``array_key="factors"``, every factor object is returned from ``feed``
+    the moment its closing brace arrives, long before the document ends.
+    Text before the first ``{`` (prose, code fences) is ignored.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_key: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_target = False
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk and return any array elements it completed."""
+        self.text += chunk
+        items = []
+
+        while self._pos < len(self.text) and not self._done:
+            i = self._pos
+            char = self.text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._string_start is not None:
+                        self._last_key = json.loads(self.text[self._string_start:i + 1])
+                    self._string_start = None
+                continue
+
+            if not self._stack and char != "{":
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":" and len(self._stack) == 1:
+                self._current_key = self._last_key
+            elif char in "{[":
+                if char == "[" and len(self._stack) == 1 and self._current_key == self.array_key:
+                    self._in_target = True
+                elif char == "{" and self._in_target and len(self._stack) == 2:
+                    self._item_start = i
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._in_target and len(self._stack) == 2 and self._item_start is not None:
+                    try:
+                        items.append(json.loads(self.text[self._item_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                elif char == "]" and self._in_target and len(self._stack) == 1:
+                    self._in_target = False
+                elif not self._stack:
+                    self._done = True
+
+        return items
+
+    def document(self) -> str:
+        """The JSON document seen so far, without surrounding prose."""
+        start = self.text.find("{")
+        end = self.text.rfind("}") + 1
+        return self.text[start:end] if start >= 0 and end > start else ""
@@ -0,0 +1,151 @@
+"""Per-agent token, latency and cost accounting of LLM calls."""
+import time
+from typing import Dict, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import ensure_config
+from config import settings
+from .scheduler import current_priority
+
+# List prices in USD per million (input, output) tokens; other models cost 0
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "mixtral-8x7b-32768": (0.24, 0.24),
+}
+
+
+def call_cost(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    """USD cost of a call at the model's list price."""
+    input_price, output_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _attribution(metadata: Optional[Dict]) -> Dict:
+    """
+    Agent, user and run of a call from its callback metadata.
+
+    Agents tag their calls with ``agent``; inside the workflow LangGraph
+    adds the run's ``thread_id`` and the ``user_id`` it was started with.
+    Outside the workflow the user comes from ``llm_priority``.
+    """
+    metadata = metadata or {}
+    user_id = metadata.get("user_id")
+    return {
+        "agent": metadata.get("agent") or metadata.get("langgraph_node") or "unknown",
+        "user_id": user_id if user_id is not None else current_priority()[1],
+        "run_id": metadata.get("thread_id")
+    }
+
+
+def _write(**fields):
+    """Persist one ledger row; accounting never fails the call it describes."""
+    from ..history.history_manager import HistoryManager
+
+    try:
+        HistoryManager.record_usage(**fields)
+    except Exception as e:
+        print(f"⚠️ Could not record LLM usage: {e}")
+
+
+def _model(invocation_params: Optional[Dict]) -> Optional[str]:
+    """Model a call was made with, from the chat model's invocation params."""
+    return (invocation_params or {}).get("model") or (invocation_params or {}).get("model_name")
+
+
+class LedgerHandler(BaseCallbackHandler):
+    """Records every call of a provider's chat models to the usage ledger."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._calls: Dict = {}
+
+    def _start(self, run_id, metadata, invocation_params):
+        self._calls[run_id] = (time.time(), _attribution(metadata), _model(invocation_params))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        self._start(run_id, metadata, invocation_params)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        self._start(run_id, metadata, invocation_params)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        started, attribution, model = call
+
+        input_tokens = output_tokens = cached_tokens = 0
+        for generation in (g for batch in response.generations for g in batch):
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None) or {}
+            input_tokens += usage.get("input_tokens", 0)
+            output_tokens += usage.get("output_tokens", 0)
+            cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+            model = (getattr(message, "response_metadata", None) or {}).get("model_name") or model
+
+        if not input_tokens and not output_tokens:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens = usage.get("prompt_tokens", 0)
+            output_tokens = usage.get("completion_tokens", 0)
+
+        _write(
+            **attribution,
+            provider=self.provider,
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            latency_seconds=time.time() - started,
+            cost=call_cost(model, input_tokens, output_tokens)
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        started, attribution, model = call
+        _write(
+            **attribution,
+            provider=self.provider,
+            model=model,
+            latency_seconds=time.time() - started,
+            error=f"{type(error).__name__}: {error}"[:200]
+        )
+
+
+def record_cache_hit(agent: str, llm):
+    """
+    Record an agent answered from a local cache instead of ``llm``, its model.
+
+    The provider and model are the ones LedgerHandler records for the
+    model's calls, so hits count against the model a run overrides to.
+    """
+    if not settings.USAGE_LEDGER:
+        return
+    handler = next((c for c in getattr(llm, "callbacks", None) or [] if isinstance(c, LedgerHandler)), None)
+    get_params = getattr(llm, "_get_invocation_params", None)
+    metadata = ensure_config().get("metadata") or {}
+    _write(
+        **_attribution({**metadata, "agent": agent}),
+        provider=handler.provider if handler else settings.LLM_PROVIDER,
+        model=_model(get_params() if get_params else getattr(llm, "_identifying_params", None)),
+        latency_seconds=0.0,
+        cache_hit=True
+    )
+
+
+_handlers: Dict[str, LedgerHandler] = {}
+
+
+def get_ledger_handler(provider: str = None) -> Optional[LedgerHandler]:
+    """Process-wide ledger callback for a provider, or None if disabled."""
+    if not settings.USAGE_LEDGER:
+        return None
+
+    provider = provider or settings.LLM_PROVIDER
+    return _handlers.setdefault(provider, LedgerHandler(provider))
@@ -3,6 +3,40 @@ from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from langchain_core.language_models import BaseChatModel
 from config import settings
+from .rate_limit import get_rate_limiter
+from .concurrency import get_concurrency_limiter
+from .ledger import get_ledger_handler
+from .http_pool import get_http_pool
+
+
+def _limits(provider: str) -> dict:
+    """Chat model kwargs that route calls through the provider's shared limiters and usage ledger."""
+    rate_limiter = get_rate_limiter(provider)
+    concurrency = get_concurrency_limiter(provider)
+    ledger = get_ledger_handler(provider)
+    
+    callbacks = []
+    if concurrency:
+        callbacks.append(concurrency.release_handler)
+    if rate_limiter:
+        callbacks.append(rate_limiter.usage_handler)
+    if ledger:
+        callbacks.append(ledger)
+    
+    limits = {"callbacks": callbacks} if callbacks else {}
+    gate = concurrency or rate_limiter
+    if gate:
+        limits["rate_limiter"] = gate
+    return limits
+
+
+def _recording(limits: dict, provider: str, model: str) -> dict:
+    """Chat model kwargs that also record every call to the cassette."""
+    from .cassette import CassetteRecorder, RecordingGate, get_cassette
+    return {
+        "rate_limiter": RecordingGate(limits.get("rate_limiter")),
+        "callbacks": limits.get("callbacks", []) + [CassetteRecorder(get_cassette(), provider, model)]
+    }
 
 
 def create_llm(model_name: str = None, temperature: float = None):
@@ -14,22 +48,34 @@ def create_llm(model_name: str = None, temperature: float = None):
         temperature: Override temperature (uses settings default if None)
         
     Returns:
-        LLM instance
+        LLM instance; chat models share the provider's concurrency and rate
+        limits and its pooled HTTP connections
     """
     model = model_name or settings.MODEL_NAME
     temp = temperature if temperature is not None else settings.TEMPERATURE
     
+    limits = _limits(settings.LLM_PROVIDER)
+    if settings.LLM_CASSETTE_RECORD and settings.LLM_PROVIDER != "replay":
+        limits = _recording(limits, settings.LLM_PROVIDER, model)
+    
+    pool = get_http_pool(settings.LLM_PROVIDER)
+    http = pool.chat_model_kwargs() if pool else {}
+    
     if settings.LLM_PROVIDER == "openai":
         return ChatOpenAI(
             model=model,
-            temperature=temp
+            temperature=temp,
+            **http,
+            **limits
         )
     
     elif settings.LLM_PROVIDER == "groq":
         return ChatGroq(
             model=model,
             temperature=temp,
-            groq_api_key=settings.GROQ_API_KEY
+            groq_api_key=settings.GROQ_API_KEY,
+            **http,
+            **limits
         )
     
     elif settings.LLM_PROVIDER == "huggingface_api":
@@ -44,15 +90,43 @@ def create_llm(model_name: str = None, temperature: float = None):
         )
     
     elif settings.LLM_PROVIDER == "ollama":
-        from langchain_ollama import ChatOllama
-        return ChatOllama(
+        from .ollama import ConstrainedChatOllama, keep_alive
+        return ConstrainedChatOllama(
             model=model,
             temperature=temp,
-            base_url=settings.OLLAMA_BASE_URL
+            base_url=settings.OLLAMA_BASE_URL,
+            keep_alive=keep_alive(),
+            **http,
+            **limits
+        )
+    
+    elif settings.LLM_PROVIDER == "fake":
+        from .fake_llm import FakeChatModel
+        return FakeChatModel(
+            model_name=model,
+            factors=settings.FAKE_LLM_FACTORS,
+            first_token_s=settings.FAKE_LLM_TTFT,
+            per_token_s=settings.FAKE_LLM_PER_TOKEN,
+            prefill_per_token_s=settings.FAKE_LLM_PREFILL_PER_TOKEN,
+            latency_distribution=settings.FAKE_LLM_LATENCY,
+            latency_jitter=settings.FAKE_LLM_JITTER,
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            rate_limit_rate=settings.FAKE_LLM_RATE_LIMIT_RATE,
+            capacity=settings.FAKE_LLM_CAPACITY,
+            seed=settings.FAKE_LLM_SEED,
+            **limits
+        )
+    
+    elif settings.LLM_PROVIDER == "replay":
+        from .cassette import ReplayChatModel, get_cassette
+        return ReplayChatModel(
+            cassette=get_cassette(),
+            latency_scale=settings.LLM_CASSETTE_LATENCY_SCALE,
+            **limits
         )
     
     else:
         raise ValueError(
             f"Unsupported LLM provider: {settings.LLM_PROVIDER}. "
-            "Use 'openai', 'groq', 'huggingface_api', or 'ollama'"
+            "Use 'openai', 'groq', 'huggingface_api', 'ollama', 'fake', or 'replay'"
         )
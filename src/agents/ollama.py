@@ -0,0 +1,237 @@
+"""Ollama models with per-model capability detection."""
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+import httpx
+from langchain_core.runnables import Runnable
+from langchain_ollama import ChatOllama
+from pydantic import BaseModel
+from config import settings
+
+# First Ollama release that constrains decoding to a JSON schema passed as format
+STRUCTURED_OUTPUT_VERSION = (0, 5, 0)
+# How long a failed detection's fallback answer is used before probing again
+DETECTION_RETRY_SECONDS = 60.0
+
+_capabilities: Dict[Tuple[str, str], Dict] = {}
+_capabilities_lock = threading.Lock()
+
+
+def _version(text: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", text)[:3])
+
+
+def model_capabilities(base_url: str, model: str) -> Dict:
+    """
+    What an Ollama server can do with a model, detected once per model.
+
+    Reads the server version from /api/version and the model's
+    capabilities from /api/show. Schema-constrained decoding needs Ollama
+    0.5 or later and a model that generates text. OLLAMA_STRUCTURED_OUTPUT
+    ("true"/"false") skips the detection. If the server cannot be reached
+    schemas are assumed to be supported, and that answer is kept for
+    DETECTION_RETRY_SECONDS so calls to a down server do not each probe it.
+    """
+    if settings.OLLAMA_STRUCTURED_OUTPUT in ("true", "false"):
+        return {"structured_output": settings.OLLAMA_STRUCTURED_OUTPUT == "true", "detected": False}
+
+    key = (base_url.rstrip("/"), model)
+    with _capabilities_lock:
+        cached = _capabilities.get(key)
+        if cached is not None and cached.get("retry_at", float("inf")) > time.time():
+            return cached
+
+    try:
+        with httpx.Client(base_url=key[0], timeout=5.0) as client:
+            version = client.get("/api/version").json().get("version", "0")
+            show = client.post("/api/show", json={"model": model})
+            show.raise_for_status()
+            listed = show.json().get("capabilities")
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"⚠️ Could not detect Ollama capabilities of {model}: {e}")
+        fallback = {"structured_output": True, "detected": False, "retry_at": time.time() + DETECTION_RETRY_SECONDS}
+        with _capabilities_lock:
+            _capabilities[key] = fallback
+        return fallback
+
+    capabilities = {
+        "server_version": version,
+        "capabilities": listed,
+        # Older servers do not list capabilities; their models generate text
+        "structured_output": _version(version) >= STRUCTURED_OUTPUT_VERSION and (
+            listed is None or "completion" in listed
+        ),
+        "detected": True
+    }
+    with _capabilities_lock:
+        _capabilities[key] = capabilities
+    return capabilities
+
+
+class ConstrainedChatOllama(ChatOllama):
+    """
+    ChatOllama that constrains structured output to the schema while decoding.
+
+    Where the server and model support it, the Pydantic schema is passed
+    as Ollama's ``format`` so the model can only produce matching JSON.
+    Otherwise with_structured_output raises NotImplementedError, so agents
+    fall back to prompting for JSON, which is then held to valid JSON
+    with ``format="json"``.
+    """
+
+    def _constrained(self) -> bool:
+        return model_capabilities(self.base_url or settings.OLLAMA_BASE_URL, self.model)["structured_output"]
+
+    def with_structured_output(self, schema, *, method=None, include_raw: bool = False, **kwargs):
+        if method is None:
+            if not self._constrained():
+                raise NotImplementedError(f"Ollama cannot constrain {self.model} to a JSON schema")
+            method = "json_schema"
+        return super().with_structured_output(schema, method=method, include_raw=include_raw, **kwargs)
+
+    def json_output(self, schema: type[BaseModel]) -> Tuple[Runnable, bool]:
+        """This model held to JSON for raw answers, and whether to ``schema`` itself."""
+        if self._constrained():
+            return self.bind(format=schema.model_json_schema()), True
+        return self.bind(format="json"), False
+
+
+def keep_alive() -> Union[int, str]:
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: seconds as a number, or a duration like "30m"."""
+    value = settings.OLLAMA_KEEP_ALIVE
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def tagged_model(model: str) -> str:
+    """Model name as /api/ps lists it ("llama3.2" -> "llama3.2:latest")."""
+    return model if ":" in model else f"{model}:latest"
+
+
+class WarmupManager:
+    """
+    Keeps Ollama models loaded so no analysis pays for loading them.
+
+    Every model is loaded at startup with the configured keep-alive, and a
+    background thread checks /api/ps every ``interval`` seconds, reloading
+    models the server has unloaded (after an idle keep-alive ran out, a
+    restart or memory pressure). Calls from ConstrainedChatOllama extend
+    the same keep-alive, so models in use never expire.
+    """
+
+    def __init__(self, base_url: str, models: List[str], interval: float):
+        self.base_url = base_url.rstrip("/")
+        self.models = list(dict.fromkeys(models))
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._status: Dict[str, Dict] = {
+            model: {"loaded": False, "expires_at": None, "last_warmup": None, "warmup_seconds": None, "error": None}
+            for model in self.models
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, model: str) -> float:
+        """Load a model with the configured keep-alive; returns the seconds it took."""
+        start = time.perf_counter()
+        try:
+            # A request without a prompt only loads the model
+            with httpx.Client(base_url=self.base_url, timeout=300.0) as client:
+                response = client.post("/api/generate", json={"model": model, "keep_alive": keep_alive()})
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            with self._lock:
+                self._status[model].update(loaded=False, error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._status[model].update(
+                loaded=True,
+                last_warmup=datetime.utcnow().isoformat(),
+                warmup_seconds=round(elapsed, 3),
+                error=None
+            )
+        return elapsed
+
+    def refresh(self):
+        """Reload every model that is not loaded right now."""
+        try:
+            with httpx.Client(base_url=self.base_url, timeout=5.0) as client:
+                running = {m["name"]: m.get("expires_at") for m in client.get("/api/ps").json().get("models", [])}
+        except (httpx.HTTPError, ValueError) as e:
+            with self._lock:
+                for status in self._status.values():
+                    status.update(loaded=False, error=f"{type(e).__name__}: {e}"[:200])
+            return
+
+        for model in self.models:
+            with self._lock:
+                self._status[model].update(loaded=tagged_model(model) in running, expires_at=running.get(tagged_model(model)))
+            if tagged_model(model) not in running:
+                try:
+                    print(f"🔥 Warming up Ollama model {model}")
+                    self.warm(model)
+                except httpx.HTTPError as e:
+                    print(f"⚠️ Could not warm up Ollama model {model}: {e}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Warm up now and keep checking in a background thread (idempotent)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="ollama-warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background checks."""
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        """Readiness of every model, for /api/v1/health."""
+        with self._lock:
+            return {
+                "ready": all(s["loaded"] for s in self._status.values()),
+                "keep_alive": keep_alive(),
+                "models": {model: dict(status) for model, status in self._status.items()}
+            }
+
+
+_warmup: Optional[WarmupManager] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup_manager() -> Optional[WarmupManager]:
+    """
+    Process-wide warm-up manager, or None unless Ollama is the provider.
+
+    Manages MODEL_NAME, which every agent uses unless a run overrides it,
+    plus the models in OLLAMA_WARMUP_MODELS.
+    """
+    global _warmup
+
+    if settings.LLM_PROVIDER != "ollama" or not settings.OLLAMA_WARMUP:
+        return None
+
+    with _warmup_lock:
+        if _warmup is None:
+            extra = [m.strip() for m in settings.OLLAMA_WARMUP_MODELS.split(",") if m.strip()]
+            _warmup = WarmupManager(
+                settings.OLLAMA_BASE_URL, [settings.MODEL_NAME] + extra, settings.OLLAMA_WARMUP_INTERVAL
+            )
+    return _warmup
+
+
+def start_warmup() -> Optional[WarmupManager]:
+    """Start keeping the configured Ollama models loaded, if Ollama is the provider."""
+    manager = get_warmup_manager()
+    if manager:
+        manager.start()
+    return manager
@@ -1,13 +1,34 @@
 """Planner Agent - breaks decision into evaluation factors."""
+from typing import Callable, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
+from config import settings
 from .base import BaseAgent
-from ..schemas import PlannerOutput
+from .planner_cache import PlannerCache, planner_cache
+from .ledger import record_cache_hit
+from ..schemas import PlannerOutput, EvaluationFactor
 
 
 class PlannerAgent(BaseAgent):
     """Breaks down a decision into key evaluation factors."""
     
+    def __init__(
+        self,
+        model_name: str = None,
+        temperature: float = None,
+        cache: Optional[PlannerCache] = planner_cache
+    ):
+        super().__init__(model_name=model_name, temperature=temperature)
+        self.cache = cache
+        self.cache_namespace = (
+            f"{settings.LLM_PROVIDER}:{model_name or settings.MODEL_NAME}:"
+            f"{temperature if temperature is not None else settings.TEMPERATURE}"
+        )
+    
+    def _cache_partition(self, context: str, timeframe: str) -> str:
+        """Cache partition of decisions planned with this model, context and timeframe."""
+        return PlannerCache.partition(self.cache_namespace, context, timeframe)
+    
     def get_output_schema(self) -> type[BaseModel]:
         return PlannerOutput
     
@@ -40,9 +61,79 @@ Break this decision into evaluation factors.""")
         ])
     
     def run(self, decision: str, context: str = "", timeframe: str = "") -> PlannerOutput:
-        """Run the planner agent."""
-        return super().run(
+        """Run the planner agent, skipping the LLM when a similar decision is cached."""
+        if self.cache is not None:
+            partition = self._cache_partition(context, timeframe)
+            cached = self.cache.lookup(decision, partition)
+            if cached is not None:
+                print("♻️ Planner cache hit - reusing factors from a similar decision")
+                record_cache_hit(self.name, self.llm)
+                return cached
+        
+        output = super().run(
+            decision=decision,
+            context=context or "No additional context provided",
+            timeframe=timeframe or "Not specified"
+        )
+        
+        if self.cache is not None:
+            self.cache.store(decision, output, partition)
+        
+        return output
+    
+    def stream(
+        self,
+        decision: str,
+        on_factor: Callable[[EvaluationFactor], None],
+        context: str = "",
+        timeframe: str = ""
+    ) -> PlannerOutput:
+        """
+        Run the planner on a token stream, reporting each factor as it completes.
+        
+        Args:
+            decision: Decision text
+            on_factor: Callback receiving each EvaluationFactor as soon as it is parsed
+            context: Decision context
+            timeframe: Decision timeframe
+            
+        Returns:
+            The complete PlannerOutput
+        """
+        if self.cache is not None:
+            partition = self._cache_partition(context, timeframe)
+            cached = self.cache.lookup(decision, partition)
+            if cached is not None:
+                print("♻️ Planner cache hit - reusing factors from a similar decision")
+                record_cache_hit(self.name, self.llm)
+                for factor in cached.factors:
+                    on_factor(factor)
+                return cached
+        
+        reported = set()
+        
+        def report(item: dict):
+            try:
+                factor = EvaluationFactor(**item)
+            except Exception:
+                return
+            reported.add(factor.name)
+            on_factor(factor)
+        
+        output = self.run_streaming(
+            "factors",
+            report,
             decision=decision,
             context=context or "No additional context provided",
             timeframe=timeframe or "Not specified"
         )
+        
+        # Anything the incremental parser could not validate on its own
+        for factor in output.factors:
+            if factor.name not in reported:
+                on_factor(factor)
+        
+        if self.cache is not None:
+            self.cache.store(decision, output, partition)
+        
+        return output
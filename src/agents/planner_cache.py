@@ -0,0 +1,129 @@
+"""Similarity-keyed cache of planner outputs for common decision archetypes."""
+import hashlib
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from config import settings
+from ..schemas import PlannerOutput
+from ..utils.text_similarity import SimilarityIndex
+
+
+class PlannerCache:
+    """
+    LRU cache of PlannerOutputs looked up by decision-text similarity.
+
+    Decisions that are variants of the same archetype ("switch careers from
+    X to Y", "relocate to Z") need the same evaluation factors, so a close
+    enough match is served without calling the planner LLM, whichever user
+    asked first. Entries are partitioned by namespace; ``partition()``
+    builds one per model, context and timeframe, so outputs of different
+    models never mix and factors planned for one context (often empty) are
+    never served for a different one.
+
+    Only the factors are reused: a hit gets the new decision text as its
+    summary, so no other decision's summary is ever shown.
+    """
+
+    def __init__(self, max_entries: int = 512, threshold: float = 0.75):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._indexes: Dict[str, SimilarityIndex] = {}
+        self._entries: OrderedDict = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def partition(namespace: str, context: Optional[str] = None, timeframe: Optional[str] = None) -> str:
+        """Namespace for decisions with this (normalized) context and timeframe."""
+        def normalize(text: Optional[str]) -> str:
+            return " ".join((text or "").split()).casefold()
+
+        identity = [namespace, normalize(context), normalize(timeframe)]
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def lookup(self, decision: str, namespace: str = "default") -> Optional[PlannerOutput]:
+        """
+        Return factors planned for a similar decision, or None on a miss.
+
+        Args:
+            decision: Decision text
+            namespace: Partition the output must come from (see ``partition``)
+
+        Returns:
+            PlannerOutput with the cached factors and this decision as summary
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            index = self._indexes.get(namespace)
+            matches = index.query(decision, limit=1, threshold=self.threshold) if index else []
+            entry = self._entries.get(matches[0][0]) if matches else None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(matches[0][0])
+            cached = entry[1]
+
+        return PlannerOutput(
+            factors=[factor.model_copy() for factor in cached.factors],
+            decision_summary=decision
+        )
+
+    def store(self, decision: str, output: PlannerOutput, namespace: str = "default"):
+        """Cache a freshly planned output, evicting the least recently used entry if full."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            key = next(self._ids)
+            self._indexes.setdefault(namespace, SimilarityIndex()).add(key, decision)
+            self._entries[key] = (namespace, output)
+
+            while len(self._entries) > self.max_entries:
+                old_key, (old_namespace, _) = self._entries.popitem(last=False)
+                self.evictions += 1
+                index = self._indexes[old_namespace]
+                index.remove(old_key)
+                # Partitions are per context and timeframe; drop empty ones
+                if not len(index):
+                    del self._indexes[old_namespace]
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries)
+        }
+
+
+planner_cache = PlannerCache(
+    max_entries=settings.PLANNER_CACHE_SIZE,
+    threshold=settings.PLANNER_CACHE_THRESHOLD
+)
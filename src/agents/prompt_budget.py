@@ -0,0 +1,214 @@
+"""Token budgets for the prompts of agents downstream of research."""
+import math
+import re
+import threading
+from typing import Dict, List, Tuple
+from langchain_core.prompts import ChatPromptTemplate
+from config import settings
+
+# Word pieces and single punctuation marks, roughly how BPE tokenizers split English
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+# Sentence ends: ., ! or ? followed by whitespace
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Characters per token inside long words
+_CHARS_PER_TOKEN = 6
+# Marks text that was shortened
+ELLIPSIS = "…"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _tiktoken_encoding():
+    """The PROMPT_TOKENIZER tiktoken encoding, or None to use the approximation."""
+    global _encoding
+
+    if settings.PROMPT_TOKENIZER == "approx":
+        return None
+
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(settings.PROMPT_TOKENIZER)
+            except Exception as e:
+                # Missing package, or the encoding file could not be downloaded
+                print(f"⚠️ Tokenizer {settings.PROMPT_TOKENIZER} unavailable, approximating: {e}")
+                _encoding = False
+
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in a text.
+
+    Uses the tiktoken encoding named by PROMPT_TOKENIZER if it is
+    available, otherwise a local approximation: one token per punctuation
+    mark and per 6 characters of a word, which on English prompts comes
+    close to the usual estimate of 4 characters per token.
+    """
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(math.ceil(len(piece) / _CHARS_PER_TOKEN) for piece in _PIECE_RE.findall(text))
+
+
+def compact(text: str, max_tokens: int) -> str:
+    """
+    Shorten a text to at most ``max_tokens`` tokens, deterministically.
+
+    Whitespace is collapsed, then whole sentences are kept from the start
+    while they fit; if not even the first one fits, it is cut at a word
+    boundary. Shortened text ends with an ellipsis.
+    """
+    text = " ".join(text.split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ELLIPSIS
+
+    budget = max_tokens - 1  # for the ellipsis
+    kept: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_RE.split(text):
+        tokens = count_tokens(sentence)
+        if used + tokens > budget:
+            break
+        kept.append(sentence)
+        used += tokens
+
+    if kept:
+        return " ".join(kept) + " " + ELLIPSIS
+
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + ELLIPSIS
+
+
+def allocate(sizes: List[int], available: int) -> List[int]:
+    """
+    Split ``available`` tokens between texts of ``sizes`` tokens.
+
+    Texts smaller than an equal share keep their full size and leave the
+    rest to the others (water-filling), so short texts are never cut to
+    make room for long ones.
+    """
+    shares = [0] * len(sizes)
+    remaining = max(0, available)
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+
+    while pending:
+        share = remaining // len(pending)
+        i = pending[0]
+        if sizes[i] > share:
+            for j in pending:
+                shares[j] = share
+            break
+        shares[i] = sizes[i]
+        remaining -= sizes[i]
+        pending.pop(0)
+
+    return shares
+
+
+class PromptBudget:
+    """
+    Fits agents' prompts to per-agent token budgets and records their sizes.
+
+    The variable parts of a prompt are given as sections of (head, body)
+    lines, e.g. ("- Factor: ", insights). Heads and the rest of the prompt
+    are kept; when the rendered prompt is over budget, the bodies are
+    compacted to share the tokens that are left.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+
+    def fit(
+        self,
+        agent: str,
+        prompt: ChatPromptTemplate,
+        budget: int,
+        kwargs: Dict,
+        sections: Dict[str, List[Tuple[str, str]]]
+    ) -> Dict:
+        """
+        Prompt variables with ``sections`` rendered to fit ``budget`` tokens.
+
+        Args:
+            agent: Agent name the sizes are recorded under
+            prompt: The agent's prompt template
+            budget: Maximum tokens of the rendered prompt (0 = unlimited)
+            kwargs: The other prompt variables
+            sections: Variable name -> (head, body) lines, joined with newlines
+
+        Returns:
+            kwargs plus the rendered sections
+        """
+        def render(bodies: Dict[str, List[str]]) -> Dict:
+            return {
+                **kwargs,
+                **{
+                    name: "\n".join(head + body for (head, _), body in zip(lines, bodies[name]))
+                    for name, lines in sections.items()
+                }
+            }
+
+        full = render({name: [body for _, body in lines] for name, lines in sections.items()})
+        before = count_tokens(prompt.format(**full))
+        if not budget or before <= budget:
+            self._record(agent, before, before)
+            return full
+
+        # What the prompt costs with every body empty is fixed
+        keys = [(name, i) for name, lines in sections.items() for i in range(len(lines))]
+        bodies = [" ".join(sections[name][i][1].split()) for name, i in keys]
+        fixed = count_tokens(prompt.format(**render({name: [""] * len(lines) for name, lines in sections.items()})))
+        shares = allocate([count_tokens(body) for body in bodies], budget - fixed)
+
+        compacted = {name: [] for name in sections}
+        for (name, _), body, share in zip(keys, bodies, shares):
+            compacted[name].append(compact(body, share))
+
+        fitted = render(compacted)
+        after = count_tokens(prompt.format(**fitted))
+        print(f"✂️ Compacted {agent} prompt: {before} → {after} tokens (budget {budget})")
+        self._record(agent, before, after)
+        return fitted
+
+    def _record(self, agent: str, before: int, after: int):
+        with self._lock:
+            stats = self._stats.setdefault(
+                agent, {"prompts": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0, "max_before": 0}
+            )
+            stats["prompts"] += 1
+            stats["compacted"] += after < before
+            stats["tokens_before"] += before
+            stats["tokens_after"] += after
+            stats["max_before"] = max(stats["max_before"], before)
+
+    def stats(self) -> Dict:
+        """Prompt sizes before and after compaction per agent, for this process."""
+        with self._lock:
+            return {
+                agent: {
+                    "prompts": s["prompts"],
+                    "compacted": s["compacted"],
+                    "avg_tokens_before": round(s["tokens_before"] / s["prompts"], 1),
+                    "avg_tokens_after": round(s["tokens_after"] / s["prompts"], 1),
+                    "max_tokens_before": s["max_before"],
+                    "saved": round(1 - s["tokens_after"] / s["tokens_before"], 4) if s["tokens_before"] else 0.0
+                }
+                for agent, s in self._stats.items()
+            }
+
+
+prompt_budget = PromptBudget()
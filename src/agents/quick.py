@@ -0,0 +1,127 @@
+"""Quick analysis agents - a reduced pipeline for fast gut checks."""
+from typing import Tuple
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from .base import BaseAgent
+from ..schemas import (
+    QuickPlanOutput,
+    PlannerOutput,
+    EvaluationFactor,
+    ResearchOutput,
+    FactorAnalysis,
+    RiskOutput,
+    OpportunityOutput,
+    Recommendation
+)
+
+
+class QuickPlannerAgent(BaseAgent):
+    """Identifies evaluation factors and a brief insight for each in one call."""
+    
+    def get_output_schema(self) -> type[BaseModel]:
+        return QuickPlanOutput
+    
+    def get_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are a strategic planning expert giving a fast first read on a decision.
+
+Identify the 3-6 factors that matter most. For each factor give:
+- A short name and one-line description
+- Category: financial, personal, professional, social, or health
+- One or two sentences of insight on how it bears on this decision
+
+Be brief and concrete."""),
+            ("user", """Decision: {decision}
+
+Context: {context}
+Timeframe: {timeframe}
+
+Identify the key factors with a brief insight for each.""")
+        ])
+    
+    def run(self, decision: str, context: str = "", timeframe: str = "") -> Tuple[PlannerOutput, ResearchOutput]:
+        """Run the quick planner."""
+        output = super().run(
+            decision=decision,
+            context=context or "No additional context provided",
+            timeframe=timeframe or "Not specified"
+        )
+        
+        planner_output = PlannerOutput(
+            factors=[
+                EvaluationFactor(name=f.name, description=f.description, category=f.category)
+                for f in output.factors
+            ],
+            decision_summary=output.decision_summary
+        )
+        research_output = ResearchOutput(
+            analyses=[
+                FactorAnalysis(factor_name=f.name, insights=f.insights)
+                for f in output.factors
+            ],
+            overall_context=output.decision_summary
+        )
+        return planner_output, research_output
+
+
+class QuickStrategistAgent(BaseAgent):
+    """Explains a deterministic recommendation in a few lines."""
+    
+    def get_output_schema(self) -> type[BaseModel]:
+        return Recommendation
+    
+    def get_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are a strategic advisor giving a quick gut check.
+
+The recommendation has already been determined from the scores. Do not change it.
+Provide only:
+- Exactly 3 short key insights
+- A one-sentence risk-reward balance
+- 1-2 concrete next steps (priority high/medium/low, with a timeframe)
+- A confidence level (0-1) reflecting how much a deeper analysis could change this
+
+Keep every item to one sentence."""),
+            ("user", """Decision: {decision}
+
+Recommendation: {recommendation}
+Overall Risk Score: {overall_risk}/10
+Overall Opportunity Score: {overall_opportunity}/10
+
+Factor Scores:
+{factor_scores}
+
+Explain this recommendation briefly.""")
+        ])
+    
+    def run(
+        self,
+        decision: str,
+        recommendation: str,
+        risk_output: RiskOutput,
+        opportunity_output: OpportunityOutput,
+        overall_risk: float,
+        overall_opportunity: float
+    ) -> Recommendation:
+        """Run the quick strategist."""
+        opportunities = {o.factor_name: o.score for o in opportunity_output.opportunity_scores}
+        factor_scores = "\n".join([
+            f"- {r.factor_name}: risk {r.score}/10, opportunity {opportunities.get(r.factor_name, 'n/a')}/10"
+            for r in risk_output.risk_scores
+        ])
+        
+        result = super().run(
+            decision=decision,
+            recommendation=recommendation,
+            overall_risk=overall_risk,
+            overall_opportunity=overall_opportunity,
+            factor_scores=factor_scores
+        )
+        
+        # The recommendation and scores are deterministic, not the model's
+        result.decision = decision
+        result.recommendation = recommendation
+        result.overall_risk_score = overall_risk
+        result.overall_opportunity_score = overall_opportunity
+        
+        return result
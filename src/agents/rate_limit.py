@@ -0,0 +1,430 @@
+"""Provider-aware request and token rate limiting for LLM calls."""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from config import settings
+from .scheduler import request_timeout
+
+# Default (requests per minute, tokens per minute) per provider, from the
+# free or entry tiers. Local providers are not limited unless configured.
+PROVIDER_LIMITS = {
+    "groq": (30, 12000),
+    "openai": (500, 200000),
+}
+
+# Cool-down after a 429 that does not say when to retry
+DEFAULT_RETRY_AFTER = 10.0
+
+_RETRY_AFTER_RE = re.compile(r"try again in (?:(\d+)m)?([\d.]+)s", re.IGNORECASE)
+
+# (bucket, capacity, refill per second, amount)
+Demand = Tuple[str, float, float, float]
+
+
+def _refill(level: float, updated: float, capacity: float, rate: float, now: float) -> float:
+    """Bucket level after refilling since ``updated``."""
+    return min(capacity, level + max(0.0, now - updated) * rate)
+
+
+def _shortfall(levels: List[float], demands: List[Demand]) -> float:
+    """Seconds until every bucket holds its demand (0 if they all do now)."""
+    wait = 0.0
+    for level, (_, _, rate, amount) in zip(levels, demands):
+        if level < amount:
+            wait = max(wait, (amount - level) / rate)
+    return wait
+
+
+class BucketBackend(ABC):
+    """Storage for token bucket levels."""
+
+    name = "base"
+
+    @abstractmethod
+    def take(self, demands: List[Demand]) -> float:
+        """
+        Atomically take every demand if all buckets hold enough.
+
+        Returns:
+            0.0 if taken, otherwise the seconds until all buckets would hold enough
+        """
+        pass
+
+    @abstractmethod
+    def charge(self, bucket: str, capacity: float, rate: float, amount: float):
+        """Take an amount unconditionally; the bucket may go into debt."""
+        pass
+
+    @abstractmethod
+    def drain(self, bucket: str, capacity: float, rate: float, level: float):
+        """Lower a bucket to at most ``level``."""
+        pass
+
+    @abstractmethod
+    def levels(self) -> Dict[str, float]:
+        """Current level of every bucket (not refilled)."""
+        pass
+
+
+class MemoryBucketBackend(BucketBackend):
+    """Buckets shared by the threads of one process."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _level(self, bucket: str, capacity: float, rate: float, now: float) -> float:
+        level, updated = self._buckets.get(bucket, (capacity, now))
+        return _refill(level, updated, capacity, rate, now)
+
+    def take(self, demands: List[Demand]) -> float:
+        with self._lock:
+            now = time.time()
+            levels = [self._level(b, capacity, rate, now) for b, capacity, rate, _ in demands]
+            wait = _shortfall(levels, demands)
+            if wait == 0.0:
+                for level, (bucket, _, _, amount) in zip(levels, demands):
+                    self._buckets[bucket] = [level - amount, now]
+            return wait
+
+    def charge(self, bucket: str, capacity: float, rate: float, amount: float):
+        with self._lock:
+            now = time.time()
+            self._buckets[bucket] = [self._level(bucket, capacity, rate, now) - amount, now]
+
+    def drain(self, bucket: str, capacity: float, rate: float, level: float):
+        with self._lock:
+            now = time.time()
+            self._buckets[bucket] = [min(self._level(bucket, capacity, rate, now), level), now]
+
+    def levels(self) -> Dict[str, float]:
+        with self._lock:
+            return {bucket: level for bucket, (level, _) in self._buckets.items()}
+
+
+class SQLiteBucketBackend(BucketBackend):
+    """Buckets in a local SQLite file, shared by every process on the host."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "data/rate_limits.db"):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "bucket TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit-per-statement mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _level(conn, bucket: str, capacity: float, rate: float, now: float) -> float:
+        row = conn.execute("SELECT level, updated FROM buckets WHERE bucket = ?", (bucket,)).fetchone()
+        if row is None:
+            return capacity
+        return _refill(row[0], row[1], capacity, rate, now)
+
+    def _update(self, fn):
+        """Run fn(conn, now) in a write transaction."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, time.time())
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def take(self, demands: List[Demand]) -> float:
+        def update(conn, now):
+            levels = [self._level(conn, b, capacity, rate, now) for b, capacity, rate, _ in demands]
+            wait = _shortfall(levels, demands)
+            if wait == 0.0:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (bucket, level, updated) VALUES (?, ?, ?)",
+                    [(bucket, level - amount, now) for level, (bucket, _, _, amount) in zip(levels, demands)]
+                )
+            return wait
+
+        return self._update(update)
+
+    def charge(self, bucket: str, capacity: float, rate: float, amount: float):
+        def update(conn, now):
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (bucket, level, updated) VALUES (?, ?, ?)",
+                (bucket, self._level(conn, bucket, capacity, rate, now) - amount, now)
+            )
+
+        self._update(update)
+
+    def drain(self, bucket: str, capacity: float, rate: float, level: float):
+        def update(conn, now):
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (bucket, level, updated) VALUES (?, ?, ?)",
+                (bucket, min(self._level(conn, bucket, capacity, rate, now), level), now)
+            )
+
+        self._update(update)
+
+    def levels(self) -> Dict[str, float]:
+        return dict(self._connect().execute("SELECT bucket, level FROM buckets").fetchall())
+
+
+def create_bucket_backend(backend: str = None, path: str = None) -> Optional[BucketBackend]:
+    """
+    Create a rate limit backend based on configuration.
+
+    Args:
+        backend: "memory", "sqlite" or "none" (uses settings default if None)
+        path: SQLite file for the shared backend (uses settings default if None)
+
+    Returns:
+        BucketBackend instance, or None when rate limiting is disabled
+    """
+    backend = (backend or settings.RATE_LIMIT_BACKEND).lower()
+
+    if backend == "memory":
+        return MemoryBucketBackend()
+
+    elif backend == "sqlite":
+        return SQLiteBucketBackend(path=path or settings.RATE_LIMIT_PATH)
+
+    elif backend == "none":
+        return None
+
+    else:
+        raise ValueError(
+            f"Unsupported rate limit backend: {backend}. Use 'memory', 'sqlite', or 'none'"
+        )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds to back off after a provider error, or None if it is not a rate limit.
+
+    Uses the provider's "try again in 1m2.5s" hint when the message has one.
+    """
+    message = str(error)
+    if "429" not in message and "rate limit" not in message.lower():
+        return None
+    match = _RETRY_AFTER_RE.search(message)
+    if match is None:
+        return DEFAULT_RETRY_AFTER
+    return int(match.group(1) or 0) * 60 + float(match.group(2))
+
+
+def _check_deadline(wait: float):
+    """Give up on a call whose llm_deadline passes before the buckets allow it."""
+    timeout = request_timeout()
+    if timeout is not None and wait > timeout:
+        raise TimeoutError(f"LLM call deadline passes before the rate limit allows it (in {wait:.1f}s)")
+
+
+class UsageHandler(BaseCallbackHandler):
+    """Charges a limiter for the tokens each call used, and backs it off on 429s."""
+
+    def __init__(self, limiter: "ProviderRateLimiter"):
+        self.limiter = limiter
+        self._prompt_chars: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._prompt_chars[run_id] = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._prompt_chars[run_id] = sum(len(p) for p in prompts)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_chars = self._prompt_chars.pop(run_id, 0)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens = usage.get("total_tokens")
+
+        if tokens is None:
+            for generation in (g for batch in response.generations for g in batch):
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    tokens = (tokens or 0) + metadata.get("total_tokens", 0)
+
+        if tokens is None:
+            # No usage reported (e.g. some streams): ~4 characters per token
+            output_chars = sum(len(g.text) for batch in response.generations for g in batch)
+            tokens = (prompt_chars + output_chars) // 4
+
+        self.limiter.charge_tokens(tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._prompt_chars.pop(run_id, None)
+        seconds = retry_after(error)
+        if seconds is not None:
+            self.limiter.back_off(seconds)
+
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """
+    Request and token buckets for one LLM provider.
+
+    A call starts once the request bucket holds a request and the token
+    bucket is not in debt; the tokens it actually used are charged when it
+    ends, so a burst of large prompts slows the calls after it. Both buckets
+    refill continuously at the per-minute limits and hold at most one
+    minute's worth. A 429 that gets through holds back every call for the
+    provider's retry-after time.
+
+    Passed to chat models as ``rate_limiter`` (checked before every invoke
+    and stream) together with ``usage_handler`` as a callback. A call gives
+    up with a TimeoutError if its ``llm_deadline`` passes before the
+    buckets allow it.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        backend: BucketBackend,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None
+    ):
+        self.provider = provider
+        self.backend = backend
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.usage_handler = UsageHandler(self)
+
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0
+        self._stats_lock = threading.Lock()
+
+    def _bucket(self, kind: str) -> Optional[Tuple[str, float, float]]:
+        """(name, capacity, refill per second) of a bucket, or None if unlimited."""
+        per_minute = self.requests_per_minute if kind == "requests" else self.tokens_per_minute
+        if not per_minute:
+            return None
+        return f"{self.provider}:{kind}", float(per_minute), per_minute / 60.0
+
+    def _demands(self) -> List[Demand]:
+        # The back-off bucket refills to 0 at one unit per second
+        demands = [(f"{self.provider}:backoff", 0.0, 1.0, 0.0)]
+        for kind, amount in (("requests", 1.0), ("tokens", 0.0)):
+            bucket = self._bucket(kind)
+            if bucket is not None:
+                demands.append((*bucket, amount))
+        return demands
+
+    def _record_wait(self, seconds: float):
+        with self._stats_lock:
+            self.waits += 1
+            self.waited_seconds += seconds
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        started = time.time()
+        while True:
+            wait = self.backend.take(self._demands())
+            if wait == 0.0:
+                break
+            if not blocking:
+                return False
+            _check_deadline(wait)
+            time.sleep(max(wait, 0.01))
+
+        if time.time() > started + 0.01:
+            self._record_wait(time.time() - started)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        started = time.time()
+        while True:
+            wait = self.backend.take(self._demands())
+            if wait == 0.0:
+                break
+            if not blocking:
+                return False
+            _check_deadline(wait)
+            await asyncio.sleep(max(wait, 0.01))
+
+        if time.time() > started + 0.01:
+            self._record_wait(time.time() - started)
+        return True
+
+    def charge_tokens(self, tokens: int):
+        """Charge the tokens a finished call used."""
+        bucket = self._bucket("tokens")
+        if bucket is not None and tokens > 0:
+            self.backend.charge(*bucket, tokens)
+
+    def back_off(self, seconds: float):
+        """Hold back every call to this provider for about ``seconds``."""
+        with self._stats_lock:
+            self.throttled += 1
+        # Concurrent 429s overlap rather than add up
+        self.backend.drain(f"{self.provider}:backoff", 0.0, 1.0, -seconds)
+
+    def stats(self) -> Dict:
+        """Limits, current levels and waiting counters for this process."""
+        levels = self.backend.levels()
+        return {
+            "provider": self.provider,
+            "backend": self.backend.name,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "levels": {
+                kind: round(levels[f"{self.provider}:{kind}"], 1)
+                for kind in ("requests", "tokens", "backoff") if f"{self.provider}:{kind}" in levels
+            },
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3),
+            "throttled": self.throttled
+        }
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str = None) -> Optional[ProviderRateLimiter]:
+    """
+    Process-wide limiter for a provider, or None if it is not limited.
+
+    Every LLM client created for the provider (agents, chat assistant, API
+    workers) shares it. Limits come from LLM_REQUESTS_PER_MINUTE and
+    LLM_TOKENS_PER_MINUTE, falling back to PROVIDER_LIMITS.
+    """
+    provider = provider or settings.LLM_PROVIDER
+
+    with _lock:
+        if provider not in _limiters:
+            default_requests, default_tokens = PROVIDER_LIMITS.get(provider, (None, None))
+            requests_per_minute = settings.LLM_REQUESTS_PER_MINUTE or default_requests
+            tokens_per_minute = settings.LLM_TOKENS_PER_MINUTE or default_tokens
+
+            backend = None
+            if requests_per_minute or tokens_per_minute:
+                backend = create_bucket_backend()
+
+            limiter = None
+            if backend is not None:
+                limiter = ProviderRateLimiter(provider, backend, requests_per_minute, tokens_per_minute)
+            _limiters[provider] = limiter
+
+    return _limiters[provider]
@@ -2,7 +2,7 @@
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 from .base import BaseAgent
-from ..schemas import ResearchOutput, PlannerOutput
+from ..schemas import ResearchOutput, PlannerOutput, EvaluationFactor, FactorAnalysis
 
 
 class ResearchAgent(BaseAgent):
@@ -35,6 +35,45 @@ Evaluation Factors:
 Analyze each factor in the context of this decision. Provide both factor-specific analyses AND an overall_context summary.""")
         ])
     
+    def get_factor_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are a research analyst. Your job is to analyze one evaluation factor of a decision in depth.
+
+Provide:
+- Key insights about how this factor relates to the decision
+- Specific considerations or data points
+- Relevant context that would inform scoring
+
+Be thorough but concise. Focus on actionable insights."""),
+            ("user", """Decision: {decision}
+
+Context: {context}
+
+Evaluation Factor:
+- {factor}
+
+Analyze this factor in the context of this decision. Use the factor name exactly as given for factor_name.""")
+        ])
+    
+    def run_factor(
+        self,
+        decision: str,
+        context: str,
+        factor: EvaluationFactor
+    ) -> FactorAnalysis:
+        """Research a single factor, so factors can be researched independently."""
+        analysis = self._invoke(
+            self.get_factor_prompt(),
+            FactorAnalysis,
+            {
+                "decision": decision,
+                "context": context,
+                "factor": f"{factor.name} ({factor.category}): {factor.description}"
+            }
+        )
+        analysis.factor_name = factor.name
+        return analysis
+    
     def run(
         self,
         decision: str,
@@ -1,6 +1,7 @@
 """Risk Agent - assigns risk scores to each factor."""
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
+from config import settings
 from .base import BaseAgent
 from ..schemas import RiskOutput, PlannerOutput, ResearchOutput
 
@@ -60,13 +61,8 @@ Assign risk scores to each factor.""")
             for f in planner_output.factors
         ])
         
-        research_text = "\n".join([
-            f"- {a.factor_name}: {a.insights}"
-            for a in research_output.analyses
-        ])
-        
-        return super().run(
-            decision=decision,
-            factors=factors_text,
-            research=research_text
-        )
+        return super().run(**self._fit_prompt(
+            settings.PROMPT_BUDGET_RISK,
+            {"decision": decision, "factors": factors_text},
+            {"research": [(f"- {a.factor_name}: ", a.insights) for a in research_output.analyses]}
+        ))
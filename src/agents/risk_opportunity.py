@@ -0,0 +1,80 @@
+"""Risk & Opportunity Agent - scores risks and opportunities in one call."""
+from typing import Tuple
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from config import settings
+from .base import BaseAgent
+from ..schemas import (
+    RiskOpportunityOutput,
+    RiskOutput,
+    OpportunityOutput,
+    PlannerOutput,
+    ResearchOutput
+)
+
+
+class RiskOpportunityAgent(BaseAgent):
+    """Evaluates risks and opportunities for each factor in a single call."""
+    
+    def get_output_schema(self) -> type[BaseModel]:
+        return RiskOpportunityOutput
+    
+    def get_prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are a risk and opportunity assessment expert. Your job is to assign both a risk score and an opportunity score to each evaluation factor.
+
+Risk Scoring Scale (0-10):
+- 0-2: Minimal risk - negligible negative impact
+- 3-4: Low risk - minor negative impact, easily manageable
+- 5-6: Medium risk - moderate negative impact, requires attention
+- 7-8: High risk - significant negative impact, needs mitigation
+- 9-10: Critical risk - severe negative impact, potentially catastrophic
+
+Opportunity Scoring Scale (0-10):
+- 0-2: Minimal opportunity - negligible positive impact
+- 3-4: Low opportunity - minor positive impact
+- 5-6: Medium opportunity - moderate positive impact, worth pursuing
+- 7-8: High opportunity - significant positive impact, strong upside
+- 9-10: Transformative opportunity - exceptional positive impact, game-changing
+
+For each factor, assign under "risk":
+- A numerical score (0-10), clear reasoning, and severity: low, medium, high, or critical
+
+And under "opportunity":
+- A numerical score (0-10), clear reasoning, and potential: low, medium, high, or transformative
+
+Consider probability, magnitude, reversibility and long-term effects on both sides.
+Score risk and opportunity independently; a factor can be high on both.
+
+Be objective and evidence-based.
+
+IMPORTANT: You must respond with valid JSON only."""),
+            ("user", """Decision: {decision}
+
+Evaluation Factors:
+{factors}
+
+Research Insights:
+{research}
+
+Assign risk and opportunity scores to each factor.""")
+        ])
+    
+    def run(
+        self,
+        decision: str,
+        planner_output: PlannerOutput,
+        research_output: ResearchOutput
+    ) -> Tuple[RiskOutput, OpportunityOutput]:
+        """Run the combined agent."""
+        factors_text = "\n".join([
+            f"- {f.name}: {f.description}"
+            for f in planner_output.factors
+        ])
+        
+        output = super().run(**self._fit_prompt(
+            settings.PROMPT_BUDGET_RISK_OPPORTUNITY,
+            {"decision": decision, "factors": factors_text},
+            {"research": [(f"- {a.factor_name}: ", a.insights) for a in research_output.analyses]}
+        ))
+        return output.risk, output.opportunity
@@ -0,0 +1,160 @@
+"""Priority classes and fair queuing for LLM calls."""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Priority classes, most urgent first
+INTERACTIVE_CHAT = 0
+INTERACTIVE_ANALYSIS = 1
+BATCH = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE_CHAT: "interactive_chat",
+    INTERACTIVE_ANALYSIS: "interactive_analysis",
+    BATCH: "batch",
+}
+
+# (priority, user_id) of the work running in this context
+_current: ContextVar[Tuple[int, Optional[int]]] = ContextVar("llm_priority", default=(BATCH, None))
+# time.time() by which the LLM calls made in this context must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def llm_priority(priority: int, user_id: Optional[int] = None):
+    """
+    Run the LLM calls made in this block (and the threads it starts through
+    the workflow) at ``priority`` on behalf of ``user_id``.
+
+    Calls made outside any block are scheduled as BATCH.
+    """
+    token = _current.set((priority, user_id))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_priority() -> Tuple[int, Optional[int]]:
+    """(priority, user_id) the current context's calls are scheduled with."""
+    return _current.get()
+
+
+@contextmanager
+def llm_deadline(deadline: Optional[float]):
+    """
+    Bound the LLM calls made in this block (and the threads it starts
+    through the workflow) by ``deadline``, a ``time.time()`` value.
+
+    Pooled HTTP requests time out and queued calls give up waiting for a
+    slot when it passes. A nested block never extends an outer deadline.
+    """
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = outer if deadline is None else min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def request_timeout() -> Optional[float]:
+    """Seconds left for the current context's LLM calls (at least 0), or None if unbounded."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0.0)
+
+
+def simulated_wait(seconds: float, source: str):
+    """
+    Take ``seconds`` like a provider request would, timing out at the call's
+    ``llm_deadline`` as a pooled HTTP request does (for offline models).
+    """
+    timeout = request_timeout()
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise TimeoutError(f"{source} request timed out after {timeout:.1f}s")
+    time.sleep(seconds)
+
+
+class Waiter:
+    """A call waiting for a slot."""
+
+    def __init__(self, priority: int, user_id: Optional[int]):
+        self.priority = priority
+        self.user_id = user_id
+        self.enqueued = time.time()
+        self.granted = False
+        self.epoch: Optional[int] = None
+
+
+class FairQueue:
+    """
+    Calls waiting for an LLM slot, served by priority class and fairly per user.
+
+    The next call is from the most urgent class; within a class, from the
+    user served least recently, then first come first served. A call gains
+    one class per ``aging_seconds`` waited, so batch work is never starved
+    by a steady stream of interactive calls.
+
+    Not thread-safe on its own; the owning limiter holds its lock.
+    """
+
+    def __init__(self, aging_seconds: float = 30.0):
+        self.aging_seconds = aging_seconds
+        self._waiters: List[Waiter] = []
+        self._served = 0
+        self._last_served: Dict[Optional[int], int] = {}
+        self._served_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.promoted = 0
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def push(self, priority: int, user_id: Optional[int]) -> Waiter:
+        waiter = Waiter(priority, user_id)
+        self._waiters.append(waiter)
+        return waiter
+
+    def remove(self, waiter: Waiter):
+        self._waiters.remove(waiter)
+
+    def _effective_priority(self, waiter: Waiter, now: float) -> int:
+        aged = int((now - waiter.enqueued) // self.aging_seconds) if self.aging_seconds > 0 else 0
+        return max(INTERACTIVE_CHAT, waiter.priority - aged)
+
+    def pop(self) -> Waiter:
+        """Remove and return the call to serve next."""
+        now = time.time()
+        waiter = min(
+            self._waiters,
+            key=lambda w: (
+                self._effective_priority(w, now),
+                self._last_served.get(w.user_id, -1),
+                w.enqueued
+            )
+        )
+        self._waiters.remove(waiter)
+        if self._effective_priority(waiter, now) < waiter.priority:
+            self.promoted += 1
+        self.served(waiter.priority, waiter.user_id)
+        return waiter
+
+    def served(self, priority: int, user_id: Optional[int]):
+        """Record that a call got a slot (also for calls that never waited)."""
+        self._served += 1
+        self._last_served[user_id] = self._served
+        self._served_by_priority[PRIORITY_NAMES[priority]] += 1
+
+    def stats(self) -> Dict:
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiters:
+            waiting[PRIORITY_NAMES[waiter.priority]] += 1
+        return {
+            "queued_by_priority": waiting,
+            "served_by_priority": dict(self._served_by_priority),
+            "promoted": self.promoted
+        }
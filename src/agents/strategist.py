@@ -1,6 +1,7 @@
 """Strategist Agent - synthesizes final recommendation."""
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
+from config import settings
 from .base import BaseAgent
 from ..schemas import (
     Recommendation,
@@ -76,26 +77,25 @@ Provide your strategic recommendation.""")
         opportunity_output: OpportunityOutput
     ) -> Recommendation:
         """Run the strategist agent."""
-        risk_details = "\n".join([
-            f"- {r.factor_name}: {r.score}/10 ({r.severity}) - {r.reasoning}"
-            for r in risk_output.risk_scores
-        ])
-        
-        opportunity_details = "\n".join([
-            f"- {o.factor_name}: {o.score}/10 ({o.potential}) - {o.reasoning}"
-            for o in opportunity_output.opportunity_scores
-        ])
-        
-        research_summary = research_output.overall_context
-        
-        result = super().run(
-            decision=decision,
-            overall_risk=risk_output.overall_risk_level,
-            overall_opportunity=opportunity_output.overall_opportunity_level,
-            risk_details=risk_details,
-            opportunity_details=opportunity_details,
-            research_summary=research_summary
-        )
+        result = super().run(**self._fit_prompt(
+            settings.PROMPT_BUDGET_STRATEGIST,
+            {
+                "decision": decision,
+                "overall_risk": risk_output.overall_risk_level,
+                "overall_opportunity": opportunity_output.overall_opportunity_level
+            },
+            {
+                "risk_details": [
+                    (f"- {r.factor_name}: {r.score}/10 ({r.severity}) - ", r.reasoning)
+                    for r in risk_output.risk_scores
+                ],
+                "opportunity_details": [
+                    (f"- {o.factor_name}: {o.score}/10 ({o.potential}) - ", o.reasoning)
+                    for o in opportunity_output.opportunity_scores
+                ],
+                "research_summary": [("", research_output.overall_context)]
+            }
+        ))
         
         # Add computed scores
         result.overall_risk_score = risk_output.overall_risk_level
@@ -0,0 +1,156 @@
+"""Idempotency-Key records for retried API requests."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from config import settings
+
+# begin() outcomes
+NEW = "new"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+MISMATCH = "mismatch"
+
+
+class IdempotencyStore:
+    """
+    Stored responses keyed by (user, Idempotency-Key) in a local SQLite file.
+
+    The first request with a key claims it and runs; retries with the same
+    key get the stored response, or see the claim while the first request
+    is still running. The file is shared by every worker on the host, and
+    records expire after ``ttl_seconds``.
+
+    Server errors are kept only for requests already waiting on them: a
+    later retry claims the key again and re-executes. A claim older than
+    ``lease_seconds`` is treated as abandoned by a crashed worker.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/idempotency.db",
+        ttl_seconds: int = 86400,
+        lease_seconds: int = 600
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+                "user_id INTEGER NOT NULL, key TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                "status TEXT NOT NULL, status_code INTEGER, response TEXT, headers TEXT, "
+                "created REAL NOT NULL, PRIMARY KEY (user_id, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created ON idempotency_keys (created)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit-per-statement mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def begin(self, user_id: int, key: str, fingerprint: str) -> Tuple[str, Optional[Dict]]:
+        """
+        Claim a key for a request, or report what happened to it before.
+
+        Args:
+            user_id: Caller; keys are scoped per user
+            key: Idempotency-Key header value
+            fingerprint: Hash of the request body
+
+        Returns:
+            (outcome, record): NEW if the caller should execute the request,
+            COMPLETED with the stored record, IN_PROGRESS while the first
+            request runs, or MISMATCH if the key was used for another body
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("DELETE FROM idempotency_keys WHERE created < ?", (now - self.ttl_seconds,))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT fingerprint, status, status_code, response, headers, created "
+                "FROM idempotency_keys WHERE user_id = ? AND key = ?",
+                (user_id, key)
+            ).fetchone()
+
+            if row is not None:
+                stored_fingerprint, status, status_code, response, headers, created = row
+                if stored_fingerprint != fingerprint:
+                    conn.execute("COMMIT")
+                    return MISMATCH, None
+                if status == COMPLETED and status_code < 500:
+                    conn.execute("COMMIT")
+                    return COMPLETED, self._record(status_code, response, headers)
+                if status == IN_PROGRESS and created >= now - self.lease_seconds:
+                    conn.execute("COMMIT")
+                    return IN_PROGRESS, None
+
+            # New key, a server error to retry, or an abandoned claim
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (user_id, key, fingerprint, status, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, key, fingerprint, IN_PROGRESS, now)
+            )
+            conn.execute("COMMIT")
+            return NEW, None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(
+        self,
+        user_id: int,
+        key: str,
+        status_code: int,
+        response: Dict,
+        headers: Optional[Dict] = None
+    ):
+        """Store the response of a claimed request."""
+        self._connect().execute(
+            "UPDATE idempotency_keys SET status = ?, status_code = ?, response = ?, headers = ? "
+            "WHERE user_id = ? AND key = ?",
+            (COMPLETED, status_code, json.dumps(response, default=str), json.dumps(headers or {}), user_id, key)
+        )
+
+    def get(self, user_id: int, key: str) -> Optional[Dict]:
+        """The stored record of a completed request, or None if unknown or still running."""
+        row = self._connect().execute(
+            "SELECT status_code, response, headers FROM idempotency_keys "
+            "WHERE user_id = ? AND key = ? AND status = ?",
+            (user_id, key, COMPLETED)
+        ).fetchone()
+        return self._record(*row) if row else None
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+
+    @staticmethod
+    def _record(status_code: int, response: str, headers: str) -> Dict:
+        return {
+            "status_code": status_code,
+            "response": json.loads(response),
+            "headers": json.loads(headers) if headers else {}
+        }
+
+
+idempotency_store = IdempotencyStore(
+    path=settings.IDEMPOTENCY_DB_PATH,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    lease_seconds=max(settings.TIMEOUT_SECONDS * 2, 600)
+)
@@ -1,18 +1,38 @@
 """FastAPI REST API for FutureSelf AI."""
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+import asyncio
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
-from ..auth import AuthManager
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from ..auth import AsyncAuthManager, init_db
 from ..workflow import DecisionWorkflowRunner
-from ..schemas import DecisionInput
-from ..history import HistoryManager
+from ..schemas import DecisionInput, AgentState, PlannerOutput
+from ..history import AsyncHistoryManager
+from ..history.cache import decision_cache
+from ..history.usage import QuotaExceeded
+from ..agents.planner_cache import planner_cache
+from ..agents.prompt_budget import prompt_budget
+from ..agents.rate_limit import get_rate_limiter
+from ..agents.concurrency import get_concurrency_limiter
+from ..agents.http_pool import get_http_pool
+from ..agents.ollama import get_warmup_manager, start_warmup
+from ..agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS, BATCH
+from ..workflow.checkpoints import run_metadata
+from ..workflow.runner import analysis_flights
+from .idempotency import idempotency_store, MISMATCH, IN_PROGRESS
 
 load_dotenv()
 
@@ -21,13 +41,22 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Keep local models loaded while the API runs (Ollama only)."""
+    warmup = start_warmup()
+    yield
+    if warmup:
+        warmup.stop()
+
 # Initialize FastAPI
 app = FastAPI(
     title="FutureSelf AI API",
     description="Multi-agent decision intelligence platform API",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -42,6 +71,9 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
+# Make sure all tables (including analytics rollups) exist
+init_db()
+
 # Pydantic Models
 class UserRegister(BaseModel):
     username: str = Field(..., min_length=3)
@@ -63,6 +95,16 @@ class DecisionAnalyzeRequest(BaseModel):
     context: Optional[str] = None
     timeframe: Optional[str] = None
     tags: Optional[List[str]] = []
+    reuse_similar: bool = False
+    mode: str = "full"
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    priority: str = "interactive"
+
+class SimilarDecisionRequest(BaseModel):
+    decision: str = Field(..., min_length=10)
+    context: Optional[str] = None
+    limit: int = Field(3, ge=1, le=20)
+    threshold: Optional[float] = Field(None, ge=0.0, le=1.0)
 
 class DecisionResponse(BaseModel):
     id: int
@@ -75,6 +117,15 @@ class DecisionResponse(BaseModel):
     created_at: datetime
     full_analysis: Optional[dict] = None
 
+ANALYSIS_MODES = ("full", "quick")
+# LLM scheduling class of an analysis request
+ANALYSIS_PRIORITIES = {"interactive": INTERACTIVE_ANALYSIS, "batch": BATCH}
+# How long a workflow run's saved decision id is kept for requests that joined the run
+SAVED_RUN_TTL_SECONDS = 60
+
+# Decision id (or save error) of each recently saved workflow run, by run_id
+saved_runs: Dict[str, asyncio.Future] = {}
+
 # Helper Functions
 def create_access_token(data: dict):
     """Create JWT access token."""
@@ -102,6 +153,18 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             detail="Invalid authentication credentials"
         )
 
+async def require_usage_quota(user_id: int = Depends(verify_token)) -> int:
+    """Return user_id, or 429 if the user has used up a daily LLM quota."""
+    try:
+        await AsyncHistoryManager.check_usage_quota(user_id)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+    return user_id
+
 # API Endpoints
 
 @app.get("/")
@@ -116,7 +179,7 @@ async def root():
 @app.post("/api/v1/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(user: UserRegister):
     """Register a new user."""
-    success, message = AuthManager.register_user(
+    success, message = await AsyncAuthManager.register_user(
         user.username,
         user.email,
         user.password
@@ -129,7 +192,7 @@ async def register(user: UserRegister):
         )
     
     # Auto-login after registration
-    success, message, user_data = AuthManager.login_user(user.username, user.password)
+    success, message, user_data = await AsyncAuthManager.login_user(user.username, user.password)
     
     if not success:
         raise HTTPException(
@@ -148,7 +211,7 @@ async def register(user: UserRegister):
 @app.post("/api/v1/auth/login", response_model=Token)
 async def login(user: UserLogin):
     """Login user and return JWT token."""
-    success, message, user_data = AuthManager.login_user(user.username, user.password)
+    success, message, user_data = await AsyncAuthManager.login_user(user.username, user.password)
     
     if not success:
         raise HTTPException(
@@ -164,12 +227,150 @@ async def login(user: UserLogin):
         username=user_data["username"]
     )
 
+def analysis_response(decision_id: int, result: AgentState) -> dict:
+    """Response body for a completed analysis."""
+    return {
+        "id": decision_id,
+        "run_id": result.run_id,
+        "decision": result.decision_input.decision,
+        "mode": result.analysis_mode,
+        "degraded": result.degraded,
+        "degradations": result.degradations,
+        "recommendation": result.recommendation.recommendation,
+        "confidence_level": result.recommendation.confidence_level,
+        "risk_score": result.recommendation.overall_risk_score,
+        "opportunity_score": result.recommendation.overall_opportunity_score,
+        "key_insights": result.recommendation.key_insights,
+        "risk_reward_balance": result.recommendation.risk_reward_balance,
+        "next_steps": [
+            {
+                "action": step.action,
+                "priority": step.priority,
+                "timeframe": step.timeframe
+            }
+            for step in result.recommendation.next_steps
+        ]
+    }
+
+def analysis_failed(result: AgentState) -> HTTPException:
+    """500 for a failed run; X-Run-Id lets the client resume it."""
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Analysis failed: {result.error}",
+        headers={"X-Run-Id": result.run_id} if result.run_id else None
+    )
+
+def workflow_runner(quick: bool = False) -> DecisionWorkflowRunner:
+    """Workflow runner on the configured model, which the Ollama warm-up keeps loaded."""
+    return DecisionWorkflowRunner(
+        model_name=settings.MODEL_NAME,
+        temperature=settings.TEMPERATURE,
+        quick=quick
+    )
+
+async def save_analysis(user_id: int, result: AgentState, tags: List[str]) -> int:
+    """
+    Save an analysis once per workflow run and return its decision id.
+
+    Identical concurrent requests coalesce into one run (COALESCE_ANALYSES)
+    and all get its state; the first to get here saves it and the others
+    return the same decision id instead of saving duplicate history rows.
+    """
+    future = saved_runs.get(result.run_id)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = saved_runs[result.run_id] = loop.create_future()
+        loop.call_later(SAVED_RUN_TTL_SECONDS, saved_runs.pop, result.run_id, None)
+        try:
+            future.set_result(await AsyncHistoryManager.save_decision(user_id, result, tags))
+        except Exception as e:
+            future.set_exception(e)
+    return await future
+
+async def wait_for_idempotent_response(user_id: int, key: str) -> Optional[dict]:
+    """Wait for the request that claimed an Idempotency-Key to store its response."""
+    give_up = time.time() + max(settings.TIMEOUT_SECONDS, 30)
+    while time.time() < give_up:
+        record = await run_in_threadpool(idempotency_store.get, user_id, key)
+        if record is not None:
+            return record
+        await asyncio.sleep(0.5)
+    return None
+
 @app.post("/api/v1/decisions/analyze", status_code=status.HTTP_201_CREATED)
 async def analyze_decision(
     request: DecisionAnalyzeRequest,
-    user_id: int = Depends(verify_token)
+    user_id: int = Depends(require_usage_quota),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Analyze a decision using multi-agent AI system."""
+    """
+    Analyze a decision using multi-agent AI system.
+    
+    With an Idempotency-Key header, a retry returns the stored response of
+    the first request, or waits for it if it is still running, instead of
+    analyzing and saving the decision again.
+    """
+    if request.mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported analysis mode: {request.mode}. Use one of {', '.join(ANALYSIS_MODES)}"
+        )
+    if request.priority not in ANALYSIS_PRIORITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported priority: {request.priority}. Use one of {', '.join(ANALYSIS_PRIORITIES)}"
+        )
+    
+    if not idempotency_key:
+        return await run_analysis(request, user_id)
+    
+    if len(idempotency_key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be at most 255 characters"
+        )
+    
+    fingerprint = hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+    outcome, record = await run_in_threadpool(
+        idempotency_store.begin, user_id, idempotency_key, fingerprint
+    )
+    
+    if outcome == MISMATCH:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+    
+    if outcome == IN_PROGRESS:
+        record = await wait_for_idempotent_response(user_id, idempotency_key)
+        if record is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+    
+    if record is not None:
+        return JSONResponse(
+            status_code=record["status_code"],
+            content=record["response"],
+            headers={**record["headers"], "Idempotent-Replayed": "true"}
+        )
+    
+    try:
+        response = await run_analysis(request, user_id)
+    except HTTPException as e:
+        await run_in_threadpool(
+            idempotency_store.complete, user_id, idempotency_key, e.status_code, {"detail": e.detail}, e.headers
+        )
+        raise
+    
+    await run_in_threadpool(
+        idempotency_store.complete, user_id, idempotency_key, status.HTTP_201_CREATED, response
+    )
+    return response
+
+async def run_analysis(request: DecisionAnalyzeRequest, user_id: int) -> dict:
+    """Run, save and describe one analysis; failures are raised as HTTPException."""
     try:
         # Create decision input
         decision_input = DecisionInput(
@@ -178,37 +379,171 @@ async def analyze_decision(
             timeframe=request.timeframe
         )
         
+        # Optionally reuse planning and research from a near-duplicate decision
+        reused_from = None
+        prior_analysis = None
+        if request.reuse_similar:
+            matches = await AsyncHistoryManager.find_similar_decisions(
+                user_id, request.decision, request.context, limit=1
+            )
+            if matches:
+                prior = await AsyncHistoryManager.get_decision_by_id(matches[0]["id"])
+                if prior and prior.get("full_analysis"):
+                    prior_analysis = prior["full_analysis"]
+                    reused_from = {"id": matches[0]["id"], "similarity": matches[0]["similarity"]}
+        
         # Run analysis
-        runner = DecisionWorkflowRunner()
-        result = runner.run(decision_input)
+        # The workflow makes blocking LLM calls, so keep it off the event loop
+        runner = workflow_runner(quick=request.mode == "quick")
+        deadline = time.time() + request.timeout_seconds if request.timeout_seconds else None
+        with llm_priority(ANALYSIS_PRIORITIES[request.priority], user_id):
+            result = await run_in_threadpool(
+                runner.run,
+                decision_input,
+                prior_analysis=prior_analysis,
+                deadline=deadline,
+                metadata={"user_id": user_id, "tags": ",".join(request.tags or [])}
+            )
         
         if result.error:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Analysis failed: {result.error}"
-            )
+            raise analysis_failed(result)
         
         # Save to history
-        decision_id = HistoryManager.save_decision(user_id, result, request.tags)
+        decision_id = await save_analysis(user_id, result, request.tags)
         
         # Return response
         return {
-            "id": decision_id,
-            "decision": request.decision,
-            "recommendation": result.recommendation.recommendation,
-            "confidence_level": result.recommendation.confidence_level,
-            "risk_score": result.recommendation.overall_risk_score,
-            "opportunity_score": result.recommendation.overall_opportunity_score,
-            "key_insights": result.recommendation.key_insights,
-            "risk_reward_balance": result.recommendation.risk_reward_balance,
-            "next_steps": [
-                {
-                    "action": step.action,
-                    "priority": step.priority,
-                    "timeframe": step.timeframe
-                }
-                for step in result.recommendation.next_steps
-            ]
+            **analysis_response(decision_id, result),
+            "reused_from": reused_from
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/decisions/{decision_id}/upgrade", status_code=status.HTTP_201_CREATED)
+async def upgrade_decision(
+    decision_id: int,
+    user_id: int = Depends(require_usage_quota)
+):
+    """Re-run a quick analysis as a full analysis, reusing its factors."""
+    try:
+        decision = await AsyncHistoryManager.get_decision_by_id(decision_id)
+        
+        if not decision or decision["user_id"] != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Decision not found"
+            )
+        
+        analysis = decision.get("full_analysis") or {}
+        if analysis.get("mode") != "quick":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only quick analyses can be upgraded"
+            )
+        
+        quick_state = AgentState(
+            decision_input=DecisionInput(
+                decision=decision["decision_text"],
+                context=decision["context"],
+                timeframe=decision["timeframe"]
+            ),
+            planner_output=PlannerOutput(**analysis["planner"]) if analysis.get("planner") else None,
+            analysis_mode="quick"
+        )
+        
+        runner = workflow_runner()
+        with llm_priority(INTERACTIVE_ANALYSIS, user_id):
+            result = await run_in_threadpool(
+                runner.upgrade,
+                quick_state,
+                metadata={"user_id": user_id, "tags": ",".join(decision["tags"])}
+            )
+        
+        if result.error:
+            raise analysis_failed(result)
+        
+        # The full analysis replaces the quick one in history
+        new_id = await save_analysis(user_id, result, decision["tags"])
+        await AsyncHistoryManager.delete_decision(decision_id, user_id)
+        
+        return {
+            **analysis_response(new_id, result),
+            "upgraded_from": decision_id
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/runs/{run_id}/resume", status_code=status.HTTP_201_CREATED)
+async def resume_run(
+    run_id: str,
+    user_id: int = Depends(require_usage_quota)
+):
+    """Continue a failed or interrupted analysis from its last successful step."""
+    try:
+        metadata = run_metadata(run_id)
+        
+        if not metadata or metadata.get("user_id") != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Run not found"
+            )
+        
+        runner = workflow_runner()
+        with llm_priority(INTERACTIVE_ANALYSIS, user_id):
+            result = await run_in_threadpool(runner.resume, run_id)
+        
+        if result.error:
+            raise analysis_failed(result)
+        
+        tags = [tag for tag in (metadata.get("tags") or "").split(",") if tag]
+        decision_id = await AsyncHistoryManager.save_decision(user_id, result, tags)
+        
+        return {
+            **analysis_response(decision_id, result),
+            "resumed": True
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/decisions/similar")
+async def find_similar_decisions(
+    request: SimilarDecisionRequest,
+    user_id: int = Depends(verify_token)
+):
+    """Find past decisions that are near-duplicates of a new one, before analyzing it."""
+    try:
+        matches = await AsyncHistoryManager.find_similar_decisions(
+            user_id,
+            request.decision,
+            request.context,
+            limit=request.limit,
+            threshold=request.threshold
+        )
+        
+        return {
+            "matches": [
+                {**match, "created_at": match["created_at"].isoformat() if match["created_at"] else None}
+                for match in matches
+            ],
+            "count": len(matches)
         }
     
     except Exception as e:
@@ -226,9 +561,9 @@ async def get_history(
     """Get user's decision history."""
     try:
         if search:
-            decisions = HistoryManager.search_decisions(user_id, search)
+            decisions = await AsyncHistoryManager.search_decisions(user_id, search)
         else:
-            decisions = HistoryManager.get_user_history(user_id, limit=limit)
+            decisions = await AsyncHistoryManager.get_user_history(user_id, limit=limit)
         
         # Convert to dict format
         result = []
@@ -271,7 +606,7 @@ async def get_decision(
 ):
     """Get a specific decision by ID."""
     try:
-        decision = HistoryManager.get_decision_by_id(decision_id)
+        decision = await AsyncHistoryManager.get_decision_by_id(decision_id)
         
         if not decision:
             raise HTTPException(
@@ -296,7 +631,7 @@ async def delete_decision(
 ):
     """Delete a decision."""
     try:
-        success = HistoryManager.delete_decision(decision_id, user_id)
+        success = await AsyncHistoryManager.delete_decision(decision_id, user_id)
         
         if not success:
             raise HTTPException(
@@ -318,27 +653,17 @@ async def delete_decision(
 async def get_analytics_summary(user_id: int = Depends(verify_token)):
     """Get analytics summary for user."""
     try:
-        decisions = HistoryManager.get_user_history(user_id, limit=1000)
-        
-        if not decisions:
-            return {
-                "total_decisions": 0,
-                "avg_risk_score": 0,
-                "avg_opportunity_score": 0,
-                "avg_confidence": 0
-            }
-        
-        # Calculate statistics
-        total = len(decisions)
-        risk_scores = [d.get('risk_score') or d.risk_score for d in decisions if (d.get('risk_score') if isinstance(d, dict) else d.risk_score)]
-        opp_scores = [d.get('opportunity_score') or d.opportunity_score for d in decisions if (d.get('opportunity_score') if isinstance(d, dict) else d.opportunity_score)]
-        conf_levels = [d.get('confidence_level') or d.confidence_level for d in decisions if (d.get('confidence_level') if isinstance(d, dict) else d.confidence_level)]
+        summary = await AsyncHistoryManager.get_analytics_summary(user_id)
         
         return {
-            "total_decisions": total,
-            "avg_risk_score": sum(risk_scores) / len(risk_scores) if risk_scores else 0,
-            "avg_opportunity_score": sum(opp_scores) / len(opp_scores) if opp_scores else 0,
-            "avg_confidence": sum(conf_levels) / len(conf_levels) if conf_levels else 0
+            "total_decisions": summary["total_decisions"],
+            "avg_risk_score": summary["avg_risk_score"],
+            "avg_opportunity_score": summary["avg_opportunity_score"],
+            "avg_confidence": summary["avg_confidence"],
+            "recommendation_counts": summary["recommendation_counts"],
+            "tag_counts": summary["tag_counts"],
+            "first_decision_date": summary["first_decision_date"],
+            "last_decision_date": summary["last_decision_date"]
         }
     
     except Exception as e:
@@ -347,10 +672,114 @@ async def get_analytics_summary(user_id: int = Depends(verify_token)):
             detail=str(e)
         )
 
+@app.get("/api/v1/analytics/timeseries")
+async def get_analytics_timeseries(
+    bucket: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_distribution: bool = False,
+    user_id: int = Depends(verify_token)
+):
+    """Get time-bucketed analytics aggregated in the database."""
+    try:
+        result = await AsyncHistoryManager.get_analytics_timeseries(
+            user_id,
+            bucket=bucket,
+            start=start,
+            end=end
+        )
+        
+        if include_distribution:
+            result["distribution"] = await AsyncHistoryManager.get_score_distribution(user_id)
+        
+        return result
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/analytics/factors")
+async def get_factor_analytics(
+    group_by: str = "category",
+    order_by: str = "avg_risk",
+    limit: int = 20,
+    user_id: int = Depends(verify_token)
+):
+    """Get per-factor risk and opportunity aggregates across decisions."""
+    try:
+        return await AsyncHistoryManager.get_factor_analytics(
+            user_id,
+            group_by=group_by,
+            order_by=order_by,
+            limit=limit
+        )
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/usage")
+async def get_usage(
+    group_by: str = "agent",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: int = Depends(verify_token)
+):
+    """Get LLM tokens, cost, latency and cache hits per agent, model, run or day."""
+    try:
+        result = await AsyncHistoryManager.get_usage_summary(
+            user_id,
+            group_by=group_by,
+            start=start,
+            end=end
+        )
+        result["quota"] = await AsyncHistoryManager.get_usage_quota(user_id)
+        return result
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @app.get("/api/v1/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    limiter = get_rate_limiter()
+    concurrency = get_concurrency_limiter()
+    warmup = get_warmup_manager()
+    http_pool = get_http_pool()
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "decision_cache": decision_cache.stats(),
+        "planner_cache": planner_cache.stats(),
+        "prompt_budget": prompt_budget.stats(),
+        "analysis_coalescing": analysis_flights.stats(),
+        "rate_limit": limiter.stats() if limiter else None,
+        "llm_concurrency": concurrency.stats() if concurrency else None,
+        "http_pool": http_pool.stats() if http_pool else None,
+        "model_warmup": warmup.stats() if warmup else None
+    }
 
 if __name__ == "__main__":
     import uvicorn
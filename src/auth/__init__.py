@@ -1,5 +1,6 @@
 """Authentication module."""
 from .database import init_db, User
 from .auth_manager import AuthManager
+from .async_auth_manager import AsyncAuthManager
 
-__all__ = ["init_db", "User", "AuthManager"]
+__all__ = ["init_db", "User", "AuthManager", "AsyncAuthManager"]
@@ -0,0 +1,101 @@
+"""Async authentication manager for the FastAPI service."""
+import asyncio
+from datetime import datetime
+from .auth_manager import AuthManager
+from .database import User, get_async_session
+
+
+class AsyncAuthManager:
+    """
+    Async counterpart of AuthManager.
+
+    Queries run on the asyncio engine and bcrypt hashing runs in a worker
+    thread, so neither blocks the event loop.
+    """
+
+    @staticmethod
+    async def register_user(username: str, email: str, password: str) -> tuple[bool, str]:
+        """
+        Register a new user.
+        Returns (success, message)
+        """
+        # Validate inputs
+        if len(username) < 3:
+            return False, "Username must be at least 3 characters long"
+
+        if not AuthManager.validate_email(email):
+            return False, "Invalid email format"
+
+        is_valid, error_msg = AuthManager.validate_password(password)
+        if not is_valid:
+            return False, error_msg
+
+        password_hash = await asyncio.to_thread(AuthManager.hash_password, password)
+
+        def create_user(session) -> tuple[bool, str]:
+            # Check if user already exists
+            existing_user = session.query(User).filter(
+                (User.username == username) | (User.email == email)
+            ).first()
+
+            if existing_user:
+                if existing_user.username == username:
+                    return False, "Username already exists"
+                else:
+                    return False, "Email already registered"
+
+            session.add(User(
+                username=username,
+                email=email,
+                password_hash=password_hash
+            ))
+            return True, "Registration successful!"
+
+        async with get_async_session() as session:
+            try:
+                success, message = await session.run_sync(create_user)
+                if success:
+                    await session.commit()
+                return success, message
+            except Exception as e:
+                await session.rollback()
+                return False, f"Registration failed: {str(e)}"
+
+    @staticmethod
+    async def login_user(username: str, password: str) -> tuple[bool, str, dict]:
+        """
+        Login a user.
+        Returns (success, message, user_data)
+        """
+        def find_user(session):
+            return session.query(User).filter(User.username == username).first()
+
+        async with get_async_session() as session:
+            try:
+                user = await session.run_sync(find_user)
+
+                if not user:
+                    return False, "Invalid username or password", {}
+
+                # Verify password off the event loop
+                if not await asyncio.to_thread(
+                    AuthManager.verify_password, password, user.password_hash
+                ):
+                    return False, "Invalid username or password", {}
+
+                # Update last login
+                user.last_login = datetime.utcnow()
+                await session.commit()
+
+                user_data = {
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "created_at": user.created_at,
+                    "last_login": user.last_login
+                }
+
+                return True, "Login successful!", user_data
+
+            except Exception as e:
+                return False, f"Login failed: {str(e)}", {}
@@ -1,9 +1,11 @@
 """Database models and initialization."""
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text, Float, Index, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from config import settings
 import os
+import threading
 
 Base = declarative_base()
 
@@ -36,6 +38,74 @@ class DecisionHistory(Base):
     tags = Column(String(500))  # Comma-separated tags
     created_at = Column(DateTime, default=datetime.utcnow)
     full_analysis = Column(Text)  # JSON string of full analysis
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every ORM update
+    factors_indexed = Column(Boolean, nullable=False, default=False)  # Factor score rows written (or none to write)
+    
+    __table_args__ = (
+        Index("ix_decision_history_user_created", "user_id", "created_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class DecisionFactorScore(Base):
+    """Per-factor risk/opportunity scores, denormalized out of full_analysis."""
+    __tablename__ = "decision_factor_scores"
+    
+    id = Column(Integer, primary_key=True)
+    decision_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    factor_name = Column(String(200), nullable=False)
+    category = Column(String(50))
+    risk = Column(Float)
+    severity = Column(String(20))
+    opportunity = Column(Float)
+    potential = Column(String(20))
+    
+    __table_args__ = (
+        Index("ix_decision_factor_scores_user_category", "user_id", "category"),
+    )
+
+
+class UserAnalytics(Base):
+    """Per-user analytics rollup, updated in the same transaction as history."""
+    __tablename__ = "user_analytics"
+    
+    user_id = Column(Integer, primary_key=True)
+    total_decisions = Column(Integer, default=0, nullable=False)
+    risk_sum = Column(Float, default=0.0)
+    risk_count = Column(Integer, default=0)
+    opportunity_sum = Column(Float, default=0.0)
+    opportunity_count = Column(Integer, default=0)
+    confidence_sum = Column(Float, default=0.0)
+    confidence_count = Column(Integer, default=0)
+    recommendation_counts = Column(Text, default="{}")  # JSON {recommendation: count}
+    tag_counts = Column(Text, default="{}")  # JSON {tag: count}
+    daily_buckets = Column(Text, default="{}")  # JSON {YYYY-MM-DD: [count, risk_sum, opportunity_sum, risk_count, opportunity_count]}
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LLMUsage(Base):
+    """Usage ledger: one row per LLM call or cache hit, by user, run and agent."""
+    __tablename__ = "llm_usage"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)  # None for calls made outside a user's request
+    run_id = Column(String(64), index=True)
+    agent = Column(String(50), nullable=False)
+    provider = Column(String(50))
+    model = Column(String(100))
+    input_tokens = Column(Integer, default=0, nullable=False)
+    output_tokens = Column(Integer, default=0, nullable=False)
+    cached_tokens = Column(Integer, default=0, nullable=False)  # Input tokens served from the provider's prompt cache
+    latency_seconds = Column(Float)
+    cost = Column(Float, default=0.0, nullable=False)  # USD
+    cache_hit = Column(Boolean, default=False, nullable=False)  # Answered from a local cache, no LLM call
+    error = Column(String(200))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_llm_usage_user_created", "user_id", "created_at"),
+    )
 
 
 def init_db():
@@ -44,15 +114,89 @@ def init_db():
     os.makedirs("data", exist_ok=True)
     
     # Create database
-    engine = create_engine("sqlite:///data/futureself.db")
+    engine = get_engine()
     Base.metadata.create_all(engine)
     
+    # create_all skips columns and indexes on tables that already exist
+    _add_missing_columns(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    
     return engine
 
 
+# Columns added after the first release, with the DDL used to add them
+_ADDED_COLUMNS = {
+    "decision_history": {
+        "version": "INTEGER NOT NULL DEFAULT 1",
+        "factors_indexed": "BOOLEAN NOT NULL DEFAULT FALSE",
+    },
+}
+
+
+def _add_missing_columns(engine):
+    """Add columns introduced after a table was first created."""
+    inspector = inspect(engine)
+    
+    with engine.begin() as conn:
+        for table_name, columns in _ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspector.get_columns(table_name)}
+            for column_name, ddl in columns.items():
+                if column_name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+
+
+# Engines and session factories by database URL, shared by every session
+_engines = {}
+_session_factories = {}
+_async_engines = {}
+_async_session_factories = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Get the engine for DATABASE_URL.
+    
+    The engine and its connection pool are created once per process.
+    """
+    url = settings.DATABASE_URL
+    with _engines_lock:
+        if url not in _engines:
+            _engines[url] = create_engine(url)
+            _session_factories[url] = sessionmaker(bind=_engines[url])
+        return _engines[url]
+
+
 def get_session():
     """Get database session."""
-    engine = create_engine("sqlite:///data/futureself.db")
-    Session = sessionmaker(bind=engine)
-    return Session()
+    get_engine()
+    return _session_factories[settings.DATABASE_URL]()
+
 
+def get_async_database_url(url: str) -> str:
+    """Map a synchronous database URL onto its asyncio driver."""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def get_async_session():
+    """
+    Get an asyncio database session (aiosqlite/asyncpg).
+    
+    The engine and its connection pool are created once per process.
+    """
+    url = settings.DATABASE_URL
+    with _engines_lock:
+        if url not in _async_session_factories:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+            
+            _async_engines[url] = create_async_engine(get_async_database_url(url))
+            _async_session_factories[url] = async_sessionmaker(_async_engines[url], expire_on_commit=False)
+        factory = _async_session_factories[url]
+    
+    return factory()
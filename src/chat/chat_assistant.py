@@ -1,6 +1,8 @@
 """AI Chat Assistant for follow-up questions."""
+from typing import Optional
 from langchain_core.prompts import ChatPromptTemplate
 from ..agents.llm_factory import create_llm
+from ..agents.scheduler import llm_priority, INTERACTIVE_CHAT
 from ..schemas import AgentState
 
 
@@ -11,13 +13,16 @@ class ChatAssistant:
         """Initialize chat assistant with slightly higher temperature for conversation."""
         self.llm = create_llm(model_name=model_name, temperature=temperature)
     
-    def ask(self, question: str, state: AgentState) -> str:
+    def ask(self, question: str, state: AgentState, user_id: Optional[int] = None) -> str:
         """
         Ask a follow-up question about the decision analysis.
         
+        The call is scheduled ahead of analyses and batch work.
+        
         Args:
             question: User's question
             state: The decision analysis state
+            user_id: Asking user, for fair scheduling and usage accounting
             
         Returns:
             AI assistant's response
@@ -72,7 +77,11 @@ Please provide a helpful, clear answer.""")
         ])
         
         chain = prompt | self.llm
-        response = chain.invoke({"context": context, "question": question})
+        with llm_priority(INTERACTIVE_CHAT, user_id):
+            response = chain.invoke(
+                {"context": context, "question": question},
+                config={"metadata": {"agent": "chat", "user_id": user_id}}
+            )
         
         # Extract content from response
         if hasattr(response, 'content'):
@@ -80,7 +89,7 @@ Please provide a helpful, clear answer.""")
         return str(response)
 
     
-    def ask_question(self, state: AgentState, question: str) -> str:
+    def ask_question(self, state: AgentState, question: str, user_id: Optional[int] = None) -> str:
         """
         Ask a follow-up question about the decision analysis.
         Alias for ask() method for backward compatibility.
@@ -88,8 +97,9 @@ Please provide a helpful, clear answer.""")
         Args:
             state: The decision analysis state
             question: User's question
+            user_id: Asking user, for fair scheduling among users
             
         Returns:
             AI assistant's response
         """
-        return self.ask(question, state)
+        return self.ask(question, state, user_id=user_id)
@@ -1,4 +1,5 @@
 """Decision history management."""
 from .history_manager import HistoryManager
+from .async_history_manager import AsyncHistoryManager
 
-__all__ = ["HistoryManager"]
+__all__ = ["HistoryManager", "AsyncHistoryManager"]
@@ -0,0 +1,240 @@
+"""Per-user analytics rollups and SQL aggregation helpers."""
+import json
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from ..auth.database import DecisionHistory, UserAnalytics
+
+# Supported time buckets for SQL-side aggregation
+TIME_BUCKETS = ("day", "week", "month")
+
+
+class AnalyticsRollup:
+    """Keeps the user_analytics table in sync with decision history."""
+
+    @staticmethod
+    def apply(session, entry: DecisionHistory, sign: int = 1) -> UserAnalytics:
+        """
+        Add (sign=1) or remove (sign=-1) a decision from its user's rollup.
+
+        Must be called after the history insert/delete has been flushed in the
+        same session, so the rollup commits (or rolls back) together with it.
+        If the user has no rollup row yet, it is rebuilt from history instead,
+        which already reflects the flushed change.
+
+        The rollup row stays locked (SELECT ... FOR UPDATE) until the
+        transaction ends, so concurrent saves apply their changes one after
+        another instead of overwriting each other's counters.
+        """
+        rollup = AnalyticsRollup._lock(session, entry.user_id)
+        if rollup is None:
+            return AnalyticsRollup.rebuild(session, entry.user_id)
+
+        AnalyticsRollup._accumulate(rollup, entry, sign)
+
+        if rollup.total_decisions <= 0:
+            AnalyticsRollup._reset(rollup)
+
+        rollup.updated_at = datetime.utcnow()
+        return rollup
+
+    @staticmethod
+    def rebuild(session, user_id: int) -> UserAnalytics:
+        """Recompute a user's rollup from scratch (backfill for existing rows)."""
+        rollup = AnalyticsRollup._lock(session, user_id)
+        if rollup is None:
+            rollup = AnalyticsRollup._create(session, user_id)
+
+        AnalyticsRollup._reset(rollup)
+
+        rows = session.query(
+            DecisionHistory.user_id,
+            DecisionHistory.recommendation,
+            DecisionHistory.confidence_level,
+            DecisionHistory.risk_score,
+            DecisionHistory.opportunity_score,
+            DecisionHistory.tags,
+            DecisionHistory.created_at
+        ).filter(DecisionHistory.user_id == user_id).all()
+
+        for row in rows:
+            AnalyticsRollup._accumulate(rollup, row, 1)
+
+        rollup.updated_at = datetime.utcnow()
+        session.flush()
+        return rollup
+
+    @staticmethod
+    def _lock(session, user_id: int) -> Optional[UserAnalytics]:
+        """A user's rollup row, freshly read and locked until the transaction ends."""
+        return session.get(UserAnalytics, user_id, with_for_update=True, populate_existing=True)
+
+    @staticmethod
+    def _create(session, user_id: int) -> UserAnalytics:
+        """
+        Insert an empty rollup row for a user.
+
+        Two requests can both find the row missing on first access; the
+        insert runs in a savepoint, so the one that loses the race rolls
+        back only the insert and locks the row the other one created.
+        """
+        rollup = UserAnalytics(user_id=user_id)
+        AnalyticsRollup._reset(rollup)
+        try:
+            with session.begin_nested():
+                session.add(rollup)
+            return rollup
+        except IntegrityError:
+            return AnalyticsRollup._lock(session, user_id)
+
+    @staticmethod
+    def to_summary(rollup: Optional[UserAnalytics]) -> Dict:
+        """Convert a rollup row into the analytics summary dictionary."""
+        if rollup is None or not rollup.total_decisions:
+            return {
+                "total_decisions": 0,
+                "avg_risk_score": 0,
+                "avg_opportunity_score": 0,
+                "avg_confidence": 0,
+                "recommendation_counts": {},
+                "tag_counts": {},
+                "daily": {"dates": [], "counts": [], "avg_risk": [], "avg_opportunity": []},
+                "first_decision_date": None,
+                "last_decision_date": None
+            }
+
+        daily = json.loads(rollup.daily_buckets or "{}")
+        dates = sorted(daily)
+
+        return {
+            "total_decisions": rollup.total_decisions,
+            "avg_risk_score": _avg(rollup.risk_sum, rollup.risk_count),
+            "avg_opportunity_score": _avg(rollup.opportunity_sum, rollup.opportunity_count),
+            "avg_confidence": _avg(rollup.confidence_sum, rollup.confidence_count),
+            "recommendation_counts": json.loads(rollup.recommendation_counts or "{}"),
+            "tag_counts": json.loads(rollup.tag_counts or "{}"),
+            "daily": {
+                "dates": dates,
+                "counts": [daily[d][0] for d in dates],
+                "avg_risk": [_avg(daily[d][1], _day_bucket(daily[d])[3]) for d in dates],
+                "avg_opportunity": [_avg(daily[d][2], _day_bucket(daily[d])[4]) for d in dates]
+            },
+            "first_decision_date": dates[0] if dates else None,
+            "last_decision_date": dates[-1] if dates else None
+        }
+
+    @staticmethod
+    def _reset(rollup: UserAnalytics):
+        """Zero out every counter on a rollup row."""
+        rollup.total_decisions = 0
+        rollup.risk_sum = 0.0
+        rollup.risk_count = 0
+        rollup.opportunity_sum = 0.0
+        rollup.opportunity_count = 0
+        rollup.confidence_sum = 0.0
+        rollup.confidence_count = 0
+        rollup.recommendation_counts = "{}"
+        rollup.tag_counts = "{}"
+        rollup.daily_buckets = "{}"
+
+    @staticmethod
+    def _accumulate(rollup: UserAnalytics, entry, sign: int):
+        """Apply one decision's contribution to the rollup counters."""
+        rollup.total_decisions = (rollup.total_decisions or 0) + sign
+
+        if entry.risk_score is not None:
+            rollup.risk_sum = round((rollup.risk_sum or 0.0) + sign * entry.risk_score, 6)
+            rollup.risk_count = (rollup.risk_count or 0) + sign
+        if entry.opportunity_score is not None:
+            rollup.opportunity_sum = round(
+                (rollup.opportunity_sum or 0.0) + sign * entry.opportunity_score, 6
+            )
+            rollup.opportunity_count = (rollup.opportunity_count or 0) + sign
+        if entry.confidence_level is not None:
+            rollup.confidence_sum = round(
+                (rollup.confidence_sum or 0.0) + sign * entry.confidence_level, 6
+            )
+            rollup.confidence_count = (rollup.confidence_count or 0) + sign
+
+        # Recommendation histogram
+        if entry.recommendation:
+            counts = json.loads(rollup.recommendation_counts or "{}")
+            _bump(counts, entry.recommendation, sign)
+            rollup.recommendation_counts = json.dumps(counts)
+
+        # Per-tag counts
+        if entry.tags:
+            counts = json.loads(rollup.tag_counts or "{}")
+            for tag in entry.tags.split(","):
+                if tag:
+                    _bump(counts, tag, sign)
+            rollup.tag_counts = json.dumps(counts)
+
+        # Per-day buckets; unscored decisions count but do not lower the averages
+        created_at = entry.created_at or datetime.utcnow()
+        day = created_at.strftime("%Y-%m-%d")
+        buckets = json.loads(rollup.daily_buckets or "{}")
+        bucket = _day_bucket(buckets.get(day, [0, 0.0, 0.0, 0, 0]))
+        bucket[0] += sign
+        if entry.risk_score is not None:
+            bucket[1] = round(bucket[1] + sign * entry.risk_score, 6)
+            bucket[3] += sign
+        if entry.opportunity_score is not None:
+            bucket[2] = round(bucket[2] + sign * entry.opportunity_score, 6)
+            bucket[4] += sign
+        if bucket[0] > 0:
+            buckets[day] = bucket
+        else:
+            buckets.pop(day, None)
+        rollup.daily_buckets = json.dumps(buckets)
+
+
+def _bump(counts: Dict[str, int], key: str, sign: int):
+    """Increment or decrement a counter, dropping it once it reaches zero."""
+    value = counts.get(key, 0) + sign
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _day_bucket(bucket: list) -> list:
+    """
+    A day's [count, risk_sum, opportunity_sum, risk_count, opportunity_count].
+
+    Buckets written before the score counts were tracked hold only the
+    first three; their sums covered every decision of the day.
+    """
+    return bucket if len(bucket) == 5 else bucket + [bucket[0], bucket[0]]
+
+
+def _avg(total: float, count: int) -> float:
+    """Average that tolerates empty counts."""
+    return round(total / count, 4) if count else 0
+
+
+def period_expression(column, bucket: str, dialect_name: str):
+    """
+    Build a SQL expression that truncates a timestamp to the start of its bucket.
+    
+    Args:
+        column: DateTime column to bucket
+        bucket: "day", "week" (Monday start) or "month"
+        dialect_name: SQLAlchemy dialect name of the bound engine
+        
+    Returns:
+        SQL expression yielding a YYYY-MM-DD string
+    """
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'. Use one of: {', '.join(TIME_BUCKETS)}")
+    
+    if dialect_name == "sqlite":
+        if bucket == "day":
+            return func.date(column)
+        if bucket == "week":
+            # Step back 6 days, then forward to the next Monday (same day if Monday)
+            return func.date(column, "-6 days", "weekday 1")
+        return func.strftime("%Y-%m-01", column)
+    
+    return func.to_char(func.date_trunc(bucket, column), "YYYY-MM-DD")
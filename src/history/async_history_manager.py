@@ -0,0 +1,140 @@
+"""Async decision history management for the FastAPI service."""
+from datetime import datetime
+from typing import List, Optional, Dict
+from ..auth.database import get_async_session
+from ..schemas import AgentState
+from . import queries, usage
+
+
+async def _run(fn, *args, commit: bool = False):
+    """Run a session-level query on an async session without blocking the loop."""
+    async with get_async_session() as session:
+        try:
+            result = await session.run_sync(fn, *args)
+            if commit:
+                await session.commit()
+            return result
+        except Exception:
+            await session.rollback()
+            raise
+
+
+class AsyncHistoryManager:
+    """Async counterpart of HistoryManager, backed by SQLAlchemy asyncio."""
+
+    @staticmethod
+    async def save_decision(user_id: int, state: AgentState, tags: List[str] = None) -> int:
+        """
+        Save a decision analysis to history.
+
+        Returns:
+            Decision ID
+        """
+        try:
+            return await _run(queries.save_decision, user_id, state, tags, commit=True)
+        except Exception as e:
+            raise Exception(f"Failed to save decision: {str(e)}")
+
+    @staticmethod
+    async def get_user_history(
+        user_id: int,
+        search: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Get decision history for a user."""
+        return await _run(queries.get_user_history, user_id, search, tags, limit)
+
+    @staticmethod
+    async def get_decision_by_id(decision_id: int) -> Optional[Dict]:
+        """Get full decision analysis by ID."""
+        return await _run(queries.get_decision_by_id, decision_id)
+
+    @staticmethod
+    async def delete_decision(decision_id: int, user_id: int) -> bool:
+        """Delete a decision from history."""
+        try:
+            return await _run(queries.delete_decision, decision_id, user_id, commit=True)
+        except Exception:
+            return False
+
+    @staticmethod
+    async def find_similar_decisions(
+        user_id: int,
+        decision: str,
+        context: Optional[str] = None,
+        limit: int = 3,
+        threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """Find past decisions that are near-duplicates of a new one."""
+        return await _run(queries.find_similar_decisions, user_id, decision, context, limit, threshold)
+
+    @staticmethod
+    async def get_analytics_summary(user_id: int) -> Dict:
+        """Get a user's analytics summary from the rollup table."""
+        return await _run(queries.get_analytics_summary, user_id, commit=True)
+
+    @staticmethod
+    async def get_analytics_timeseries(
+        user_id: int,
+        bucket: str = "day",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict:
+        """Get time-bucketed decision statistics aggregated in SQL."""
+        return await _run(queries.get_analytics_timeseries, user_id, bucket, start, end)
+
+    @staticmethod
+    async def get_score_distribution(user_id: int) -> Dict:
+        """Get score histograms and per-recommendation confidence stats."""
+        return await _run(queries.get_score_distribution, user_id)
+
+    @staticmethod
+    async def get_score_points(user_id: int, limit: int = 1000) -> Dict:
+        """Get per-decision scores without loading full analyses."""
+        return await _run(queries.get_score_points, user_id, limit)
+
+    @staticmethod
+    async def get_factor_analytics(
+        user_id: int,
+        group_by: str = "category",
+        order_by: str = "avg_risk",
+        limit: int = 20
+    ) -> Dict:
+        """Get per-factor risk/opportunity aggregates across a user's decisions."""
+        return await _run(queries.get_factor_analytics, user_id, group_by, order_by, limit)
+
+    @staticmethod
+    async def get_all_tags(user_id: int) -> List[str]:
+        """Get all unique tags for a user."""
+        return await _run(queries.get_all_tags, user_id)
+
+    @staticmethod
+    async def search_decisions(user_id: int, query: str) -> List:
+        """Search decisions by text query."""
+        return await _run(queries.search_decisions, user_id, query)
+
+    @staticmethod
+    async def get_decisions_by_tag(user_id: int, tag: str) -> List:
+        """Get decisions filtered by a specific tag."""
+        return await _run(queries.get_decisions_by_tag, user_id, tag)
+
+    @staticmethod
+    async def get_usage_summary(
+        user_id: int,
+        group_by: str = "agent",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict:
+        """Get a user's LLM tokens, cost, latency and cache hits aggregated in SQL."""
+        return await _run(usage.get_usage_summary, user_id, group_by, start, end)
+
+    @staticmethod
+    async def get_usage_quota(user_id: int) -> Dict:
+        """Get a user's usage today against the daily quotas."""
+        return await _run(usage.quota_status, user_id)
+
+    @staticmethod
+    async def check_usage_quota(user_id: int) -> Dict:
+        """Get a user's usage today, raising QuotaExceeded if a quota is used up."""
+        return await _run(usage.check_quota, user_id)
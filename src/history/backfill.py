@@ -0,0 +1,23 @@
+"""Backfill decision_factor_scores for decisions saved before the table existed.
+
+Usage:
+    python -m src.history.backfill [--batch-size 200] [--user-id ID]
+"""
+import argparse
+from ..auth.database import init_db
+from .history_manager import HistoryManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill decision_factor_scores from saved analyses")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    init_db()
+    count = HistoryManager.backfill_factor_scores(batch_size=args.batch_size, user_id=args.user_id)
+    print(f"✅ Backfilled factor scores for {count} decision(s)")
+
+
+if __name__ == "__main__":
+    main()
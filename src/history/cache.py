@@ -0,0 +1,256 @@
+"""Read-through LRU cache for parsed decision payloads."""
+import copy
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from config import settings
+
+
+class CacheBackend(ABC):
+    """Storage for cached payloads."""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        """Store a value, evicting least recently used entries if full."""
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """Remove every entry whose key starts with prefix."""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Number of cached entries."""
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache (one per worker)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    LRU cache in a local SQLite file, shared by every worker on the host.
+
+    Values are pickled; the file must only be writable by this application.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "data/decision_cache.db", max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache (accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit-per-statement mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, accessed) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def delete_prefix(self, prefix: str):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._connect().execute(
+            "DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class DecisionCache:
+    """
+    Read-through cache of parsed decision payloads keyed by (id, version).
+
+    The version comes from DecisionHistory.version, which SQLAlchemy bumps on
+    every ORM update, so an updated row can never be served from a stale
+    entry. Deletes invalidate explicitly to free space.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(decision_id: int, version: int) -> str:
+        return f"decision:{decision_id}:v{version}"
+
+    def get_or_load(self, decision_id: int, version: int, loader: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Return the cached payload, or call loader() and cache its result.
+
+        Callers get their own copy, so changing it cannot corrupt the cache.
+        """
+        if self.backend is None:
+            return loader()
+
+        key = self._key(decision_id, version)
+        payload = self.backend.get(key)
+
+        with self._lock:
+            if payload is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if payload is None:
+            payload = loader()
+            if payload is not None:
+                self.backend.set(key, payload)
+
+        return copy.deepcopy(payload)
+
+    def invalidate(self, decision_id: int):
+        """Drop every cached version of a decision."""
+        if self.backend is not None:
+            self.backend.delete_prefix(f"decision:{decision_id}:")
+
+    def clear(self):
+        """Drop all cached payloads and reset counters."""
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this process and the backend's current size."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": self.backend.size() if self.backend else 0
+        }
+
+
+def create_cache_backend(
+    backend: str = None,
+    max_entries: int = None,
+    path: str = None
+) -> Optional[CacheBackend]:
+    """
+    Create a cache backend based on configuration.
+
+    Args:
+        backend: "memory", "sqlite" or "none" (uses settings default if None)
+        max_entries: LRU capacity (uses settings default if None)
+        path: SQLite file for the shared backend (uses settings default if None)
+
+    Returns:
+        CacheBackend instance, or None when caching is disabled
+    """
+    backend = (backend or settings.DECISION_CACHE_BACKEND).lower()
+    max_entries = max_entries or settings.DECISION_CACHE_SIZE
+
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries=max_entries)
+
+    elif backend == "sqlite":
+        return SQLiteCacheBackend(
+            path=path or settings.DECISION_CACHE_PATH,
+            max_entries=max_entries
+        )
+
+    elif backend == "none":
+        return None
+
+    else:
+        raise ValueError(
+            f"Unsupported cache backend: {backend}. "
+            "Use 'memory', 'sqlite', or 'none'"
+        )
+
+
+decision_cache = DecisionCache(create_cache_backend())
@@ -0,0 +1,134 @@
+"""Factor-level score rows for cross-decision analytics."""
+import json
+from typing import Dict, List, Optional
+from sqlalchemy import exists
+from ..auth.database import DecisionHistory, DecisionFactorScore
+
+
+class FactorScores:
+    """Builds and maintains decision_factor_scores rows."""
+
+    @staticmethod
+    def rows_from_analysis(
+        decision_id: int,
+        user_id: int,
+        analysis: Dict
+    ) -> List[DecisionFactorScore]:
+        """
+        Merge planner, risk and opportunity output into one row per factor.
+
+        Args:
+            decision_id: DecisionHistory ID
+            user_id: Owner of the decision
+            analysis: Dict with "planner", "risk" and "opportunity" sections,
+                shaped like the full_analysis JSON
+
+        Returns:
+            Unsaved DecisionFactorScore rows
+        """
+        planner = analysis.get("planner") or {}
+        risk = analysis.get("risk") or {}
+        opportunity = analysis.get("opportunity") or {}
+
+        factors: Dict[str, Dict] = {}
+
+        def entry(name: Optional[str]) -> Optional[Dict]:
+            """The row for a factor, or None if the record has no name for it."""
+            if not isinstance(name, str) or not name.strip():
+                return None
+            key = name.strip().lower()
+            return factors.setdefault(key, {"factor_name": name.strip()})
+
+        for factor in planner.get("factors") or []:
+            row = entry(factor.get("name"))
+            if row is not None:
+                row["category"] = (factor.get("category") or "").lower() or None
+
+        for score in risk.get("risk_scores") or []:
+            row = entry(score.get("factor_name"))
+            if row is not None:
+                row["risk"] = score.get("score")
+                row["severity"] = (score.get("severity") or "").lower() or None
+
+        for score in opportunity.get("opportunity_scores") or []:
+            row = entry(score.get("factor_name"))
+            if row is not None:
+                row["opportunity"] = score.get("score")
+                row["potential"] = (score.get("potential") or "").lower() or None
+
+        return [
+            DecisionFactorScore(
+                decision_id=decision_id,
+                user_id=user_id,
+                factor_name=row["factor_name"][:200],
+                category=row.get("category") or "uncategorized",
+                risk=row.get("risk"),
+                severity=row.get("severity"),
+                opportunity=row.get("opportunity"),
+                potential=row.get("potential")
+            )
+            for row in factors.values()
+        ]
+
+    @staticmethod
+    def save(session, decision_id: int, user_id: int, analysis: Dict) -> int:
+        """Add factor rows for a decision to the session. Returns row count."""
+        rows = FactorScores.rows_from_analysis(decision_id, user_id, analysis)
+        session.add_all(rows)
+        return len(rows)
+
+    @staticmethod
+    def delete(session, decision_id: int):
+        """Remove a decision's factor rows."""
+        session.query(DecisionFactorScore).filter(
+            DecisionFactorScore.decision_id == decision_id
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def backfill(session, batch_size: int = 200, user_id: Optional[int] = None) -> int:
+        """
+        Create factor rows for decisions that have none yet.
+
+        Every decision looked at is marked ``factors_indexed``, including
+        analyses without factors and unreadable ones, so a repeat run skips
+        them instead of parsing them again. Commits after each batch so a
+        long backfill can be interrupted and resumed.
+
+        Returns:
+            Number of decisions backfilled
+        """
+        has_rows = exists().where(DecisionFactorScore.decision_id == DecisionHistory.id)
+        processed = 0
+
+        while True:
+            query = session.query(
+                DecisionHistory.id,
+                DecisionHistory.user_id,
+                DecisionHistory.full_analysis,
+                has_rows.label("has_rows")
+            ).filter(DecisionHistory.factors_indexed.is_(False))
+
+            if user_id is not None:
+                query = query.filter(DecisionHistory.user_id == user_id)
+
+            batch = query.order_by(DecisionHistory.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for decision_id, owner_id, full_analysis, indexed in batch:
+                if indexed:
+                    continue
+                try:
+                    analysis = json.loads(full_analysis) if full_analysis else {}
+                except ValueError:
+                    continue
+                FactorScores.save(session, decision_id, owner_id, analysis)
+                processed += 1
+
+            session.query(DecisionHistory).filter(
+                DecisionHistory.id.in_([row[0] for row in batch])
+            ).update({DecisionHistory.factors_indexed: True}, synchronize_session=False)
+            session.commit()
+
+        return processed
+
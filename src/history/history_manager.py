@@ -1,58 +1,38 @@
 """Manage decision history."""
-import json
 from datetime import datetime
 from typing import List, Optional, Dict
-from ..auth.database import DecisionHistory, get_session
+from ..auth.database import get_session
 from ..schemas import AgentState
+from . import queries
+from .factor_scores import FactorScores
+from . import usage
 
 
 class HistoryManager:
     """Manages decision history for users."""
-    
+
     @staticmethod
     def save_decision(user_id: int, state: AgentState, tags: List[str] = None) -> int:
         """
         Save a decision analysis to history.
-        
+
         Returns:
             Decision ID
         """
         session = get_session()
-        
-        try:
-            rec = state.recommendation
-            
-            # Create history entry
-            history = DecisionHistory(
-                user_id=user_id,
-                decision_text=state.decision_input.decision,
-                context=state.decision_input.context,
-                timeframe=state.decision_input.timeframe,
-                recommendation=rec.recommendation,
-                confidence_level=rec.confidence_level,
-                risk_score=rec.overall_risk_score,
-                opportunity_score=rec.overall_opportunity_score,
-                tags=",".join(tags) if tags else "",
-                full_analysis=json.dumps({
-                    "planner": state.planner_output.model_dump() if state.planner_output else None,
-                    "research": state.research_output.model_dump() if state.research_output else None,
-                    "risk": state.risk_output.model_dump() if state.risk_output else None,
-                    "opportunity": state.opportunity_output.model_dump() if state.opportunity_output else None,
-                    "recommendation": rec.model_dump()
-                })
-            )
-            
-            session.add(history)
+
+        try:
+            decision_id = queries.save_decision(session, user_id, state, tags)
             session.commit()
-            
-            return history.id
-            
+
+            return decision_id
+
         except Exception as e:
             session.rollback()
             raise Exception(f"Failed to save decision: {str(e)}")
         finally:
             session.close()
-    
+
     @staticmethod
     def get_user_history(
         user_id: int,
@@ -62,173 +42,314 @@ class HistoryManager:
     ) -> List[Dict]:
         """
         Get decision history for a user.
-        
+
         Args:
             user_id: User ID
             search: Search term for decision text
             tags: Filter by tags
             limit: Maximum number of results
-            
+
         Returns:
             List of decision history entries
         """
         session = get_session()
-        
-        try:
-            query = session.query(DecisionHistory).filter(
-                DecisionHistory.user_id == user_id
-            )
-            
-            # Apply search filter
-            if search:
-                query = query.filter(
-                    DecisionHistory.decision_text.contains(search)
-                )
-            
-            # Apply tag filter
-            if tags:
-                for tag in tags:
-                    query = query.filter(
-                        DecisionHistory.tags.contains(tag)
-                    )
-            
-            # Order by most recent
-            query = query.order_by(DecisionHistory.created_at.desc())
-            
-            # Limit results
-            results = query.limit(limit).all()
-            
-            return [
-                {
-                    "id": r.id,
-                    "decision_text": r.decision_text,
-                    "recommendation": r.recommendation,
-                    "confidence_level": r.confidence_level,
-                    "risk_score": r.risk_score,
-                    "opportunity_score": r.opportunity_score,
-                    "tags": r.tags.split(",") if r.tags else [],
-                    "created_at": r.created_at,
-                    "context": r.context,
-                    "timeframe": r.timeframe
-                }
-                for r in results
-            ]
-            
-        finally:
-            session.close()
-    
+
+        try:
+            return queries.get_user_history(session, user_id, search, tags, limit)
+
+        finally:
+            session.close()
+
     @staticmethod
     def get_decision_by_id(decision_id: int) -> Optional[Dict]:
         """Get full decision analysis by ID."""
         session = get_session()
-        
-        try:
-            decision = session.query(DecisionHistory).filter(
-                DecisionHistory.id == decision_id
-            ).first()
-            
-            if not decision:
-                return None
-            
-            return {
-                "id": decision.id,
-                "decision_text": decision.decision_text,
-                "context": decision.context,
-                "timeframe": decision.timeframe,
-                "recommendation": decision.recommendation,
-                "confidence_level": decision.confidence_level,
-                "risk_score": decision.risk_score,
-                "opportunity_score": decision.opportunity_score,
-                "tags": decision.tags.split(",") if decision.tags else [],
-                "created_at": decision.created_at,
-                "full_analysis": json.loads(decision.full_analysis) if decision.full_analysis else None
-            }
-            
-        finally:
-            session.close()
-    
+
+        try:
+            return queries.get_decision_by_id(session, decision_id)
+
+        finally:
+            session.close()
+
     @staticmethod
     def delete_decision(decision_id: int, user_id: int) -> bool:
         """Delete a decision from history."""
         session = get_session()
-        
-        try:
-            decision = session.query(DecisionHistory).filter(
-                DecisionHistory.id == decision_id,
-                DecisionHistory.user_id == user_id
-            ).first()
-            
-            if decision:
-                session.delete(decision)
-                session.commit()
-                return True
-            
-            return False
-            
+
+        try:
+            deleted = queries.delete_decision(session, decision_id, user_id)
+            session.commit()
+            return deleted
+
         except Exception:
             session.rollback()
             return False
         finally:
             session.close()
-    
+
+    @staticmethod
+    def find_similar_decisions(
+        user_id: int,
+        decision: str,
+        context: Optional[str] = None,
+        limit: int = 3,
+        threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Find past decisions that are near-duplicates of a new one.
+
+        Args:
+            user_id: User ID
+            decision: New decision text
+            context: New decision context
+            limit: Maximum number of matches
+            threshold: Minimum similarity 0-1 (uses settings default if None)
+
+        Returns:
+            List of {"id", "decision_text", "created_at", "similarity"}
+        """
+        session = get_session()
+
+        try:
+            return queries.find_similar_decisions(session, user_id, decision, context, limit, threshold)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_analytics_summary(user_id: int) -> Dict:
+        """
+        Get a user's analytics summary from the rollup table.
+
+        The rollup is built from history once on first access and kept up to
+        date by save_decision/delete_decision afterwards.
+
+        Returns:
+            Dictionary with totals, averages, recommendation/tag counts and
+            per-day buckets
+        """
+        session = get_session()
+
+        try:
+            summary = queries.get_analytics_summary(session, user_id)
+            session.commit()
+            return summary
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_analytics_timeseries(
+        user_id: int,
+        bucket: str = "day",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Get time-bucketed decision statistics aggregated in SQL.
+
+        Args:
+            user_id: User ID
+            bucket: "day", "week" or "month"
+            start: Optional inclusive lower bound on created_at
+            end: Optional exclusive upper bound on created_at
+
+        Returns:
+            Column-oriented dictionary: one list per metric, aligned with "period"
+        """
+        session = get_session()
+
+        try:
+            return queries.get_analytics_timeseries(session, user_id, bucket, start, end)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_score_distribution(user_id: int) -> Dict:
+        """
+        Get score histograms and per-recommendation confidence stats in SQL.
+
+        Risk and opportunity scores are binned into whole points (0-10).
+
+        Returns:
+            Column-oriented dictionary of histogram counts and confidence stats
+        """
+        session = get_session()
+
+        try:
+            return queries.get_score_distribution(session, user_id)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_score_points(user_id: int, limit: int = 1000) -> Dict:
+        """
+        Get per-decision scores for scatter plots without loading full analyses.
+
+        Returns:
+            Column-oriented dictionary of id, text preview, scores and recommendation
+        """
+        session = get_session()
+
+        try:
+            return queries.get_score_points(session, user_id, limit)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_factor_analytics(
+        user_id: int,
+        group_by: str = "category",
+        order_by: str = "avg_risk",
+        limit: int = 20
+    ) -> Dict:
+        """
+        Get per-factor risk/opportunity aggregates across a user's decisions.
+
+        Args:
+            user_id: User ID
+            group_by: "category" or "factor"
+            order_by: Metric to sort by, descending (e.g. "avg_risk", "count")
+            limit: Maximum number of groups
+
+        Returns:
+            Column-oriented dictionary: one list per metric, aligned with "key"
+        """
+        session = get_session()
+
+        try:
+            return queries.get_factor_analytics(session, user_id, group_by, order_by, limit)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def backfill_factor_scores(batch_size: int = 200, user_id: Optional[int] = None) -> int:
+        """Create factor score rows for decisions saved before the table existed."""
+        session = get_session()
+
+        try:
+            return FactorScores.backfill(session, batch_size=batch_size, user_id=user_id)
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
     @staticmethod
     def get_all_tags(user_id: int) -> List[str]:
         """Get all unique tags for a user."""
         session = get_session()
-        
+
         try:
-            results = session.query(DecisionHistory.tags).filter(
-                DecisionHistory.user_id == user_id,
-                DecisionHistory.tags != ""
-            ).all()
-            
-            # Extract and deduplicate tags
-            all_tags = set()
-            for (tags_str,) in results:
-                if tags_str:
-                    all_tags.update(tags_str.split(","))
-            
-            return sorted(list(all_tags))
-            
+            return queries.get_all_tags(session, user_id)
+
         finally:
             session.close()
 
-    
+
     @staticmethod
     def get_user_tags(user_id: int) -> List[str]:
         """Alias for get_all_tags for backward compatibility."""
         return HistoryManager.get_all_tags(user_id)
-    
+
     @staticmethod
     def search_decisions(user_id: int, query: str) -> List:
         """Search decisions by text query."""
         session = get_session()
-        
+
         try:
-            results = session.query(DecisionHistory).filter(
-                DecisionHistory.user_id == user_id,
-                DecisionHistory.decision_text.contains(query)
-            ).order_by(DecisionHistory.created_at.desc()).all()
-            
             # Convert to list of objects (not dicts) for compatibility
-            return results
-            
+            return queries.search_decisions(session, user_id, query)
+
         finally:
             session.close()
-    
+
     @staticmethod
     def get_decisions_by_tag(user_id: int, tag: str) -> List:
         """Get decisions filtered by a specific tag."""
         session = get_session()
-        
+
         try:
-            results = session.query(DecisionHistory).filter(
-                DecisionHistory.user_id == user_id,
-                DecisionHistory.tags.contains(tag)
-            ).order_by(DecisionHistory.created_at.desc()).all()
-            
             # Convert to list of objects (not dicts) for compatibility
-            return results
-            
+            return queries.get_decisions_by_tag(session, user_id, tag)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def record_usage(**fields) -> None:
+        """Add one row to the LLM usage ledger (see LLMUsage for the fields)."""
+        session = get_session()
+
+        try:
+            usage.record_usage(session, **fields)
+            session.commit()
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_usage_summary(
+        user_id: int,
+        group_by: str = "agent",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Get a user's LLM tokens, cost, latency and cache hits aggregated in SQL.
+
+        Args:
+            user_id: User ID
+            group_by: "agent", "model", "run" or "day"
+            start: Optional inclusive lower bound on created_at
+            end: Optional exclusive upper bound on created_at
+
+        Returns:
+            Column-oriented dictionary: one list per metric, aligned with
+            "key", plus "totals" over the whole range
+        """
+        session = get_session()
+
+        try:
+            return usage.get_usage_summary(session, user_id, group_by, start, end)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_usage_quota(user_id: int) -> Dict:
+        """Get a user's usage today (UTC) against the daily quotas."""
+        session = get_session()
+
+        try:
+            return usage.quota_status(session, user_id)
+
+        finally:
+            session.close()
+
+    @staticmethod
+    def check_usage_quota(user_id: int) -> Dict:
+        """
+        Get a user's usage today against the daily quotas.
+
+        Raises:
+            QuotaExceeded: If a daily quota is used up
+        """
+        session = get_session()
+
+        try:
+            return usage.check_quota(session, user_id)
+
         finally:
             session.close()
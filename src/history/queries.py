@@ -0,0 +1,432 @@
+"""Session-level history queries shared by the sync and async managers.
+
+Every function takes a synchronous SQLAlchemy ``Session`` as its first
+argument and leaves transaction control (commit/rollback/close) to the
+caller. ``HistoryManager`` calls them with a regular session, while
+``AsyncHistoryManager`` runs them through ``AsyncSession.run_sync``.
+In-memory state (the decision cache and similarity index) is only
+updated once the caller's transaction commits.
+"""
+import json
+from datetime import datetime
+from typing import List, Optional, Dict
+from sqlalchemy import event, func, case, cast, Integer
+from sqlalchemy.orm import Session
+from ..auth.database import DecisionHistory, DecisionFactorScore, UserAnalytics
+from ..schemas import AgentState
+from .analytics import AnalyticsRollup, period_expression
+from .cache import decision_cache
+from .factor_scores import FactorScores
+from .similarity import similarity_index
+
+# Ways factor scores can be grouped for analytics
+FACTOR_GROUPS = {
+    "category": DecisionFactorScore.category,
+    "factor": DecisionFactorScore.factor_name,
+}
+
+
+def _after_commit(session, fn, *args):
+    """Call fn(*args) once the session's transaction commits, never on rollback."""
+    session.info.setdefault("history_after_commit", []).append((fn, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    # Savepoint commits fire this too; wait for the outermost transaction
+    if session.in_nested_transaction():
+        return
+    for fn, args in session.info.pop("history_after_commit", []):
+        fn(*args)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_commit(session, transaction):
+    # Callbacks still pending when the outermost transaction ends were rolled back
+    if transaction.parent is None:
+        session.info.pop("history_after_commit", None)
+
+
+def save_decision(session, user_id: int, state: AgentState, tags: List[str] = None) -> int:
+    """Insert a history row, its factor scores and the rollup. Returns the ID."""
+    rec = state.recommendation
+    analysis = {
+        "planner": state.planner_output.model_dump() if state.planner_output else None,
+        "research": state.research_output.model_dump() if state.research_output else None,
+        "risk": state.risk_output.model_dump() if state.risk_output else None,
+        "opportunity": state.opportunity_output.model_dump() if state.opportunity_output else None,
+        "recommendation": rec.model_dump(),
+        "mode": state.analysis_mode,
+        "degradations": state.degradations
+    }
+
+    # Create history entry
+    history = DecisionHistory(
+        user_id=user_id,
+        decision_text=state.decision_input.decision,
+        context=state.decision_input.context,
+        timeframe=state.decision_input.timeframe,
+        recommendation=rec.recommendation,
+        confidence_level=rec.confidence_level,
+        risk_score=rec.overall_risk_score,
+        opportunity_score=rec.overall_opportunity_score,
+        tags=",".join(tags) if tags else "",
+        full_analysis=json.dumps(analysis),
+        factors_indexed=True
+    )
+
+    session.add(history)
+    session.flush()
+
+    # Keep factor scores and the analytics rollup in the same transaction
+    FactorScores.save(session, history.id, user_id, analysis)
+    AnalyticsRollup.apply(session, history, sign=1)
+    # Rows are expired on commit, so index the values as flushed
+    _after_commit(
+        session, similarity_index.add, user_id, history.id,
+        history.decision_text, history.context, history.created_at
+    )
+
+    return history.id
+
+
+def get_user_history(
+    session,
+    user_id: int,
+    search: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    limit: int = 50
+) -> List[Dict]:
+    """Get filtered decision history rows as dictionaries."""
+    query = session.query(DecisionHistory).filter(
+        DecisionHistory.user_id == user_id
+    )
+
+    # Apply search filter
+    if search:
+        query = query.filter(
+            DecisionHistory.decision_text.contains(search)
+        )
+
+    # Apply tag filter
+    if tags:
+        for tag in tags:
+            query = query.filter(
+                DecisionHistory.tags.contains(tag)
+            )
+
+    # Order by most recent
+    query = query.order_by(DecisionHistory.created_at.desc())
+
+    # Limit results
+    results = query.limit(limit).all()
+
+    return [
+        {
+            "id": r.id,
+            "decision_text": r.decision_text,
+            "recommendation": r.recommendation,
+            "confidence_level": r.confidence_level,
+            "risk_score": r.risk_score,
+            "opportunity_score": r.opportunity_score,
+            "tags": r.tags.split(",") if r.tags else [],
+            "created_at": r.created_at,
+            "context": r.context,
+            "timeframe": r.timeframe
+        }
+        for r in results
+    ]
+
+
+def get_decision_by_id(session, decision_id: int) -> Optional[Dict]:
+    """
+    Get full decision analysis by ID.
+
+    Only the row version is read from the database; the full payload is
+    loaded and parsed on a cache miss.
+    """
+    version = session.query(DecisionHistory.version).filter(
+        DecisionHistory.id == decision_id
+    ).scalar()
+
+    if version is None:
+        return None
+
+    return decision_cache.get_or_load(
+        decision_id,
+        version,
+        lambda: _load_decision(session, decision_id)
+    )
+
+
+def _load_decision(session, decision_id: int) -> Optional[Dict]:
+    """Load and parse a full decision row."""
+    decision = session.query(DecisionHistory).filter(
+        DecisionHistory.id == decision_id
+    ).first()
+
+    if not decision:
+        return None
+
+    return {
+        "id": decision.id,
+        "user_id": decision.user_id,
+        "decision_text": decision.decision_text,
+        "context": decision.context,
+        "timeframe": decision.timeframe,
+        "recommendation": decision.recommendation,
+        "confidence_level": decision.confidence_level,
+        "risk_score": decision.risk_score,
+        "opportunity_score": decision.opportunity_score,
+        "tags": decision.tags.split(",") if decision.tags else [],
+        "created_at": decision.created_at,
+        "full_analysis": json.loads(decision.full_analysis) if decision.full_analysis else None
+    }
+
+
+def delete_decision(session, decision_id: int, user_id: int) -> bool:
+    """Delete a user's decision and update the analytics rollup."""
+    decision = session.query(DecisionHistory).filter(
+        DecisionHistory.id == decision_id,
+        DecisionHistory.user_id == user_id
+    ).first()
+
+    if not decision:
+        return False
+
+    session.delete(decision)
+    FactorScores.delete(session, decision_id)
+    session.flush()
+
+    # Keep the analytics rollup in the same transaction
+    AnalyticsRollup.apply(session, decision, sign=-1)
+    _after_commit(session, decision_cache.invalidate, decision_id)
+    _after_commit(session, similarity_index.remove, user_id, decision_id)
+    return True
+
+
+def find_similar_decisions(
+    session,
+    user_id: int,
+    decision: str,
+    context: Optional[str] = None,
+    limit: int = 3,
+    threshold: Optional[float] = None
+) -> List[Dict]:
+    """Find a user's past decisions that are near-duplicates of a new one."""
+    return similarity_index.find_similar(session, user_id, decision, context, limit, threshold)
+
+
+def get_analytics_summary(session, user_id: int) -> Dict:
+    """Read the user's rollup, backfilling it from history on first access."""
+    rollup = session.get(UserAnalytics, user_id)
+
+    if rollup is None:
+        rollup = AnalyticsRollup.rebuild(session, user_id)
+
+    return AnalyticsRollup.to_summary(rollup)
+
+
+def get_analytics_timeseries(
+    session,
+    user_id: int,
+    bucket: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict:
+    """Aggregate decision statistics per time bucket in SQL."""
+    period = period_expression(
+        DecisionHistory.created_at,
+        bucket,
+        session.get_bind().dialect.name
+    ).label("period")
+
+    filters = [DecisionHistory.user_id == user_id]
+    if start:
+        filters.append(DecisionHistory.created_at >= start)
+    if end:
+        filters.append(DecisionHistory.created_at < end)
+
+    rows = session.query(
+        period,
+        func.count(DecisionHistory.id),
+        func.avg(DecisionHistory.risk_score),
+        func.min(DecisionHistory.risk_score),
+        func.max(DecisionHistory.risk_score),
+        func.avg(DecisionHistory.opportunity_score),
+        func.min(DecisionHistory.opportunity_score),
+        func.max(DecisionHistory.opportunity_score),
+        func.avg(DecisionHistory.confidence_level)
+    ).filter(*filters).group_by(period).order_by(period).all()
+
+    rec_rows = session.query(
+        period,
+        DecisionHistory.recommendation,
+        func.count(DecisionHistory.id)
+    ).filter(*filters).group_by(period, DecisionHistory.recommendation).all()
+
+    periods = [r[0] for r in rows]
+    index = {p: i for i, p in enumerate(periods)}
+
+    recommendations: Dict[str, List[int]] = {}
+    for p, rec, count in rec_rows:
+        series = recommendations.setdefault(rec or "Unknown", [0] * len(periods))
+        series[index[p]] = count
+
+    def column(i: int) -> List:
+        return [round(r[i], 2) if r[i] is not None else None for r in rows]
+
+    return {
+        "bucket": bucket,
+        "period": periods,
+        "count": [r[1] for r in rows],
+        "avg_risk": column(2),
+        "min_risk": column(3),
+        "max_risk": column(4),
+        "avg_opportunity": column(5),
+        "min_opportunity": column(6),
+        "max_opportunity": column(7),
+        "avg_confidence": column(8),
+        "recommendations": recommendations
+    }
+
+
+def get_score_distribution(session, user_id: int) -> Dict:
+    """Aggregate 0-10 score histograms and confidence stats in SQL."""
+    bins = list(range(11))
+
+    def histogram(score_column) -> List[int]:
+        # Clamp 10.0 into the top bin alongside 9.x scores
+        bin_expr = case(
+            (score_column >= 10, 10),
+            else_=cast(score_column, Integer)
+        ).label("bin")
+        counts = dict(session.query(
+            bin_expr,
+            func.count(DecisionHistory.id)
+        ).filter(
+            DecisionHistory.user_id == user_id,
+            score_column.isnot(None)
+        ).group_by(bin_expr).all())
+        return [counts.get(b, 0) for b in bins]
+
+    conf_rows = session.query(
+        DecisionHistory.recommendation,
+        func.count(DecisionHistory.id),
+        func.min(DecisionHistory.confidence_level),
+        func.avg(DecisionHistory.confidence_level),
+        func.max(DecisionHistory.confidence_level)
+    ).filter(
+        DecisionHistory.user_id == user_id
+    ).group_by(DecisionHistory.recommendation).order_by(DecisionHistory.recommendation).all()
+
+    return {
+        "bins": bins,
+        "risk": histogram(DecisionHistory.risk_score),
+        "opportunity": histogram(DecisionHistory.opportunity_score),
+        "confidence_by_recommendation": {
+            "recommendation": [r[0] or "Unknown" for r in conf_rows],
+            "count": [r[1] for r in conf_rows],
+            "min": [round(r[2] or 0, 3) for r in conf_rows],
+            "avg": [round(r[3] or 0, 3) for r in conf_rows],
+            "max": [round(r[4] or 0, 3) for r in conf_rows]
+        }
+    }
+
+
+def get_score_points(session, user_id: int, limit: int = 1000) -> Dict:
+    """Get per-decision scores without loading full analyses."""
+    rows = session.query(
+        DecisionHistory.id,
+        func.substr(DecisionHistory.decision_text, 1, 80),
+        DecisionHistory.risk_score,
+        DecisionHistory.opportunity_score,
+        DecisionHistory.confidence_level,
+        DecisionHistory.recommendation
+    ).filter(
+        DecisionHistory.user_id == user_id
+    ).order_by(DecisionHistory.created_at.desc()).limit(limit).all()
+
+    return {
+        "id": [r[0] for r in rows],
+        "decision_text": [r[1] for r in rows],
+        "risk_score": [r[2] for r in rows],
+        "opportunity_score": [r[3] for r in rows],
+        "confidence_level": [r[4] for r in rows],
+        "recommendation": [r[5] for r in rows]
+    }
+
+
+def get_factor_analytics(
+    session,
+    user_id: int,
+    group_by: str = "category",
+    order_by: str = "avg_risk",
+    limit: int = 20
+) -> Dict:
+    """Aggregate per-factor scores across a user's decisions in SQL."""
+    if group_by not in FACTOR_GROUPS:
+        raise ValueError(f"Unsupported group_by '{group_by}'. Use one of: {', '.join(FACTOR_GROUPS)}")
+
+    key = FACTOR_GROUPS[group_by]
+    metrics = {
+        "count": func.count(DecisionFactorScore.id),
+        "decisions": func.count(func.distinct(DecisionFactorScore.decision_id)),
+        "avg_risk": func.avg(DecisionFactorScore.risk),
+        "max_risk": func.max(DecisionFactorScore.risk),
+        "avg_opportunity": func.avg(DecisionFactorScore.opportunity),
+        "max_opportunity": func.max(DecisionFactorScore.opportunity),
+        "high_risk_count": func.sum(case(
+            (DecisionFactorScore.severity.in_(("high", "critical")), 1),
+            else_=0
+        )),
+    }
+
+    if order_by not in metrics:
+        raise ValueError(f"Unsupported order_by '{order_by}'. Use one of: {', '.join(metrics)}")
+
+    rows = session.query(
+        key, *metrics.values()
+    ).filter(
+        DecisionFactorScore.user_id == user_id
+    ).group_by(key).order_by(metrics[order_by].desc()).limit(limit).all()
+
+    def column(i: int) -> List:
+        return [round(r[i], 2) if r[i] is not None else None for r in rows]
+
+    result = {"group_by": group_by, "key": [r[0] for r in rows]}
+    for i, name in enumerate(metrics, start=1):
+        result[name] = column(i)
+    return result
+
+
+def get_all_tags(session, user_id: int) -> List[str]:
+    """Get all unique tags for a user."""
+    results = session.query(DecisionHistory.tags).filter(
+        DecisionHistory.user_id == user_id,
+        DecisionHistory.tags != ""
+    ).all()
+
+    # Extract and deduplicate tags
+    all_tags = set()
+    for (tags_str,) in results:
+        if tags_str:
+            all_tags.update(tags_str.split(","))
+
+    return sorted(list(all_tags))
+
+
+def search_decisions(session, user_id: int, query: str) -> List:
+    """Search decisions by text query (returns ORM objects)."""
+    return session.query(DecisionHistory).filter(
+        DecisionHistory.user_id == user_id,
+        DecisionHistory.decision_text.contains(query)
+    ).order_by(DecisionHistory.created_at.desc()).all()
+
+
+def get_decisions_by_tag(session, user_id: int, tag: str) -> List:
+    """Get decisions filtered by a specific tag (returns ORM objects)."""
+    return session.query(DecisionHistory).filter(
+        DecisionHistory.user_id == user_id,
+        DecisionHistory.tags.contains(tag)
+    ).order_by(DecisionHistory.created_at.desc()).all()
@@ -0,0 +1,143 @@
+"""Near-duplicate detection over a user's past decisions."""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from config import settings
+from ..auth.database import DecisionHistory
+from ..utils.text_similarity import SimilarityIndex
+
+
+def decision_text(decision: str, context: Optional[str] = None) -> str:
+    """Text that is indexed for a decision: the question plus its context."""
+    return f"{decision}\n{context}" if context else decision
+
+
+class DecisionSimilarityIndex:
+    """
+    Per-user similarity indexes over decision_text + context.
+
+    A user's index is built from the database on first lookup and then kept
+    current by save_decision/delete_decision once they commit, so lookups
+    never rescan history. Only the most recently used users stay in memory.
+
+    Indexes are per process: saves and deletes in other workers are not
+    applied here. Each lookup compares the user's decision count and
+    newest ID in the database with the index and rebuilds it if they
+    differ.
+    """
+
+    def __init__(self, max_users: int = 128):
+        self.max_users = max_users
+        self._indexes: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(index: SimilarityIndex) -> Tuple[int, Optional[int]]:
+        """Decision count and newest ID in an index."""
+        return len(index), max(index.keys(), default=None)
+
+    def _load(self, session, user_id: int) -> SimilarityIndex:
+        """Return the user's index, building it from history if needed or stale."""
+        stored = tuple(session.query(
+            func.count(DecisionHistory.id),
+            func.max(DecisionHistory.id)
+        ).filter(DecisionHistory.user_id == user_id).one())
+
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and self._signature(index) == stored:
+                self._indexes.move_to_end(user_id)
+                return index
+            # Changed by another process; rebuild
+            self._indexes.pop(user_id, None)
+
+        index = SimilarityIndex()
+        rows = session.query(
+            DecisionHistory.id,
+            DecisionHistory.decision_text,
+            DecisionHistory.context,
+            DecisionHistory.created_at
+        ).filter(DecisionHistory.user_id == user_id).all()
+
+        for decision_id, text, context, created_at in rows:
+            index.add(decision_id, decision_text(text, context), {
+                "decision_text": text,
+                "created_at": created_at
+            })
+
+        with self._lock:
+            # Another thread may have built it meanwhile; keep the first one
+            index = self._indexes.setdefault(user_id, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+
+        return index
+
+    def add(self, user_id: int, decision_id: int, text: str, context: Optional[str], created_at):
+        """Index a newly committed decision if the user's index is loaded."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+
+        if index is not None:
+            index.add(decision_id, decision_text(text, context), {
+                "decision_text": text,
+                "created_at": created_at
+            })
+
+    def remove(self, user_id: int, decision_id: int):
+        """Drop a deleted decision from the user's index."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+
+        if index is not None:
+            index.remove(decision_id)
+
+    def find_similar(
+        self,
+        session,
+        user_id: int,
+        decision: str,
+        context: Optional[str] = None,
+        limit: int = 3,
+        threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Find the user's past decisions most similar to a new one.
+
+        Args:
+            session: SQLAlchemy session, used to check and build the index
+            user_id: User ID
+            decision: New decision text
+            context: New decision context
+            limit: Maximum number of matches
+            threshold: Minimum similarity (uses settings default if None)
+
+        Returns:
+            List of {"id", "decision_text", "created_at", "similarity"}, most
+            similar first
+        """
+        if threshold is None:
+            threshold = settings.SIMILAR_DECISION_THRESHOLD
+
+        index = self._load(session, user_id)
+        matches = []
+        for decision_id, similarity in index.query(decision_text(decision, context), limit, threshold):
+            payload = index.payload(decision_id) or {}
+            matches.append({
+                "id": decision_id,
+                "decision_text": payload.get("decision_text"),
+                "created_at": payload.get("created_at"),
+                "similarity": round(similarity, 4)
+            })
+
+        return matches
+
+    def clear(self):
+        """Drop every loaded index."""
+        with self._lock:
+            self._indexes.clear()
+
+
+similarity_index = DecisionSimilarityIndex()
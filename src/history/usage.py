@@ -0,0 +1,133 @@
+"""LLM usage ledger aggregation and per-user quotas."""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, case
+from config import settings
+from ..auth.database import LLMUsage
+from .analytics import period_expression
+
+# Ways usage can be grouped
+USAGE_GROUPS = ("agent", "model", "run", "day")
+
+
+class QuotaExceeded(Exception):
+    """A user has used up a daily LLM quota."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def record_usage(session, **fields) -> None:
+    """Add one ledger row (see LLMUsage for the fields)."""
+    session.add(LLMUsage(**fields))
+
+
+def _group_key(session, group_by: str):
+    if group_by == "agent":
+        return LLMUsage.agent
+    if group_by == "model":
+        return LLMUsage.model
+    if group_by == "run":
+        return LLMUsage.run_id
+    if group_by == "day":
+        return period_expression(LLMUsage.created_at, "day", session.get_bind().dialect.name)
+    raise ValueError(f"Unsupported group_by '{group_by}'. Use one of: {', '.join(USAGE_GROUPS)}")
+
+
+def _metrics() -> Dict:
+    return {
+        "calls": func.coalesce(func.sum(case((LLMUsage.cache_hit, 0), else_=1)), 0),
+        "input_tokens": func.coalesce(func.sum(LLMUsage.input_tokens), 0),
+        "output_tokens": func.coalesce(func.sum(LLMUsage.output_tokens), 0),
+        "cached_tokens": func.coalesce(func.sum(LLMUsage.cached_tokens), 0),
+        "cache_hits": func.coalesce(func.sum(case((LLMUsage.cache_hit, 1), else_=0)), 0),
+        "errors": func.coalesce(func.sum(case((LLMUsage.error.isnot(None), 1), else_=0)), 0),
+        "cost": func.coalesce(func.sum(LLMUsage.cost), 0.0),
+        "avg_latency": func.avg(LLMUsage.latency_seconds),
+        "max_latency": func.max(LLMUsage.latency_seconds),
+    }
+
+
+def get_usage_summary(
+    session,
+    user_id: int,
+    group_by: str = "agent",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100
+) -> Dict:
+    """Aggregate a user's LLM usage per agent, model, run or day in SQL."""
+    key = _group_key(session, group_by)
+    metrics = _metrics()
+
+    filters = [LLMUsage.user_id == user_id]
+    if start:
+        filters.append(LLMUsage.created_at >= start)
+    if end:
+        filters.append(LLMUsage.created_at < end)
+
+    order = key if group_by == "day" else metrics["cost"].desc()
+    rows = session.query(key, *metrics.values()).filter(*filters).group_by(key).order_by(
+        order, metrics["input_tokens"].desc()
+    ).limit(limit).all()
+    totals = session.query(*metrics.values()).filter(*filters).one()
+
+    def column(i: int) -> List:
+        return [round(r[i], 6) if r[i] is not None else None for r in rows]
+
+    result = {"group_by": group_by, "key": [r[0] for r in rows]}
+    for i, name in enumerate(metrics, start=1):
+        result[name] = column(i)
+    result["totals"] = {
+        name: round(value, 6) if value is not None else None
+        for name, value in zip(metrics, totals)
+    }
+    return result
+
+
+def quota_status(session, user_id: int, now: Optional[datetime] = None) -> Dict:
+    """A user's usage so far today (UTC) against the daily quotas."""
+    now = now or datetime.utcnow()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    tokens, cost = session.query(
+        func.coalesce(func.sum(LLMUsage.input_tokens + LLMUsage.output_tokens), 0),
+        func.coalesce(func.sum(LLMUsage.cost), 0.0)
+    ).filter(LLMUsage.user_id == user_id, LLMUsage.created_at >= day_start).one()
+
+    return {
+        "tokens_used": int(tokens),
+        "token_quota": settings.USER_DAILY_TOKEN_QUOTA or None,
+        "cost_used": round(cost, 6),
+        "cost_quota": settings.USER_DAILY_COST_QUOTA or None,
+        "resets_at": (day_start + timedelta(days=1)).isoformat()
+    }
+
+
+def check_quota(session, user_id: int, now: Optional[datetime] = None) -> Dict:
+    """
+    Quota status for a user who is about to start LLM work.
+
+    Work already running is not interrupted, so a user can go over a
+    quota by at most the requests that were in flight when it was reached.
+
+    Raises:
+        QuotaExceeded: If a daily quota is used up; retry_after is the
+            number of seconds until it resets
+    """
+    now = now or datetime.utcnow()
+    status = quota_status(session, user_id, now)
+    retry_after = (datetime.fromisoformat(status["resets_at"]) - now).total_seconds()
+
+    if status["token_quota"] and status["tokens_used"] >= status["token_quota"]:
+        raise QuotaExceeded(
+            f"Daily token quota of {status['token_quota']} used up; resets at {status['resets_at']} UTC",
+            retry_after
+        )
+    if status["cost_quota"] and status["cost_used"] >= status["cost_quota"]:
+        raise QuotaExceeded(
+            f"Daily cost quota of ${status['cost_quota']:.2f} used up; resets at {status['resets_at']} UTC",
+            retry_after
+        )
+    return status
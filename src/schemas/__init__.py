@@ -1,6 +1,6 @@
 """Pydantic schemas for type-safe data flow."""
 from .decision import DecisionInput
-from .factors import EvaluationFactor, PlannerOutput
+from .factors import EvaluationFactor, PlannerOutput, QuickFactor, QuickPlanOutput
 from .analysis import (
     FactorAnalysis,
     ResearchOutput,
@@ -8,6 +8,7 @@ from .analysis import (
     RiskOutput,
     OpportunityScore,
     OpportunityOutput,
+    RiskOpportunityOutput,
 )
 from .recommendation import ActionItem, Recommendation
 from .state import AgentState
@@ -16,12 +17,15 @@ __all__ = [
     "DecisionInput",
     "EvaluationFactor",
     "PlannerOutput",
+    "QuickFactor",
+    "QuickPlanOutput",
     "FactorAnalysis",
     "ResearchOutput",
     "RiskScore",
     "RiskOutput",
     "OpportunityScore",
     "OpportunityOutput",
+    "RiskOpportunityOutput",
     "ActionItem",
     "Recommendation",
     "AgentState",
@@ -62,3 +62,10 @@ class OpportunityOutput(BaseModel):
     )
     overall_opportunity_level: float = Field(..., ge=0.0, le=10.0)
     opportunity_summary: str
+
+
+class RiskOpportunityOutput(BaseModel):
+    """Output from the combined Risk & Opportunity Agent."""
+    
+    risk: RiskOutput = Field(..., description="Risk scores per factor")
+    opportunity: OpportunityOutput = Field(..., description="Opportunity scores per factor")
@@ -27,3 +27,24 @@ class PlannerOutput(BaseModel):
         ...,
         description="Summarized understanding of the decision"
     )
+
+
+class QuickFactor(EvaluationFactor):
+    """A factor with a brief inline insight, used by quick analysis."""
+    
+    insights: str = Field(..., description="One or two sentences on how this factor bears on the decision")
+
+
+class QuickPlanOutput(BaseModel):
+    """Output from the Quick Planner: factors and brief research in one call."""
+    
+    factors: List[QuickFactor] = Field(
+        ...,
+        description="List of factors to evaluate, each with a brief insight",
+        min_length=3,
+        max_length=6
+    )
+    decision_summary: str = Field(
+        ...,
+        description="Summarized understanding of the decision"
+    )
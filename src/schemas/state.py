@@ -1,6 +1,6 @@
 """LangGraph state schema."""
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from .decision import DecisionInput
 from .factors import PlannerOutput
 from .analysis import ResearchOutput, RiskOutput, OpportunityOutput
@@ -23,8 +23,15 @@ class AgentState(BaseModel):
     recommendation: Optional[Recommendation] = None
     
     # Metadata
+    run_id: Optional[str] = None  # Checkpoint key for resuming the run
+    analysis_mode: str = "full"  # "full" or "quick"
     current_step: str = "initialized"
     error: Optional[str] = None
     
+    # Latency budget: time.time() by which a result is needed (None = unbounded)
+    deadline: Optional[float] = None
+    degraded: bool = False
+    degradations: List[str] = Field(default_factory=list)
+    
     class Config:
         arbitrary_types_allowed = True
@@ -1,6 +1,13 @@
 """Deterministic scoring engine."""
 from typing import List, Dict, Tuple
-from ..schemas import RiskScore, OpportunityScore
+from ..schemas import (
+    RiskScore,
+    OpportunityScore,
+    RiskOutput,
+    OpportunityOutput,
+    Recommendation,
+    ActionItem
+)
 
 
 class ScoringEngine:
@@ -203,6 +210,78 @@ class ScoringEngine:
         else:
             return "Do Not Proceed"
     
+    @staticmethod
+    def build_fallback_recommendation(
+        decision: str,
+        risk_output: RiskOutput,
+        opportunity_output: OpportunityOutput
+    ) -> Recommendation:
+        """
+        Build a recommendation from scores alone, without an LLM call.
+        
+        Used when the strategist cannot run in time. Insights and next steps
+        come from the scoring agents' summaries and the highest-scoring factors.
+        
+        Args:
+            decision: The decision text
+            risk_output: Risk scores
+            opportunity_output: Opportunity scores
+            
+        Returns:
+            Recommendation with reduced confidence
+        """
+        overall_risk = ScoringEngine.calculate_overall_risk(risk_output.risk_scores)
+        overall_opportunity = ScoringEngine.calculate_overall_opportunity(
+            opportunity_output.opportunity_scores
+        )
+        category = ScoringEngine.get_recommendation_category(overall_risk, overall_opportunity)
+        
+        top_risk = max(risk_output.risk_scores, key=lambda r: r.score, default=None)
+        top_opportunity = max(opportunity_output.opportunity_scores, key=lambda o: o.score, default=None)
+        
+        key_insights = [risk_output.risk_summary, opportunity_output.opportunity_summary]
+        if top_risk:
+            key_insights.append(f"Biggest risk: {top_risk.factor_name} ({top_risk.score:.1f}/10) - {top_risk.reasoning}")
+        if top_opportunity:
+            key_insights.append(
+                f"Biggest opportunity: {top_opportunity.factor_name} ({top_opportunity.score:.1f}/10) - {top_opportunity.reasoning}"
+            )
+        while len(key_insights) < 3:
+            key_insights.append(
+                f"Risk is {ScoringEngine.get_risk_level(overall_risk)} and opportunity is "
+                f"{ScoringEngine.get_opportunity_level(overall_opportunity)}"
+            )
+        
+        next_steps = []
+        if top_risk:
+            next_steps.append(ActionItem(
+                action=f"Find ways to reduce the {top_risk.factor_name.lower()} risk",
+                priority="high",
+                timeframe="Before deciding"
+            ))
+        next_steps.append(ActionItem(
+            action="Run a full analysis for a detailed strategy",
+            priority="medium",
+            timeframe="When time allows"
+        ))
+        
+        ratio = ScoringEngine.calculate_risk_reward_ratio(overall_risk, overall_opportunity)
+        balance = "unbounded" if ratio == float('inf') else f"{ratio:.2f}"
+        
+        return Recommendation(
+            decision=decision,
+            recommendation=category,
+            confidence_level=0.4,
+            key_insights=key_insights[:5],
+            risk_reward_balance=(
+                f"Opportunity {overall_opportunity:.1f}/10 against risk {overall_risk:.1f}/10 "
+                f"(ratio {balance}), derived from the factor scores alone."
+            ),
+            next_steps=next_steps,
+            overall_risk_score=overall_risk,
+            overall_opportunity_score=overall_opportunity
+        )
+    
     @staticmethod
     def analyze_score_distribution(
         scores: List[float]
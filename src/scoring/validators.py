@@ -11,6 +11,11 @@ class ScoreValidator:
         """Validate score is within range."""
         return min_val <= score <= max_val
     
+    @staticmethod
+    def clamp_score(score: float, min_val: float = 0.0, max_val: float = 10.0) -> float:
+        """Clamp score into range."""
+        return min(max(score, min_val), max_val)
+    
     @staticmethod
     def validate_risk_scores(risk_output: RiskOutput) -> List[str]:
         """
@@ -3,11 +3,15 @@ import streamlit as st
 from config import settings
 from ..schemas import DecisionInput
 from ..workflow import DecisionWorkflowRunner
+from ..agents.ollama import start_warmup
+from ..agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
 from .components import (
     render_header,
     render_input_form,
+    render_similar_decisions,
     render_results,
     render_error,
+    render_resume_option,
     render_history_page,
     render_analytics_page,
     render_compare_page
@@ -25,6 +29,9 @@ def main():
         initial_sidebar_state="collapsed"
     )
     
+    # Load local models before the first analysis needs them (Ollama only)
+    start_warmup()
+    
     # Custom CSS for professional look
     st.markdown("""
         <style>
@@ -255,6 +262,19 @@ def main():
     # Main content
     decision_input = render_input_form()
     
+    # Upgrading a quick analysis re-runs it in full, keeping its factors
+    quick_state = None
+    if st.session_state.pop('upgrade_requested', False) and not decision_input:
+        quick_state = st.session_state.get('current_analysis_result')
+        if quick_state is not None:
+            decision_input = quick_state.decision_input
+    
+    # Resuming a failed run continues from its last successful step
+    resume_run_id = None
+    if 'resume_requested' in st.session_state and not decision_input:
+        resume_run_id = st.session_state.pop('resume_requested')
+        decision_input = st.session_state.get('current_decision_input')
+    
     # Check if we have a stored analysis result (for chat persistence)
     if 'current_analysis_result' in st.session_state and not decision_input:
         result = st.session_state['current_analysis_result']
@@ -274,39 +294,74 @@ def main():
         # Store decision input in session state
         st.session_state['current_decision_input'] = decision_input
         
+        # Surface near-duplicates of this decision before spending a full run
+        rerun = quick_state is not None or resume_run_id is not None
+        prior_analysis = None if rerun else render_similar_decisions(decision_input)
+        quick = not rerun and st.session_state.get('quick_analysis', False)
+        
         # Show expected time
-        st.info("⏱️ Analysis typically completes in 1-2 minutes")
+        if quick:
+            st.info("⏱️ Quick analysis typically completes in under a minute")
+        else:
+            st.info("⏱️ Analysis typically completes in 1-2 minutes")
         
         # Initialize workflow with progress tracking
         progress_bar = st.progress(0)
         status_text = st.empty()
         
         try:
+            # Raises QuotaExceeded once the user's daily LLM quota is used up
+            user = st.session_state.get('user') or {}
+            if user.get('id'):
+                from ..history import HistoryManager
+                HistoryManager.check_usage_quota(user['id'])
+            
             runner = DecisionWorkflowRunner(
                 model_name=settings.MODEL_NAME,
-                temperature=settings.TEMPERATURE
+                temperature=settings.TEMPERATURE,
+                quick=quick
+            )
+            progress_callback = lambda step, progress: update_progress(
+                step, progress, status_text, progress_bar
             )
             
             # Execute workflow with progress updates
-            status_text.text("🎯 Step 1/5: Planning evaluation factors...")
-            progress_bar.progress(10)
-            
-            result = runner.run(
-                decision_input,
-                progress_callback=lambda step, progress: update_progress(
-                    step, progress, status_text, progress_bar
-                )
-            )
+            with llm_priority(INTERACTIVE_ANALYSIS, user.get('id')):
+                if resume_run_id:
+                    status_text.text("🔁 Resuming analysis...")
+                    progress_bar.progress(10)
+                    result = runner.resume(resume_run_id, progress_callback=progress_callback)
+                elif quick_state:
+                    status_text.text("🔍 Step 2/5: Researching context...")
+                    progress_bar.progress(20)
+                    result = runner.upgrade(quick_state, progress_callback=progress_callback)
+                else:
+                    if quick:
+                        status_text.text("⚡ Step 1/3: Identifying key factors...")
+                    else:
+                        status_text.text("🎯 Step 1/5: Planning evaluation factors...")
+                    progress_bar.progress(10)
+                    
+                    result = runner.run(
+                        decision_input,
+                        progress_callback=progress_callback,
+                        prior_analysis=prior_analysis
+                    )
             
             progress_bar.progress(100)
             status_text.text("✅ Analysis complete!")
             
+            # The full analysis replaces the quick one in history
+            if quick_state and not result.error:
+                replace_quick_decision()
+            
             # Store result in session state
             st.session_state['current_analysis_result'] = result
             
             # Check for errors
             if result.error:
                 render_error(result.error)
+                render_resume_option(result)
             else:
                 # Render results
                 render_results(result)
@@ -319,6 +374,18 @@ def main():
             status_text.empty()
 
 
+def replace_quick_decision():
+    """Remove the saved quick analysis that is being upgraded."""
+    from ..history import HistoryManager
+    user = st.session_state.get('user')
+    decision_id = st.session_state.pop('current_decision_id', None)
+    if user and user.get('id') and decision_id:
+        try:
+            HistoryManager.delete_decision(decision_id, user['id'])
+        except Exception:
+            pass
+
+
 def update_progress(step: str, progress: int, status_text, progress_bar):
     """Update progress indicators."""
     status_text.text(step)
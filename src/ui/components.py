@@ -58,6 +58,18 @@ def render_input_form() -> Optional[DecisionInput]:
                 placeholder="Example: career, finance, important",
                 help="Add comma-separated tags to categorize this decision"
             )
+            
+            reuse_similar = st.checkbox(
+                "♻️ Reuse planning & research from a similar past decision",
+                value=True,
+                help="If you already analyzed a near-duplicate decision, skip re-planning and re-researching it"
+            )
+            
+            quick_analysis = st.checkbox(
+                "⚡ Quick analysis",
+                value=False,
+                help="A faster gut check with fewer, briefer steps; you can upgrade it to a full analysis afterwards"
+            )
         
         col_left, col_center, col_right = st.columns([1, 1, 1])
         with col_center:
@@ -77,6 +89,8 @@ def render_input_form() -> Optional[DecisionInput]:
                 st.session_state['decision_tags'] = [tag.strip() for tag in tags.split(',') if tag.strip()]
             else:
                 st.session_state['decision_tags'] = []
+            st.session_state['reuse_similar'] = reuse_similar
+            st.session_state['quick_analysis'] = quick_analysis
             
             return DecisionInput(
                 decision=decision,
@@ -87,6 +101,46 @@ def render_input_form() -> Optional[DecisionInput]:
     return None
 
 
+def render_similar_decisions(decision_input: DecisionInput) -> Optional[dict]:
+    """
+    Tell the user about near-duplicate past decisions before analyzing.
+    
+    Returns:
+        The closest match's full analysis if the user opted to reuse it, None otherwise
+    """
+    from ..history import HistoryManager
+    user = st.session_state.get('user')
+    if not user or not user.get('id'):
+        return None
+    
+    try:
+        matches = HistoryManager.find_similar_decisions(
+            user['id'], decision_input.decision, decision_input.context, limit=1
+        )
+    except Exception:
+        return None
+    
+    if not matches:
+        return None
+    
+    match = matches[0]
+    analyzed_on = match['created_at'].strftime('%B %d, %Y') if match['created_at'] else "an earlier date"
+    st.info(
+        f"🔁 You analyzed something {match['similarity'] * 100:.0f}% similar on {analyzed_on}: "
+        f"*{match['decision_text'][:120]}*"
+    )
+    
+    if not st.session_state.get('reuse_similar'):
+        return None
+    
+    prior = HistoryManager.get_decision_by_id(match['id'])
+    if prior and prior.get('full_analysis'):
+        st.caption("♻️ Reusing its planning and research; risks, opportunities and the recommendation are re-evaluated.")
+        return prior['full_analysis']
+    
+    return None
+
+
 def render_results(state: AgentState):
     """Render analysis results."""
     st.success("✅ Analysis Complete!")
@@ -106,6 +160,21 @@ def render_results(state: AgentState):
             except Exception as e:
                 st.warning(f"Note: Could not save to history: {str(e)}")
     
+    if state.degraded:
+        st.warning(
+            "⏱️ Parts of this analysis were shortened to finish in time: "
+            + "; ".join(state.degradations)
+        )
+    
+    if state.analysis_mode == "quick":
+        col_note, col_upgrade = st.columns([3, 1])
+        with col_note:
+            st.info("⚡ This is a quick analysis. Upgrade it for in-depth research and a detailed strategy.")
+        with col_upgrade:
+            if st.button("🔬 Upgrade to full analysis", use_container_width=True):
+                st.session_state['upgrade_requested'] = True
+                st.rerun()
+    
     st.markdown("---")
     
     # Recommendation Summary
@@ -341,11 +410,31 @@ def render_error(error_message: str):
     st.info("Please try again or check your configuration.")
 
 
+def render_resume_option(state: AgentState):
+    """Offer to continue a failed run from its last successful step."""
+    from config import settings
+    if not state.error or not state.run_id or not settings.CHECKPOINTS_ENABLED:
+        return
+    
+    st.caption("Steps that already finished are saved, so resuming only repeats what failed.")
+    st.button(
+        "🔁 Resume analysis",
+        type="primary",
+        on_click=_request_resume,
+        args=(state.run_id,)
+    )
+
+
+def _request_resume(run_id: str):
+    st.session_state['resume_requested'] = run_id
+
+
 
 def render_export_and_chat(state: AgentState):
     """Render export and chat interface."""
     from ..chat import ChatAssistant
     from ..export import PDFExporter
+    from ..history import HistoryManager
     
     st.markdown("---")
     
@@ -408,7 +497,12 @@ def render_export_and_chat(state: AgentState):
                 try:
                     # Use stored state for consistency
                     current_state = st.session_state.current_analysis_state
-                    response = st.session_state.chat_assistant.ask_question(current_state, prompt)
+                    user = st.session_state.get('user') or {}
+                    if user.get('id'):
+                        HistoryManager.check_usage_quota(user['id'])
+                    response = st.session_state.chat_assistant.ask_question(
+                        current_state, prompt, user_id=user.get('id')
+                    )
                     st.write(response)
                     st.session_state.chat_history.append({"role": "assistant", "content": response})
                 except Exception as e:
@@ -658,18 +752,17 @@ def render_analytics_page():
         st.error("User ID not found. Please log in again.")
         return
     
-    # Get all decisions
+    # Get rollup summary and per-decision points
     try:
-        decisions = HistoryManager.get_user_history(user_id, limit=1000)
+        summary = HistoryManager.get_analytics_summary(user_id)
         
-        if not decisions:
+        if not summary['total_decisions']:
             st.info("📭 No decisions yet. Create your first analysis to see insights!")
             return
         
-        # Convert to DataFrame for analysis
-        df = pd.DataFrame(decisions)
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        df['date'] = df['created_at'].dt.date
+        # Aggregates come from SQL; only the scatter needs per-decision scores
+        distribution = HistoryManager.get_score_distribution(user_id)
+        df = pd.DataFrame(HistoryManager.get_score_points(user_id))
         
         # Summary Statistics
         st.markdown("### 📊 Overview")
@@ -678,49 +771,59 @@ def render_analytics_page():
         with col1:
             st.metric(
                 "Total Decisions",
-                len(df),
+                summary['total_decisions'],
                 help="Total number of decisions analyzed"
             )
         
         with col2:
-            avg_risk = df['risk_score'].mean() if 'risk_score' in df else 0
             st.metric(
                 "Avg Risk Score",
-                f"{avg_risk:.1f}/10",
+                f"{summary['avg_risk_score']:.1f}/10",
                 help="Average risk across all decisions"
             )
         
         with col3:
-            avg_opp = df['opportunity_score'].mean() if 'opportunity_score' in df else 0
             st.metric(
                 "Avg Opportunity",
-                f"{avg_opp:.1f}/10",
+                f"{summary['avg_opportunity_score']:.1f}/10",
                 help="Average opportunity across all decisions"
             )
         
         with col4:
-            avg_conf = df['confidence_level'].mean() if 'confidence_level' in df else 0
             st.metric(
                 "Avg Confidence",
-                f"{avg_conf*100:.0f}%",
+                f"{summary['avg_confidence']*100:.0f}%",
                 help="Average confidence in recommendations"
             )
         
         st.markdown("---")
         
         # Charts in tabs
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
             "📅 Timeline",
             "🎯 Risk vs Opportunity",
             "📋 Recommendations",
-            "🏷️ Tags"
+            "🏷️ Tags",
+            "🧩 Factors",
+            "💸 LLM Usage"
         ])
         
         with tab1:
             st.markdown("### Decision Timeline")
             
+            bucket = st.selectbox(
+                "Group by",
+                ["day", "week", "month"],
+                format_func=str.title,
+                key="analytics_bucket"
+            )
+            timeseries = HistoryManager.get_analytics_timeseries(user_id, bucket=bucket)
+            
             # Decisions over time
-            timeline_df = df.groupby('date').size().reset_index(name='count')
+            timeline_df = pd.DataFrame({
+                'date': pd.to_datetime(timeseries['period']),
+                'count': timeseries['count']
+            })
             
             fig = px.line(
                 timeline_df,
@@ -742,10 +845,11 @@ def render_analytics_page():
             # Risk and Opportunity trends
             st.markdown("### Risk & Opportunity Trends")
             
-            daily_stats = df.groupby('date').agg({
-                'risk_score': 'mean',
-                'opportunity_score': 'mean'
-            }).reset_index()
+            daily_stats = pd.DataFrame({
+                'date': pd.to_datetime(timeseries['period']),
+                'risk_score': timeseries['avg_risk'],
+                'opportunity_score': timeseries['avg_opportunity']
+            })
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(
@@ -813,24 +917,22 @@ def render_analytics_page():
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.histogram(
-                    df,
-                    x='risk_score',
-                    nbins=20,
+                fig = px.bar(
+                    x=distribution['bins'],
+                    y=distribution['risk'],
                     title='Risk Score Distribution',
-                    labels={'risk_score': 'Risk Score', 'count': 'Frequency'},
+                    labels={'x': 'Risk Score', 'y': 'Frequency'},
                     color_discrete_sequence=['#ef4444']
                 )
                 fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                fig = px.histogram(
-                    df,
-                    x='opportunity_score',
-                    nbins=20,
+                fig = px.bar(
+                    x=distribution['bins'],
+                    y=distribution['opportunity'],
                     title='Opportunity Score Distribution',
-                    labels={'opportunity_score': 'Opportunity Score', 'count': 'Frequency'},
+                    labels={'x': 'Opportunity Score', 'y': 'Frequency'},
                     color_discrete_sequence=['#10b981']
                 )
                 fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
@@ -840,8 +942,10 @@ def render_analytics_page():
             st.markdown("### Recommendation Breakdown")
             
             # Recommendation distribution
-            rec_counts = df['recommendation'].value_counts().reset_index()
-            rec_counts.columns = ['recommendation', 'count']
+            rec_counts = pd.DataFrame(
+                list(summary['recommendation_counts'].items()),
+                columns=['recommendation', 'count']
+            )
             
             fig = px.pie(
                 rec_counts,
@@ -857,12 +961,17 @@ def render_analytics_page():
             # Confidence by recommendation
             st.markdown("### Confidence Levels by Recommendation")
             
-            fig = px.box(
-                df,
+            conf = pd.DataFrame(distribution['confidence_by_recommendation'])
+            
+            fig = px.bar(
+                conf,
                 x='recommendation',
-                y='confidence_level',
-                title='Confidence Distribution by Recommendation Type',
-                labels={'confidence_level': 'Confidence Level', 'recommendation': 'Recommendation'},
+                y='avg',
+                error_y=conf['max'] - conf['avg'],
+                error_y_minus=conf['avg'] - conf['min'],
+                hover_data=['count', 'min', 'max'],
+                title='Confidence Range by Recommendation Type (min / avg / max)',
+                labels={'avg': 'Confidence Level', 'recommendation': 'Recommendation'},
                 color='recommendation'
             )
             fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', showlegend=False)
@@ -871,14 +980,9 @@ def render_analytics_page():
         with tab4:
             st.markdown("### Tag Analysis")
             
-            # Extract all tags
-            all_tags = []
-            for tags in df['tags']:
-                if tags:
-                    all_tags.extend(tags)
-            
-            if all_tags:
-                tag_counts = pd.Series(all_tags).value_counts().head(15)
+            # Tag counts come straight from the rollup
+            if summary['tag_counts']:
+                tag_counts = pd.Series(summary['tag_counts']).sort_values(ascending=False).head(15)
                 
                 fig = px.bar(
                     x=tag_counts.values,
@@ -909,6 +1013,125 @@ def render_analytics_page():
             else:
                 st.info("No tags found. Start adding tags to your decisions!")
         
+        with tab5:
+            st.markdown("### Factor Categories")
+            
+            categories = HistoryManager.get_factor_analytics(user_id, group_by="category")
+            
+            if categories['key']:
+                cat_df = pd.DataFrame(categories)
+                
+                fig = go.Figure()
+                fig.add_trace(go.Bar(
+                    x=cat_df['key'],
+                    y=cat_df['avg_risk'],
+                    name='Avg Risk',
+                    marker_color='#ef4444'
+                ))
+                fig.add_trace(go.Bar(
+                    x=cat_df['key'],
+                    y=cat_df['avg_opportunity'],
+                    name='Avg Opportunity',
+                    marker_color='#10b981'
+                ))
+                fig.update_layout(
+                    title='Average Risk & Opportunity by Factor Category',
+                    xaxis_title='Category',
+                    yaxis_title='Score (0-10)',
+                    barmode='group',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                
+                # Riskiest individual factors
+                st.markdown("### Riskiest Factors")
+                factors = HistoryManager.get_factor_analytics(
+                    user_id,
+                    group_by="factor",
+                    order_by="avg_risk",
+                    limit=10
+                )
+                factor_df = pd.DataFrame({
+                    'Factor': factors['key'],
+                    'Decisions': factors['decisions'],
+                    'Avg Risk': factors['avg_risk'],
+                    'Max Risk': factors['max_risk'],
+                    'High/Critical': factors['high_risk_count'],
+                    'Avg Opportunity': factors['avg_opportunity']
+                })
+                st.dataframe(factor_df, use_container_width=True, hide_index=True)
+            else:
+                st.info("No factor scores yet. Older analyses can be backfilled with `python -m src.history.backfill`.")
+        
+        with tab6:
+            st.markdown("### LLM Usage by Agent")
+            
+            usage = HistoryManager.get_usage_summary(user_id, group_by="agent")
+            totals = usage['totals']
+            
+            quota = HistoryManager.get_usage_quota(user_id)
+            if quota['token_quota']:
+                st.progress(
+                    min(quota['tokens_used'] / quota['token_quota'], 1.0),
+                    text=f"Today: {quota['tokens_used']:,} of {quota['token_quota']:,} tokens"
+                )
+            if quota['cost_quota']:
+                st.progress(
+                    min(quota['cost_used'] / quota['cost_quota'], 1.0),
+                    text=f"Today: ${quota['cost_used']:.2f} of ${quota['cost_quota']:.2f}"
+                )
+            
+            if usage['key']:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("LLM Calls", totals['calls'], help="Calls to the LLM provider")
+                col2.metric(
+                    "Tokens",
+                    f"{totals['input_tokens'] + totals['output_tokens']:,}",
+                    help="Prompt plus completion tokens"
+                )
+                col3.metric("Cost", f"${totals['cost']:.4f}", help="At the model's list price")
+                col4.metric("Cache Hits", totals['cache_hits'], help="Agent runs answered without an LLM call")
+                
+                usage_df = pd.DataFrame({
+                    'Agent': usage['key'],
+                    'Calls': usage['calls'],
+                    'Prompt Tokens': usage['input_tokens'],
+                    'Completion Tokens': usage['output_tokens'],
+                    'Cache Hits': usage['cache_hits'],
+                    'Errors': usage['errors'],
+                    'Cost ($)': usage['cost'],
+                    'Avg Latency (s)': usage['avg_latency']
+                })
+                
+                fig = go.Figure()
+                fig.add_trace(go.Bar(
+                    x=usage_df['Agent'],
+                    y=usage_df['Prompt Tokens'],
+                    name='Prompt Tokens',
+                    marker_color='#6366f1'
+                ))
+                fig.add_trace(go.Bar(
+                    x=usage_df['Agent'],
+                    y=usage_df['Completion Tokens'],
+                    name='Completion Tokens',
+                    marker_color='#f59e0b'
+                ))
+                fig.update_layout(
+                    title='Tokens by Agent',
+                    xaxis_title='Agent',
+                    yaxis_title='Tokens',
+                    barmode='stack',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(usage_df, use_container_width=True, hide_index=True)
+            else:
+                st.info("No LLM usage recorded yet.")
+        
         # Insights section
         st.markdown("---")
         st.markdown("### 💡 Key Insights")
@@ -917,7 +1140,8 @@ def render_analytics_page():
         
         with col1:
             # Most common recommendation
-            most_common_rec = df['recommendation'].mode()[0] if len(df) > 0 else "N/A"
+            rec_totals = summary['recommendation_counts']
+            most_common_rec = max(rec_totals, key=rec_totals.get) if rec_totals else "N/A"
             st.info(f"**Most Common Recommendation:** {most_common_rec}")
             
             # Highest risk decision
@@ -932,8 +1156,10 @@ def render_analytics_page():
                 st.success(f"**Best Opportunity:** {best_opp['decision_text'][:60]}... ({best_opp['opportunity_score']:.1f}/10)")
             
             # Decision frequency
-            days_active = (df['created_at'].max() - df['created_at'].min()).days + 1
-            decisions_per_day = len(df) / days_active if days_active > 0 else 0
+            first_day = datetime.strptime(summary['first_decision_date'], "%Y-%m-%d")
+            last_day = datetime.strptime(summary['last_decision_date'], "%Y-%m-%d")
+            days_active = (last_day - first_day).days + 1
+            decisions_per_day = summary['total_decisions'] / days_active if days_active > 0 else 0
             st.metric("Decision Frequency", f"{decisions_per_day:.1f} per day")
     
     except Exception as e:
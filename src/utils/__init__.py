@@ -1,4 +1,6 @@
 """Shared utilities."""
 from .formatters import OutputFormatter
+from .text_similarity import TextVectorizer, SimilarityIndex
+from .singleflight import SingleFlight
 
-__all__ = ["OutputFormatter"]
+__all__ = ["OutputFormatter", "TextVectorizer", "SimilarityIndex", "SingleFlight"]
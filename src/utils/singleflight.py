@@ -0,0 +1,79 @@
+"""Request coalescing: one execution per key among concurrent callers."""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """An in-flight execution and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Runs a function once per key while callers with the same key wait for it.
+
+    The first caller for a key executes; callers arriving while it runs
+    block and receive the same result (or exception). Once the execution
+    finishes the key is forgotten, so later calls run again - this only
+    deduplicates concurrent work, it is not a cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` for ``key``, or wait for the run already in flight.
+
+        Args:
+            key: Identity of the work
+            fn: Zero-argument callable doing the work
+
+        Returns:
+            (value, shared): shared is True if the value came from another
+            caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.value, False
+
+    def stats(self) -> Dict:
+        """Execution and coalescing counters for this process."""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
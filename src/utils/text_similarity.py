@@ -0,0 +1,209 @@
+"""Local text similarity: hashed TF-IDF vectors and a cosine index in NumPy."""
+import math
+import re
+import threading
+import zlib
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Function words and decision phrasing that say nothing about what a
+# decision is about ("I'm thinking about whether to...")
+STOP_WORDS = frozenset({
+    "a", "about", "an", "and", "are", "as", "at", "be", "but", "by", "can",
+    "considering", "could", "do", "does", "for", "from", "had", "has", "have",
+    "how", "i", "idea", "if", "im", "in", "into", "is", "it", "its", "maybe",
+    "me", "my", "of", "on", "or", "our", "over", "really", "should", "so",
+    "than", "that", "the", "their", "them", "then", "there", "think",
+    "thinking", "this", "to", "up", "was", "we", "were", "what", "when",
+    "whether", "which", "while", "who", "will", "wise", "with", "would", "you",
+    "your",
+})
+
+
+class TextVectorizer:
+    """
+    Stateless hashing vectorizer.
+
+    Each text becomes word unigrams, word bigrams and character n-grams of
+    each non-numeric word, hashed with CRC32 into a fixed number of buckets.
+    Character n-grams keep light rewording ("relocate"/"relocating") close
+    together; numbers only match exactly.
+    Hashing is stable across processes, so vectors can be persisted.
+    """
+
+    def __init__(self, n_features: int = 2048, char_ngram: int = 3):
+        self.n_features = n_features
+        self.char_ngram = char_ngram
+
+    def tokens(self, text: str) -> List[str]:
+        """Lowercased alphanumeric words without stop words."""
+        return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOP_WORDS]
+
+    def features(self, text: str) -> List[str]:
+        """Feature strings for a text."""
+        words = self.tokens(text)
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+
+        n = self.char_ngram
+        for word in words:
+            if word.isdigit():
+                continue
+            padded = f"#{word}#"
+            features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+
+        return features
+
+    def transform_one(self, text: str) -> np.ndarray:
+        """Sublinear term-frequency vector (1 + log tf) for one text."""
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        counts: Dict[int, int] = {}
+        for feature in self.features(text):
+            bucket = zlib.crc32(feature.encode("utf-8")) % self.n_features
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+        for bucket, count in counts.items():
+            vector[bucket] = 1.0 + math.log(count)
+
+        return vector
+
+
+class SimilarityIndex:
+    """
+    In-memory cosine-similarity index over TF-IDF weighted hashed vectors.
+
+    IDF is computed from the documents currently in the index, so common
+    phrasing across a corpus ("should I") counts less than what a decision
+    is actually about. Adds and removes are O(n_features); the weighted,
+    normalised matrix is rebuilt lazily on the next query.
+    """
+
+    def __init__(self, vectorizer: Optional[TextVectorizer] = None, capacity: int = 64):
+        self.vectorizer = vectorizer or TextVectorizer()
+        self._rows = np.zeros((capacity, self.vectorizer.n_features), dtype=np.float32)
+        self._df = np.zeros(self.vectorizer.n_features, dtype=np.int32)
+        self._keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._payloads: Dict[Hashable, Any] = {}
+        self._weighted: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def add(self, key: Hashable, text: str, payload: Any = None):
+        """Index a text under key, replacing any previous text for that key."""
+        vector = self.vectorizer.transform_one(text)
+
+        with self._lock:
+            if key in self._positions:
+                self.remove(key)
+
+            count = len(self._keys)
+            if count == self._rows.shape[0]:
+                grown = np.zeros((count * 2, self._rows.shape[1]), dtype=np.float32)
+                grown[:count] = self._rows
+                self._rows = grown
+
+            self._rows[count] = vector
+            self._df += vector > 0
+            self._keys.append(key)
+            self._positions[key] = count
+            self._payloads[key] = payload
+            self._weighted = None
+
+    def remove(self, key: Hashable) -> bool:
+        """Drop a key. Returns False if it was not indexed."""
+        with self._lock:
+            position = self._positions.pop(key, None)
+            if position is None:
+                return False
+
+            self._df -= self._rows[position] > 0
+            self._payloads.pop(key, None)
+
+            # Move the last row into the hole to keep rows contiguous
+            last = len(self._keys) - 1
+            if position != last:
+                moved = self._keys[last]
+                self._rows[position] = self._rows[last]
+                self._keys[position] = moved
+                self._positions[moved] = position
+
+            self._rows[last] = 0.0
+            self._keys.pop()
+            self._weighted = None
+            return True
+
+    def keys(self) -> List[Hashable]:
+        """Indexed keys, in no particular order."""
+        with self._lock:
+            return list(self._keys)
+
+    def payload(self, key: Hashable) -> Any:
+        """Payload stored with a key, or None."""
+        return self._payloads.get(key)
+
+    def _prepare(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (idf, row-normalised weighted matrix), rebuilding if stale."""
+        if self._weighted is None:
+            n = len(self._keys)
+            idf = np.log((1.0 + n) / (1.0 + self._df)).astype(np.float32) + 1.0
+            weighted = self._rows[:n] * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._idf = idf
+            self._weighted = weighted / norms
+        return self._idf, self._weighted
+
+    def query(
+        self,
+        text: str,
+        limit: int = 5,
+        threshold: float = 0.0,
+        exclude: Optional[Hashable] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Find the indexed texts most similar to text.
+
+        Args:
+            text: Query text
+            limit: Maximum number of matches
+            threshold: Minimum cosine similarity (0-1)
+            exclude: Optional key to leave out (e.g. the query's own entry)
+
+        Returns:
+            (key, similarity) pairs, most similar first
+        """
+        vector = self.vectorizer.transform_one(text)
+
+        with self._lock:
+            if not self._keys:
+                return []
+
+            idf, weighted = self._prepare()
+            query = vector * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+
+            scores = weighted @ (query / norm)
+            keys = list(self._keys)
+
+        order = np.argsort(-scores)
+        matches = []
+        for position in order:
+            score = float(scores[position])
+            if score < threshold or len(matches) >= limit:
+                break
+            if keys[position] == exclude:
+                continue
+            matches.append((keys[position], min(score, 1.0)))
+
+        return matches
@@ -1,8 +1,9 @@
 """LangGraph workflow orchestration."""
-from .graph import create_workflow
+from .graph import create_workflow, create_quick_workflow
 from .runner import DecisionWorkflowRunner
 
 __all__ = [
     "create_workflow",
+    "create_quick_workflow",
     "DecisionWorkflowRunner",
 ]
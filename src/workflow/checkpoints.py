@@ -0,0 +1,68 @@
+"""Persistent workflow checkpoints for resumable runs."""
+import os
+import sqlite3
+import threading
+from typing import Optional
+from config import settings
+
+_checkpointer = None
+_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """
+    Process-wide SQLite checkpointer, or None if checkpoints are disabled.
+
+    Every workflow run is checkpointed after each node under its run id
+    (the LangGraph thread id), so a failed or interrupted run can be
+    resumed without repeating the LLM calls that already succeeded.
+    """
+    global _checkpointer
+
+    if not settings.CHECKPOINTS_ENABLED:
+        return None
+
+    with _lock:
+        if _checkpointer is None:
+            from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            directory = os.path.dirname(settings.CHECKPOINT_DB_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(settings.CHECKPOINT_DB_PATH, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            _checkpointer = SqliteSaver(
+                conn,
+                serde=JsonPlusSerializer(allowed_msgpack_modules=[("src.schemas.state", "AgentState")])
+            )
+
+    return _checkpointer
+
+
+def run_config(run_id: str) -> dict:
+    """LangGraph config addressing one run's checkpoints."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def run_metadata(run_id: str) -> Optional[dict]:
+    """Metadata a run was started with, or None if the run is unknown."""
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return None
+
+    checkpoint = checkpointer.get_tuple(run_config(run_id))
+    if checkpoint is None:
+        return None
+    return {
+        key: value for key, value in checkpoint.metadata.items()
+        if key not in ("source", "step", "parents")
+    }
+
+
+def delete_run(run_id: str):
+    """Drop a run's checkpoints."""
+    checkpointer = get_checkpointer()
+    if checkpointer is not None:
+        checkpointer.delete_thread(run_id)
@@ -0,0 +1,75 @@
+"""Deadline budgets for workflow stages."""
+import time
+from typing import Any, Callable, Optional
+from ..agents.scheduler import llm_deadline
+
+# Typical seconds a stage needs. A stage is skipped or shrunk when less than
+# its own share plus the share of the stages after it is left.
+STAGE_SECONDS = {
+    "research": 20.0,
+    "scoring": 15.0,
+    "strategist": 15.0,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """A stage could not finish before the workflow deadline."""
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until ``deadline`` (a ``time.time()`` value), or None if unbounded."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def reserve(*stages: str) -> float:
+    """Seconds to hold back for the given later stages."""
+    return sum(STAGE_SECONDS[stage] for stage in stages)
+
+
+def leave_for(deadline: Optional[float], *stages: str) -> Optional[float]:
+    """Deadline for the current stage that keeps time for the given later stages."""
+    if deadline is None:
+        return None
+    return deadline - reserve(*stages)
+
+
+def has_time(deadline: Optional[float], *stages: str) -> bool:
+    """Whether the budget left covers the given stages."""
+    left = remaining(deadline)
+    return left is None or left >= reserve(*stages)
+
+
+def call_with_deadline(deadline: Optional[float], fn: Callable, *args, **kwargs) -> Any:
+    """
+    Call ``fn`` with every LLM call it makes bounded by ``deadline``.
+
+    The call runs in the caller's thread inside ``llm_deadline``: its LLM
+    requests get the time left as their timeout, so a call still running
+    at the deadline is cancelled by its client and gives back its
+    concurrency slot, and calls still queued for a slot or rate budget
+    stop waiting. Nothing is left running after the deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline passed before the call, or the
+            call failed or finished after it
+    """
+    if deadline is None:
+        return fn(*args, **kwargs)
+
+    left = remaining(deadline)
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded before the call started")
+
+    try:
+        with llm_deadline(deadline):
+            result = fn(*args, **kwargs)
+    except Exception as e:
+        if remaining(deadline) <= 0:
+            raise DeadlineExceeded(f"deadline exceeded: no response within {left:.1f}s ({e})") from e
+        raise
+
+    if remaining(deadline) <= 0:
+        raise DeadlineExceeded(f"deadline exceeded: no response within {left:.1f}s")
+    return result
@@ -1,15 +1,25 @@
 """LangGraph workflow orchestration."""
-from typing import TypedDict, Annotated
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TypedDict, Annotated, Optional
 from operator import add
 from langgraph.graph import StateGraph, END
-from ..schemas import AgentState
+from config import settings
+from ..schemas import AgentState, ResearchOutput, Recommendation
 from ..agents import (
     PlannerAgent,
     ResearchAgent,
     RiskAgent,
     OpportunityAgent,
-    StrategistAgent
+    RiskOpportunityAgent,
+    StrategistAgent,
+    QuickPlannerAgent,
+    QuickStrategistAgent
 )
+from ..agents.concurrency import detached_context
+from ..scoring import ScoringEngine
+from .deadline import DeadlineExceeded, call_with_deadline, has_time, leave_for, remaining
+
+SCORING_MODES = ("separate", "combined")
 
 
 class WorkflowState(TypedDict):
@@ -17,26 +27,102 @@ class WorkflowState(TypedDict):
     state: AgentState
 
 
+def _degrade(agent_state: AgentState, note: str):
+    """Record that a stage was skipped or shrunk to meet the deadline."""
+    print(f"⏱️ {note}")
+    agent_state.degraded = True
+    agent_state.degradations.append(note)
+
+
+def _seconds_left(agent_state: AgentState) -> str:
+    return f"{max(remaining(agent_state.deadline), 0.0):.1f}s left"
+
+
+def _recommend(agent_state: AgentState, run_strategist) -> Recommendation:
+    """
+    Run the strategist if the deadline allows, else derive the recommendation from scores.
+    
+    Args:
+        agent_state: State with risk and opportunity outputs
+        run_strategist: Zero-argument callable making the strategist call
+    """
+    if not has_time(agent_state.deadline, "strategist"):
+        _degrade(agent_state, f"Strategist skipped ({_seconds_left(agent_state)}); recommendation derived from scores")
+    else:
+        try:
+            return call_with_deadline(agent_state.deadline, run_strategist)
+        except DeadlineExceeded:
+            _degrade(agent_state, "Strategist did not finish before the deadline; recommendation derived from scores")
+    
+    return ScoringEngine.build_fallback_recommendation(
+        agent_state.decision_input.decision,
+        agent_state.risk_output,
+        agent_state.opportunity_output
+    )
+
+
 def create_workflow(
     model_name: str = "gpt-4",
-    temperature: float = 0.0
+    temperature: float = 0.0,
+    pipeline_research: Optional[bool] = None,
+    scoring_mode: Optional[str] = None,
+    checkpointer=None
 ) -> StateGraph:
-    """Create the decision analysis workflow graph."""
+    """
+    Create the decision analysis workflow graph.
+    
+    Args:
+        model_name: Model used by every agent
+        temperature: Sampling temperature used by every agent
+        pipeline_research: Research each factor as soon as the planner streams it,
+            instead of after planning finishes (uses settings default if None)
+        scoring_mode: "separate" runs the Risk and Opportunity agents as two calls,
+            "combined" scores both in one RiskOpportunityAgent call
+            (uses settings default if None)
+        checkpointer: LangGraph checkpointer that saves the state after every node
+    
+    Every node honours ``AgentState.deadline``: research is skipped or cut
+    short, separate scoring collapses into one combined call, and the
+    strategist falls back to a ScoringEngine recommendation when time runs
+    short. Each such step is recorded in ``AgentState.degradations``.
+    """
+    if pipeline_research is None:
+        pipeline_research = settings.PIPELINE_RESEARCH
+    
+    scoring_mode = (scoring_mode or settings.SCORING_MODE).lower()
+    if scoring_mode not in SCORING_MODES:
+        raise ValueError(
+            f"Unsupported scoring mode: {scoring_mode}. "
+            "Use 'separate' or 'combined'"
+        )
+    combined_scoring = scoring_mode == "combined"
     
     # Initialize agents
     planner = PlannerAgent(model_name=model_name, temperature=temperature)
     research = ResearchAgent(model_name=model_name, temperature=temperature)
-    risk = RiskAgent(model_name=model_name, temperature=temperature)
-    opportunity = OpportunityAgent(model_name=model_name, temperature=temperature)
+    risk_opportunity = None
+    if combined_scoring:
+        risk_opportunity = RiskOpportunityAgent(model_name=model_name, temperature=temperature)
+    else:
+        risk = RiskAgent(model_name=model_name, temperature=temperature)
+        opportunity = OpportunityAgent(model_name=model_name, temperature=temperature)
     strategist = StrategistAgent(model_name=model_name, temperature=temperature)
     
     # Define node functions
     def planner_node(state: WorkflowState) -> WorkflowState:
         """Execute planner agent."""
         agent_state = state["state"]
+        
+        if agent_state.planner_output is not None:
+            print(f"♻️ Reusing planner output: {len(agent_state.planner_output.factors)} factors")
+            agent_state.current_step = "planner_complete"
+            return {"state": agent_state}
+        
         print("🎯 Running Planner Agent...")
         try:
-            planner_output = planner.run(
+            planner_output = call_with_deadline(
+                agent_state.deadline,
+                planner.run,
                 decision=agent_state.decision_input.decision,
                 context=agent_state.decision_input.context or "",
                 timeframe=agent_state.decision_input.timeframe or ""
@@ -60,8 +146,24 @@ def create_workflow(
             print("⚠️ Skipping Research - previous error")
             return {"state": agent_state}
         
+        if agent_state.research_output is not None:
+            print(f"♻️ Reusing research output: {len(agent_state.research_output.analyses)} analyses")
+            agent_state.current_step = "research_complete"
+            return {"state": agent_state}
+        
+        if not has_time(agent_state.deadline, "research", "scoring"):
+            _degrade(agent_state, f"Research skipped ({_seconds_left(agent_state)})")
+            agent_state.research_output = ResearchOutput(
+                analyses=[],
+                overall_context="Research was skipped to meet the deadline."
+            )
+            agent_state.current_step = "research_complete"
+            return {"state": agent_state}
+        
         try:
-            research_output = research.run(
+            research_output = call_with_deadline(
+                leave_for(agent_state.deadline, "scoring"),
+                research.run,
                 decision=agent_state.decision_input.decision,
                 context=agent_state.decision_input.context or "",
                 planner_output=agent_state.planner_output
@@ -69,6 +171,13 @@ def create_workflow(
             print(f"✅ Research complete: {len(research_output.analyses)} analyses")
             agent_state.research_output = research_output
             agent_state.current_step = "research_complete"
+        except DeadlineExceeded:
+            _degrade(agent_state, "Research did not finish before the deadline and was dropped")
+            agent_state.research_output = ResearchOutput(
+                analyses=[],
+                overall_context="Research was skipped to meet the deadline."
+            )
+            agent_state.current_step = "research_complete"
         except Exception as e:
             print(f"❌ Research failed: {str(e)}")
             agent_state.error = f"Research error: {str(e)}"
@@ -76,6 +185,74 @@ def create_workflow(
         
         return {"state": agent_state}
     
+    def planner_research_node(state: WorkflowState) -> WorkflowState:
+        """Execute planner and research concurrently, one research call per streamed factor."""
+        agent_state = state["state"]
+        decision_input = agent_state.decision_input
+        context = decision_input.context or ""
+        
+        if agent_state.planner_output is not None and agent_state.research_output is not None:
+            print("♻️ Reusing planner and research outputs")
+            agent_state.current_step = "research_complete"
+            return {"state": agent_state}
+        
+        print("🎯 Running Planner Agent with pipelined research...")
+        pool = ThreadPoolExecutor(max_workers=settings.RESEARCH_CONCURRENCY)
+        futures = []
+        
+        def dispatch(factor):
+            print(f"🔍 Researching '{factor.name}'...")
+            # Research calls keep the caller's LLM priority, but not the planner's
+            # limiter slot, and end when research must
+            futures.append(pool.submit(
+                detached_context().run, call_with_deadline, leave_for(agent_state.deadline, "scoring"),
+                research.run_factor, decision_input.decision, context, factor
+            ))
+        
+        try:
+            if agent_state.planner_output is None:
+                agent_state.planner_output = call_with_deadline(
+                    agent_state.deadline,
+                    planner.stream,
+                    decision_input.decision,
+                    dispatch,
+                    context=context,
+                    timeframe=decision_input.timeframe or ""
+                )
+                print(f"✅ Planner complete: {len(agent_state.planner_output.factors)} factors identified")
+            else:
+                for factor in agent_state.planner_output.factors:
+                    dispatch(factor)
+            
+            names = {factor.name for factor in agent_state.planner_output.factors}
+            timeout = remaining(leave_for(agent_state.deadline, "scoring"))
+            done, pending = wait(futures, timeout=None if timeout is None else max(timeout, 0.0))
+            finished = [
+                future for future in futures
+                if future in done and not isinstance(future.exception(), DeadlineExceeded)
+            ]
+            if len(finished) < len(futures):
+                _degrade(
+                    agent_state,
+                    f"Research cut short: {len(finished)} of {len(futures)} factors researched before the deadline"
+                )
+            analyses = [future.result() for future in finished]
+            agent_state.research_output = ResearchOutput(
+                analyses=[analysis for analysis in analyses if analysis.factor_name in names],
+                overall_context=agent_state.planner_output.decision_summary
+            )
+            print(f"✅ Research complete: {len(agent_state.research_output.analyses)} analyses")
+            agent_state.current_step = "research_complete"
+        except Exception as e:
+            step = "Research" if agent_state.planner_output is not None else "Planner"
+            print(f"❌ {step} failed: {str(e)}")
+            agent_state.error = f"{step} error: {str(e)}"
+            agent_state.current_step = "error"
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return {"state": agent_state}
+    
     def risk_node(state: WorkflowState) -> WorkflowState:
         """Execute risk agent."""
         agent_state = state["state"]
@@ -85,8 +262,13 @@ def create_workflow(
             print("⚠️ Skipping Risk - previous error")
             return {"state": agent_state}
         
+        if not has_time(agent_state.deadline, "scoring", "scoring", "strategist"):
+            return score_combined(agent_state, f"Risk and opportunity scored in one call ({_seconds_left(agent_state)})")
+        
         try:
-            risk_output = risk.run(
+            risk_output = call_with_deadline(
+                agent_state.deadline,
+                risk.run,
                 decision=agent_state.decision_input.decision,
                 planner_output=agent_state.planner_output,
                 research_output=agent_state.research_output
@@ -112,8 +294,14 @@ def create_workflow(
             print("⚠️ Skipping Opportunity - previous error")
             return {"state": agent_state}
         
+        if agent_state.opportunity_output is not None:
+            print("✅ Opportunity already scored with risk")
+            return {"state": agent_state}
+        
         try:
-            opportunity_output = opportunity.run(
+            opportunity_output = call_with_deadline(
+                agent_state.deadline,
+                opportunity.run,
                 decision=agent_state.decision_input.decision,
                 planner_output=agent_state.planner_output,
                 research_output=agent_state.research_output
@@ -130,6 +318,46 @@ def create_workflow(
         
         return {"state": agent_state}
     
+    def risk_opportunity_node(state: WorkflowState) -> WorkflowState:
+        """Execute combined risk and opportunity agent."""
+        agent_state = state["state"]
+        print("⚖️ Running Risk & Opportunity Agent...")
+        
+        if agent_state.error:
+            print("⚠️ Skipping Risk & Opportunity - previous error")
+            return {"state": agent_state}
+        
+        return score_combined(agent_state)
+    
+    def score_combined(agent_state: AgentState, degradation: Optional[str] = None) -> WorkflowState:
+        """Score risks and opportunities in one call."""
+        nonlocal risk_opportunity
+        if risk_opportunity is None:
+            risk_opportunity = RiskOpportunityAgent(model_name=model_name, temperature=temperature)
+        if degradation:
+            _degrade(agent_state, degradation)
+        
+        try:
+            risk_output, opportunity_output = call_with_deadline(
+                agent_state.deadline,
+                risk_opportunity.run,
+                decision=agent_state.decision_input.decision,
+                planner_output=agent_state.planner_output,
+                research_output=agent_state.research_output
+            )
+            print(f"✅ Risk & Opportunity complete: risk {risk_output.overall_risk_level:.1f}/10, opportunity {opportunity_output.overall_opportunity_level:.1f}/10")
+            agent_state.risk_output = risk_output
+            agent_state.opportunity_output = opportunity_output
+            agent_state.current_step = "opportunity_complete"
+        except Exception as e:
+            print(f"❌ Risk & Opportunity failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            agent_state.error = f"Risk & Opportunity error: {str(e)}"
+            agent_state.current_step = "error"
+        
+        return {"state": agent_state}
+    
     def strategist_node(state: WorkflowState) -> WorkflowState:
         """Execute strategist agent."""
         agent_state = state["state"]
@@ -148,12 +376,12 @@ def create_workflow(
             if not agent_state.research_output:
                 raise ValueError("Research analysis not completed - research_output is None")
             
-            recommendation = strategist.run(
+            recommendation = _recommend(agent_state, lambda: strategist.run(
                 decision=agent_state.decision_input.decision,
                 research_output=agent_state.research_output,
                 risk_output=agent_state.risk_output,
                 opportunity_output=agent_state.opportunity_output
-            )
+            ))
             print(f"✅ Strategist complete: {recommendation.recommendation}")
             agent_state.recommendation = recommendation
             agent_state.current_step = "complete"
@@ -170,18 +398,153 @@ def create_workflow(
     workflow = StateGraph(WorkflowState)
     
     # Add nodes
-    workflow.add_node("planner", planner_node)
-    workflow.add_node("research", research_node)
-    workflow.add_node("risk", risk_node)
-    workflow.add_node("opportunity", opportunity_node)
+    if pipeline_research:
+        workflow.add_node("planner_research", planner_research_node)
+    else:
+        workflow.add_node("planner", planner_node)
+        workflow.add_node("research", research_node)
+    if combined_scoring:
+        workflow.add_node("risk_opportunity", risk_opportunity_node)
+    else:
+        workflow.add_node("risk", risk_node)
+        workflow.add_node("opportunity", opportunity_node)
     workflow.add_node("strategist", strategist_node)
     
     # Define edges - Sequential execution to avoid concurrent updates
-    workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "research")
-    workflow.add_edge("research", "risk")
-    workflow.add_edge("risk", "opportunity")  # Run opportunity after risk (sequential)
-    workflow.add_edge("opportunity", "strategist")
+    scoring_entry = "risk_opportunity" if combined_scoring else "risk"
+    if pipeline_research:
+        workflow.set_entry_point("planner_research")
+        workflow.add_edge("planner_research", scoring_entry)
+    else:
+        workflow.set_entry_point("planner")
+        workflow.add_edge("planner", "research")
+        workflow.add_edge("research", scoring_entry)
+    if combined_scoring:
+        workflow.add_edge("risk_opportunity", "strategist")
+    else:
+        workflow.add_edge("risk", "opportunity")  # Run opportunity after risk (sequential)
+        workflow.add_edge("opportunity", "strategist")
     workflow.add_edge("strategist", END)
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def create_quick_workflow(
+    model_name: str = "gpt-4",
+    temperature: float = 0.0,
+    checkpointer=None
+) -> StateGraph:
+    """
+    Create the quick analysis workflow graph.
+    
+    Three calls instead of five: factors and brief research in one call,
+    risk and opportunity in one call, then a short strategist call that
+    explains the recommendation ScoringEngine derives from the scores.
+    Its planner output can seed a full analysis later.
+    """
+    quick_planner = QuickPlannerAgent(model_name=model_name, temperature=temperature)
+    risk_opportunity = RiskOpportunityAgent(model_name=model_name, temperature=temperature)
+    quick_strategist = QuickStrategistAgent(model_name=model_name, temperature=temperature)
+    
+    def quick_plan_node(state: WorkflowState) -> WorkflowState:
+        """Execute quick planner (planning and research in one call)."""
+        agent_state = state["state"]
+        
+        if agent_state.planner_output and agent_state.research_output:
+            print("♻️ Reusing factors and research from a similar decision")
+            agent_state.current_step = "research_complete"
+            return {"state": agent_state}
+        
+        print("⚡ Running Quick Planner...")
+        try:
+            planner_output, research_output = call_with_deadline(
+                agent_state.deadline,
+                quick_planner.run,
+                decision=agent_state.decision_input.decision,
+                context=agent_state.decision_input.context or "",
+                timeframe=agent_state.decision_input.timeframe or ""
+            )
+            print(f"✅ Quick Planner complete: {len(planner_output.factors)} factors identified")
+            agent_state.planner_output = planner_output
+            agent_state.research_output = research_output
+            agent_state.current_step = "research_complete"
+        except Exception as e:
+            print(f"❌ Quick Planner failed: {str(e)}")
+            agent_state.error = f"Planner error: {str(e)}"
+            agent_state.current_step = "error"
+        
+        return {"state": agent_state}
+    
+    def quick_score_node(state: WorkflowState) -> WorkflowState:
+        """Score risks and opportunities in one call."""
+        agent_state = state["state"]
+        print("⚖️ Running Risk & Opportunity Agent...")
+        
+        if agent_state.error:
+            print("⚠️ Skipping Risk & Opportunity - previous error")
+            return {"state": agent_state}
+        
+        try:
+            risk_output, opportunity_output = call_with_deadline(
+                agent_state.deadline,
+                risk_opportunity.run,
+                decision=agent_state.decision_input.decision,
+                planner_output=agent_state.planner_output,
+                research_output=agent_state.research_output
+            )
+            print(f"✅ Risk & Opportunity complete: risk {risk_output.overall_risk_level:.1f}/10, opportunity {opportunity_output.overall_opportunity_level:.1f}/10")
+            agent_state.risk_output = risk_output
+            agent_state.opportunity_output = opportunity_output
+            agent_state.current_step = "opportunity_complete"
+        except Exception as e:
+            print(f"❌ Risk & Opportunity failed: {str(e)}")
+            agent_state.error = f"Risk & Opportunity error: {str(e)}"
+            agent_state.current_step = "error"
+        
+        return {"state": agent_state}
+    
+    def quick_strategist_node(state: WorkflowState) -> WorkflowState:
+        """Derive the recommendation deterministically and explain it briefly."""
+        agent_state = state["state"]
+        print("🧠 Running Quick Strategist...")
+        
+        if agent_state.error:
+            print("⚠️ Skipping Strategist - previous error")
+            return {"state": agent_state}
+        
+        try:
+            overall_risk = ScoringEngine.calculate_overall_risk(agent_state.risk_output.risk_scores)
+            overall_opportunity = ScoringEngine.calculate_overall_opportunity(
+                agent_state.opportunity_output.opportunity_scores
+            )
+            category = ScoringEngine.get_recommendation_category(overall_risk, overall_opportunity)
+            
+            recommendation = _recommend(agent_state, lambda: quick_strategist.run(
+                decision=agent_state.decision_input.decision,
+                recommendation=category,
+                risk_output=agent_state.risk_output,
+                opportunity_output=agent_state.opportunity_output,
+                overall_risk=overall_risk,
+                overall_opportunity=overall_opportunity
+            ))
+            print(f"✅ Quick Strategist complete: {recommendation.recommendation}")
+            agent_state.recommendation = recommendation
+            agent_state.current_step = "complete"
+        except Exception as e:
+            print(f"❌ Quick Strategist failed: {str(e)}")
+            agent_state.error = f"Strategist error: {str(e)}"
+            agent_state.current_step = "error"
+        
+        return {"state": agent_state}
+    
+    workflow = StateGraph(WorkflowState)
+    workflow.add_node("quick_plan", quick_plan_node)
+    workflow.add_node("quick_score", quick_score_node)
+    workflow.add_node("quick_strategist", quick_strategist_node)
+    
+    workflow.set_entry_point("quick_plan")
+    workflow.add_edge("quick_plan", "quick_score")
+    workflow.add_edge("quick_score", "quick_strategist")
+    workflow.add_edge("quick_strategist", END)
+    
+    return workflow.compile(checkpointer=checkpointer)
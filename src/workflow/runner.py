@@ -1,27 +1,94 @@
 """Workflow runner for executing the decision analysis."""
-from typing import Optional, Callable
-from ..schemas import DecisionInput, AgentState, Recommendation
-from .graph import create_workflow, WorkflowState
+import hashlib
+import json
+import math
+import time
+import uuid
+from typing import Optional, Callable, Dict
+from config import settings
+from ..schemas import DecisionInput, AgentState, Recommendation, PlannerOutput, ResearchOutput
+from .graph import create_workflow, create_quick_workflow, WorkflowState
+from .checkpoints import get_checkpointer, run_config, run_metadata, delete_run
+from ..agents.scheduler import current_priority
+from ..utils.singleflight import SingleFlight
+
+# Concurrent identical analyses in this process share one execution
+analysis_flights = SingleFlight()
+# Time budgets within the same bucket count as the same deadline for coalescing
+DEADLINE_BUCKET_SECONDS = 10
 
 
 class DecisionWorkflowRunner:
     """Runs the complete decision analysis workflow."""
     
+    QUICK_STEPS = {
+        "research_complete": ("⚖️ Step 2/3: Scoring risks and opportunities...", 45),
+        "opportunity_complete": ("🧠 Step 3/3: Summarizing recommendation...", 80),
+        "complete": ("✅ Complete!", 100)
+    }
+    
+    FULL_STEPS = {
+        "planner_complete": ("🔍 Step 2/5: Researching context...", 30),
+        "research_complete": ("⚠️ Step 3/5: Analyzing risks...", 50),
+        "risk_complete": ("🎁 Step 4/5: Identifying opportunities...", 70),
+        "opportunity_complete": ("🧠 Step 5/5: Synthesizing recommendation...", 85),
+        "complete": ("✅ Complete!", 100)
+    }
+    
     def __init__(
         self,
         model_name: str = "gpt-4",
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        pipeline_research: Optional[bool] = None,
+        scoring_mode: Optional[str] = None,
+        quick: bool = False
     ):
-        """Initialize the workflow runner."""
-        self.workflow = create_workflow(
-            model_name=model_name,
-            temperature=temperature
-        )
+        """
+        Initialize the workflow runner.
+        
+        Args:
+            quick: Run the three-call quick analysis instead of the full
+                pipeline; ``upgrade`` turns its result into a full analysis
+        """
+        self.model_name = model_name
+        self.temperature = temperature
+        self.pipeline_research = settings.PIPELINE_RESEARCH if pipeline_research is None else pipeline_research
+        self.scoring_mode = (scoring_mode or settings.SCORING_MODE).lower()
+        self.quick = quick
+        self.checkpointer = get_checkpointer()
+        
+        if quick:
+            self.workflow = create_quick_workflow(
+                model_name=model_name,
+                temperature=temperature,
+                checkpointer=self.checkpointer
+            )
+        else:
+            self.workflow = create_workflow(
+                model_name=model_name,
+                temperature=temperature,
+                pipeline_research=self.pipeline_research,
+                scoring_mode=self.scoring_mode,
+                checkpointer=self.checkpointer
+            )
+    
+    @property
+    def shape(self) -> Dict:
+        """Graph options a checkpointed run must be resumed with."""
+        return {
+            "quick": self.quick,
+            "pipeline_research": self.pipeline_research,
+            "scoring_mode": self.scoring_mode
+        }
     
     def run(
         self,
         decision_input: DecisionInput,
-        progress_callback: Optional[Callable[[str, int], None]] = None
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        prior_analysis: Optional[Dict] = None,
+        deadline: Optional[float] = None,
+        run_id: Optional[str] = None,
+        metadata: Optional[Dict] = None
     ) -> AgentState:
         """
         Execute the full workflow.
@@ -29,41 +96,260 @@ class DecisionWorkflowRunner:
         Args:
             decision_input: The decision to analyze
             progress_callback: Optional callback for progress updates (step_name, progress_percent)
+            prior_analysis: Optional full_analysis of a near-duplicate past decision;
+                its planner and research outputs are reused instead of regenerated
+            deadline: ``time.time()`` by which a result is needed. Stages are
+                skipped or shrunk to meet it and the result is flagged as
+                degraded. Defaults to TIMEOUT_SECONDS from now (0 disables)
+            run_id: Checkpoint key for ``resume`` (generated if None)
+            metadata: Flat scalar fields stored with the run's checkpoints,
+                e.g. the owning user id
             
         Returns:
-            AgentState with all agent outputs and final recommendation
+            AgentState with all agent outputs and final recommendation;
+            ``run_id`` identifies the run if it needs to be resumed
+        
+        While an identical analysis (same user, normalized input, prior
+        analysis, run metadata, provider, model, graph options and time
+        budget to within DEADLINE_BUCKET_SECONDS) is already running in
+        this process, the call waits for it and gets a copy of its result,
+        run_id included, instead of starting another workflow
+        (COALESCE_ANALYSES). Different users never share a run, so each
+        owns its checkpoints and is charged for its own LLM calls.
         """
+        if deadline is None and settings.TIMEOUT_SECONDS > 0:
+            deadline = time.time() + settings.TIMEOUT_SECONDS
+        if not settings.COALESCE_ANALYSES:
+            return self._run(decision_input, progress_callback, prior_analysis, deadline, run_id, metadata)
+        
+        state, shared = analysis_flights.do(
+            self._flight_key(decision_input, prior_analysis, deadline, run_id, metadata),
+            lambda: self._run(decision_input, progress_callback, prior_analysis, deadline, run_id, metadata)
+        )
+        if shared:
+            print("🔗 Joined an identical analysis already in progress")
+            state = state.model_copy(deep=True)
+            if progress_callback and not state.error:
+                progress_callback("✅ Complete!", 100)
+        return state
+    
+    def _flight_key(
+        self,
+        decision_input: DecisionInput,
+        prior_analysis: Optional[Dict],
+        deadline: Optional[float] = None,
+        run_id: Optional[str] = None,
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """Identity of an analysis for coalescing concurrent duplicates."""
+        def normalize(text: Optional[str]) -> str:
+            return " ".join((text or "").split()).casefold()
+        
+        metadata = metadata or {}
+        user_id = metadata.get("user_id")
+        budget = None
+        if deadline is not None:
+            budget = math.ceil(max(deadline - time.time(), 0.0) / DEADLINE_BUCKET_SECONDS)
+        
+        identity = {
+            # The user the run is checkpointed and charged for, as the ledger resolves it
+            "user_id": user_id if user_id is not None else current_priority()[1],
+            "metadata": metadata,
+            "run_id": run_id,
+            "budget": budget,
+            "decision": normalize(decision_input.decision),
+            "context": normalize(decision_input.context),
+            "timeframe": normalize(decision_input.timeframe),
+            "prior_analysis": prior_analysis,
+            "provider": settings.LLM_PROVIDER,
+            "model": self.model_name,
+            "temperature": self.temperature,
+            **self.shape
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def _run(
+        self,
+        decision_input: DecisionInput,
+        progress_callback: Optional[Callable[[str, int], None]],
+        prior_analysis: Optional[Dict],
+        deadline: Optional[float],
+        run_id: Optional[str],
+        metadata: Optional[Dict]
+    ) -> AgentState:
+        """Execute one workflow run (see ``run``)."""
+        if deadline is None and settings.TIMEOUT_SECONDS > 0:
+            deadline = time.time() + settings.TIMEOUT_SECONDS
+        
         # Initialize state
         initial_state = AgentState(
             decision_input=decision_input,
-            current_step="initialized"
+            current_step="initialized",
+            analysis_mode="quick" if self.quick else "full",
+            deadline=deadline,
+            run_id=run_id or uuid.uuid4().hex
         )
         
-        # Progress tracking
-        steps = {
-            "planner_complete": ("🔍 Step 2/5: Researching context...", 30),
-            "research_complete": ("⚠️ Step 3/5: Analyzing risks...", 50),
-            "risk_complete": ("🎁 Step 4/5: Identifying opportunities...", 70),
-            "opportunity_complete": ("🧠 Step 5/5: Synthesizing recommendation...", 85),
-            "complete": ("✅ Complete!", 100)
-        }
+        if prior_analysis:
+            if prior_analysis.get("planner"):
+                initial_state.planner_output = PlannerOutput(**prior_analysis["planner"])
+            if prior_analysis.get("research") and initial_state.planner_output:
+                initial_state.research_output = ResearchOutput(**prior_analysis["research"])
+        
+        if settings.LLM_CASSETTE_RECORD:
+            from ..agents.cassette import get_cassette
+            get_cassette().record_run({
+                "decision_input": decision_input.model_dump(),
+                "prior_analysis": prior_analysis,
+                "model_name": self.model_name,
+                "temperature": self.temperature,
+                **self.shape
+            })
         
-        # Run workflow with progress tracking
         workflow_state: WorkflowState = {"state": initial_state}
+        config = self._config(initial_state.run_id, {**(metadata or {}), **self.shape})
+        
+        return self._execute(workflow_state, config, progress_callback)
+    
+    def resume(
+        self,
+        run_id: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        deadline: Optional[float] = None
+    ) -> AgentState:
+        """
+        Continue a checkpointed run from its last successful node.
+        
+        Nodes that already succeeded are not run again, so their LLM calls
+        are not repeated. Works for runs that failed as well as runs whose
+        process died mid-way.
         
-        # Stream through workflow steps
-        for event in self.workflow.stream(workflow_state):
+        Args:
+            run_id: The run to continue
+            progress_callback: Optional callback for progress updates
+            deadline: ``time.time()`` by which a result is needed (see ``run``);
+                the original run's deadline is replaced
+            
+        Returns:
+            AgentState of the resumed run
+            
+        Raises:
+            ValueError: If checkpoints are disabled or the run is unknown
+        """
+        if self.checkpointer is None:
+            raise ValueError("Workflow checkpoints are disabled (CHECKPOINTS_ENABLED=false)")
+        
+        metadata = run_metadata(run_id)
+        if metadata is None:
+            raise ValueError(f"Unknown run: {run_id}")
+        
+        # Resume with the graph the run was started with
+        shape = {key: metadata[key] for key in self.shape if key in metadata}
+        if shape and shape != self.shape:
+            runner = DecisionWorkflowRunner(
+                model_name=self.model_name,
+                temperature=self.temperature,
+                **shape
+            )
+            return runner.resume(run_id, progress_callback=progress_callback, deadline=deadline)
+        
+        config = self._config(run_id, metadata)
+        snapshot = next(
+            (
+                snapshot for snapshot in self.workflow.get_state_history(config)
+                if snapshot.values.get("state") is not None and not snapshot.values["state"].error
+            ),
+            None
+        )
+        if snapshot is None:
+            raise ValueError(f"Run {run_id} has no successful step to resume from")
+        
+        state = snapshot.values["state"]
+        if not snapshot.next:
+            return state
+        
+        print(f"🔁 Resuming run {run_id} at {', '.join(snapshot.next)}")
+        if deadline is None and settings.TIMEOUT_SECONDS > 0:
+            deadline = time.time() + settings.TIMEOUT_SECONDS
+        state.deadline = deadline
+        
+        # Fork from the last good checkpoint with a fresh deadline
+        fork = self.workflow.update_state({**snapshot.config, "metadata": metadata}, {"state": state})
+        return self._execute(None, {**fork, "metadata": metadata}, progress_callback)
+    
+    def _config(self, run_id: str, metadata: Dict) -> Optional[Dict]:
+        if self.checkpointer is None:
+            return None
+        return {**run_config(run_id), "metadata": metadata}
+    
+    def _execute(
+        self,
+        workflow_input: Optional[WorkflowState],
+        config: Optional[Dict],
+        progress_callback: Optional[Callable[[str, int], None]]
+    ) -> AgentState:
+        """Stream the graph, report progress and return the final state."""
+        steps = self.QUICK_STEPS if self.quick else self.FULL_STEPS
+        
+        # Stream through workflow steps; "values" mode yields the full state
+        # after every node, so the last event is the final result
+        result = workflow_input
+        for event in self.workflow.stream(workflow_input, config=config, stream_mode="values"):
             if "state" in event:
-                current_state = event["state"]
-                step = current_state.current_step
+                result = event
+                step = event["state"].current_step
                 
                 if step in steps and progress_callback:
                     step_name, progress = steps[step]
                     progress_callback(step_name, progress)
         
-        # Get final result
-        result = self.workflow.invoke(workflow_state)
-        return result["state"]
+        state = result["state"]
+        
+        # Only failed or interrupted runs need their checkpoints
+        if config is not None and not state.error:
+            delete_run(state.run_id)
+        
+        return state
+    
+    def upgrade(
+        self,
+        quick_state: AgentState,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        deadline: Optional[float] = None,
+        metadata: Optional[Dict] = None
+    ) -> AgentState:
+        """
+        Turn a quick analysis into a full one.
+        
+        The quick run's factors are kept, so the planner call is skipped;
+        research, scoring and strategy are redone at full depth.
+        
+        Args:
+            quick_state: Final state of a quick run
+            progress_callback: Optional callback for progress updates
+            deadline: ``time.time()`` by which a result is needed (see ``run``)
+            metadata: Fields stored with the run's checkpoints (see ``run``)
+            
+        Returns:
+            AgentState of the full analysis
+        """
+        runner = self if not self.quick else DecisionWorkflowRunner(
+            model_name=self.model_name,
+            temperature=self.temperature,
+            pipeline_research=self.pipeline_research,
+            scoring_mode=self.scoring_mode
+        )
+        prior_analysis = None
+        if quick_state.planner_output:
+            prior_analysis = {"planner": quick_state.planner_output.model_dump()}
+        
+        return runner.run(
+            quick_state.decision_input,
+            progress_callback=progress_callback,
+            prior_analysis=prior_analysis,
+            deadline=deadline,
+            metadata=metadata
+        )
     
     def get_recommendation(self, decision_input: DecisionInput) -> Optional[Recommendation]:
         """
@@ -1,5 +1,7 @@
 """Test all backend features."""
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Add src to path
@@ -290,6 +292,1528 @@ def test_history_manager(user_id):
         return False, None
 
 
+def _get_test_user_id(username="testuser123", email="test@example.com"):
+    """Register (if needed) and log in a test user, returning its ID."""
+    init_db()
+    AuthManager.register_user(username=username, email=email, password="TestPass123")
+    success, _, user_data = AuthManager.login_user(username=username, password="TestPass123")
+    assert success, "Test user login failed"
+    return user_data['id']
+
+
+def test_analytics_rollup():
+    """Test that the analytics rollup tracks saves and deletes."""
+    print("\n🧪 Testing Analytics Rollup...")
+    
+    user_id = _get_test_user_id("rollupuser", "rollup@example.com")
+    state = create_mock_state()
+    
+    before = HistoryManager.get_analytics_summary(user_id)
+    print(f"   Starting total: {before['total_decisions']}")
+    
+    decision_id = HistoryManager.save_decision(user_id, state, tags=["career", "rollup"])
+    after_save = HistoryManager.get_analytics_summary(user_id)
+    
+    assert after_save['total_decisions'] == before['total_decisions'] + 1
+    assert after_save['tag_counts'].get("rollup", 0) == before['tag_counts'].get("rollup", 0) + 1
+    assert after_save['recommendation_counts'].get("Proceed with Caution", 0) == \
+        before['recommendation_counts'].get("Proceed with Caution", 0) + 1
+    assert sum(after_save['daily']['counts']) == after_save['total_decisions']
+    print(f"✅ Rollup updated on save: {after_save['total_decisions']} decisions")
+    
+    assert HistoryManager.delete_decision(decision_id, user_id)
+    after_delete = HistoryManager.get_analytics_summary(user_id)
+    
+    assert after_delete['total_decisions'] == before['total_decisions']
+    assert after_delete['tag_counts'].get("rollup", 0) == before['tag_counts'].get("rollup", 0)
+    print("✅ Rollup updated on delete")
+    
+    # Two first accesses racing to create the rollup row: the loser reuses the winner's
+    from src.auth.database import get_session, UserAnalytics
+    from src.history.analytics import AnalyticsRollup
+    
+    winner, loser = get_session(), get_session()
+    try:
+        winner.query(UserAnalytics).filter(UserAnalytics.user_id == user_id).delete()
+        winner.commit()
+        AnalyticsRollup._create(winner, user_id)
+        winner.commit()
+        
+        rollup = AnalyticsRollup._create(loser, user_id)
+        assert rollup is not None and rollup.user_id == user_id
+        AnalyticsRollup.rebuild(loser, user_id)
+        loser.commit()
+    finally:
+        winner.close()
+        loser.close()
+    assert HistoryManager.get_analytics_summary(user_id)['total_decisions'] == before['total_decisions']
+    print("✅ Concurrent rollup creation does not fail")
+    
+    # Unscored decisions count per day without lowering the day's averages
+    from datetime import datetime
+    from types import SimpleNamespace
+    
+    rollup = UserAnalytics(user_id=user_id)
+    AnalyticsRollup._reset(rollup)
+    day = datetime(2024, 3, 1, 12)
+    scored = SimpleNamespace(
+        risk_score=6.0, opportunity_score=8.0, confidence_level=0.7,
+        recommendation="Proceed", tags="", created_at=day
+    )
+    unscored = SimpleNamespace(
+        risk_score=None, opportunity_score=None, confidence_level=None,
+        recommendation=None, tags="", created_at=day
+    )
+    AnalyticsRollup._accumulate(rollup, scored, 1)
+    AnalyticsRollup._accumulate(rollup, unscored, 1)
+    daily = AnalyticsRollup.to_summary(rollup)['daily']
+    assert daily['counts'] == [2] and daily['avg_risk'] == [6.0] and daily['avg_opportunity'] == [8.0]
+    AnalyticsRollup._accumulate(rollup, unscored, -1)
+    daily = AnalyticsRollup.to_summary(rollup)['daily']
+    assert daily['counts'] == [1] and daily['avg_risk'] == [6.0]
+    print("✅ Unscored decisions do not lower daily averages")
+    
+    return True
+
+
+def test_analytics_timeseries():
+    """Test SQL-side time-bucketed analytics."""
+    print("\n🧪 Testing Analytics Timeseries...")
+    
+    user_id = _get_test_user_id("rollupuser", "rollup@example.com")
+    HistoryManager.save_decision(user_id, create_mock_state(), tags=["timeseries"])
+    total = HistoryManager.get_analytics_summary(user_id)['total_decisions']
+    
+    for bucket in ("day", "week", "month"):
+        series = HistoryManager.get_analytics_timeseries(user_id, bucket=bucket)
+        assert sum(series['count']) == total
+        assert len(series['avg_risk']) == len(series['period'])
+        for counts in series['recommendations'].values():
+            assert len(counts) == len(series['period'])
+        print(f"✅ {bucket}: {len(series['period'])} period(s)")
+    
+    distribution = HistoryManager.get_score_distribution(user_id)
+    assert sum(distribution['risk']) == total
+    assert sum(distribution['confidence_by_recommendation']['count']) == total
+    print("✅ Score distribution matches total")
+    
+    return True
+
+
+def test_decision_cache():
+    """Test the read-through cache for decision lookups."""
+    print("\n🧪 Testing Decision Cache...")
+    
+    from src.history.cache import DecisionCache, MemoryCacheBackend, SQLiteCacheBackend, decision_cache
+    
+    user_id = _get_test_user_id("rollupuser", "rollup@example.com")
+    decision_id = HistoryManager.save_decision(user_id, create_mock_state(), tags=["cache"])
+    
+    hits_before = decision_cache.hits
+    first = HistoryManager.get_decision_by_id(decision_id)
+    second = HistoryManager.get_decision_by_id(decision_id)
+    assert first == second
+    assert decision_cache.hits == hits_before + 1
+    print(f"✅ Cache hit on repeat lookup: {decision_cache.stats()}")
+    
+    # Callers get copies, so changing a payload does not change the cache
+    first['tags'].append("mutated")
+    first['full_analysis'].clear()
+    assert HistoryManager.get_decision_by_id(decision_id) == second
+    print("✅ Cached payloads are not shared with callers")
+    
+    assert HistoryManager.delete_decision(decision_id, user_id)
+    assert HistoryManager.get_decision_by_id(decision_id) is None
+    print("✅ Deleted decision is not served from cache")
+    
+    # Both backends evict least recently used entries
+    for backend in (
+        MemoryCacheBackend(max_entries=2),
+        SQLiteCacheBackend(path=os.path.join(tempfile.mkdtemp(), "cache.db"), max_entries=2)
+    ):
+        cache = DecisionCache(backend)
+        cache.get_or_load(1, 1, lambda: {"id": 1})
+        cache.get_or_load(2, 1, lambda: {"id": 2})
+        cache.get_or_load(1, 1, lambda: {"id": -1})
+        cache.get_or_load(3, 1, lambda: {"id": 3})
+        assert backend.get("decision:2:v1") is None
+        assert cache.get_or_load(1, 1, lambda: {"id": -1}) == {"id": 1}
+        assert cache.get_or_load(1, 2, lambda: {"id": 12}) == {"id": 12}
+        cache.invalidate(1)
+        assert backend.get("decision:1:v1") is None and backend.get("decision:1:v2") is None
+        print(f"✅ {backend.name} backend LRU/versioning OK: {cache.stats()}")
+    
+    return True
+
+
+def test_factor_scores():
+    """Test factor rows are kept in sync with history and aggregated in SQL."""
+    print("\n🧪 Testing Factor Scores...")
+    
+    from src.auth.database import get_session, DecisionFactorScore
+    
+    user_id = _get_test_user_id("rollupuser", "rollup@example.com")
+    decision_id = HistoryManager.save_decision(user_id, create_mock_state(), tags=["factors"])
+    
+    session = get_session()
+    try:
+        rows = session.query(DecisionFactorScore).filter_by(decision_id=decision_id).all()
+        assert rows and all(row.category for row in rows)
+        print(f"✅ Saved {len(rows)} factor rows")
+    finally:
+        session.close()
+    
+    by_category = HistoryManager.get_factor_analytics(user_id, group_by="category")
+    assert len(by_category["key"]) == len(by_category["avg_risk"]) > 0
+    by_factor = HistoryManager.get_factor_analytics(user_id, group_by="factor", order_by="count", limit=5)
+    assert len(by_factor["key"]) <= 5
+    print(f"✅ Factor analytics: {by_category['key']}")
+    
+    # Historical records may lack factor names; those factors are skipped
+    from src.history.factor_scores import FactorScores
+    rows = FactorScores.rows_from_analysis(decision_id, user_id, {
+        "planner": {"factors": [{"description": "No name"}, {"name": "Growth", "category": "Career"}]},
+        "risk": {"risk_scores": [{"score": 4.0}, {"factor_name": "", "score": 5.0}, {"factor_name": "growth", "score": 3.0}]},
+        "opportunity": {"opportunity_scores": [{"factor_name": None, "score": 8.0}]}
+    })
+    assert [(r.factor_name, r.category, r.risk) for r in rows] == [("Growth", "career", 3.0)]
+    print("✅ Malformed historical record skipped nameless factors")
+    
+    # Backfill marks every decision it reads, so analyses without factors are read once
+    from src.auth.database import DecisionHistory
+    session = get_session()
+    try:
+        empty = DecisionHistory(user_id=user_id, decision_text="No factors", full_analysis="{}")
+        session.add(empty)
+        session.commit()
+        empty_id = empty.id
+    finally:
+        session.close()
+    assert HistoryManager.backfill_factor_scores(user_id=user_id) == 1
+    assert HistoryManager.backfill_factor_scores(user_id=user_id) == 0
+    session = get_session()
+    try:
+        assert session.get(DecisionHistory, empty_id).factors_indexed
+        session.delete(session.get(DecisionHistory, empty_id))
+        session.commit()
+    finally:
+        session.close()
+    print("✅ Repeat backfill skips decisions without factors")
+    
+    assert HistoryManager.delete_decision(decision_id, user_id)
+    session = get_session()
+    try:
+        assert session.query(DecisionFactorScore).filter_by(decision_id=decision_id).count() == 0
+        print("✅ Factor rows removed with decision")
+    finally:
+        session.close()
+    
+    return True
+
+
+def test_similar_decisions():
+    """Test near-duplicate detection over past decisions."""
+    print("\n🧪 Testing Similar Decision Detection...")
+    
+    from src.utils import SimilarityIndex
+    
+    index = SimilarityIndex()
+    index.add(1, "Should I switch careers from software engineering to AI research?")
+    index.add(2, "Should I buy a house in the suburbs or keep renting downtown?")
+    index.add(3, "Should I go back to school for an MBA?")
+    matches = index.query("Thinking about switching my career from software engineering into AI research", limit=2)
+    assert matches[0][0] == 1 and matches[0][1] > matches[1][1]
+    assert index.remove(1) and 1 not in index and len(index) == 2
+    print(f"✅ Index ranks rewording first: {matches}")
+    
+    user_id = _get_test_user_id("similaruser", "similar@example.com")
+    decision_id = HistoryManager.save_decision(user_id, create_mock_state(), tags=["similar"])
+    
+    matches = HistoryManager.find_similar_decisions(
+        user_id,
+        "Should I switch my career from software engineering to AI research?",
+        "10 years of experience in backend development",
+        threshold=0.5
+    )
+    assert matches and matches[0]["id"] == decision_id
+    assert 0.5 <= matches[0]["similarity"] <= 1.0
+    print(f"✅ Found {matches[0]['similarity'] * 100:.0f}% similar past decision")
+    
+    unrelated = HistoryManager.find_similar_decisions(user_id, "Should I adopt a dog this spring?")
+    assert all(match["id"] != decision_id for match in unrelated)
+    
+    assert HistoryManager.delete_decision(decision_id, user_id)
+    matches = HistoryManager.find_similar_decisions(
+        user_id, create_mock_state().decision_input.decision, threshold=0.5
+    )
+    assert all(match["id"] != decision_id for match in matches)
+    print("✅ Deleted decision removed from index")
+    
+    # Only committed saves reach the index
+    from src.auth.database import get_session, DecisionHistory
+    from src.history import queries
+    from src.history.similarity import similarity_index
+    
+    session = get_session()
+    try:
+        rolled_back = queries.save_decision(session, user_id, create_mock_state())
+        session.rollback()
+    finally:
+        session.close()
+    assert rolled_back not in similarity_index._indexes[user_id]
+    print("✅ Rolled back save not indexed")
+    
+    # Rows written by another process are picked up on the next lookup
+    session = get_session()
+    try:
+        other = DecisionHistory(
+            user_id=user_id, decision_text="Should I move to Lisbon for a remote job?",
+            recommendation="Proceed", confidence_level=0.8, risk_score=4.0, opportunity_score=7.0
+        )
+        session.add(other)
+        session.commit()
+        other_id = other.id
+        
+        matches = HistoryManager.find_similar_decisions(user_id, "Should I move to Lisbon for a remote job?", threshold=0.5)
+        assert [match["id"] for match in matches][:1] == [other_id]
+        
+        session.query(DecisionHistory).filter(DecisionHistory.id == other_id).delete()
+        session.commit()
+    finally:
+        session.close()
+    matches = HistoryManager.find_similar_decisions(user_id, "Should I move to Lisbon for a remote job?", threshold=0.5)
+    assert all(match["id"] != other_id for match in matches)
+    print("✅ Index rebuilt after changes by another process")
+    
+    return True
+
+
+def test_planner_cache():
+    """Test the similarity-keyed planner output cache."""
+    print("\n🧪 Testing Planner Cache...")
+    
+    from src.agents.planner_cache import PlannerCache
+    
+    planned = create_mock_state().planner_output
+    cache = PlannerCache(max_entries=2, threshold=0.6)
+    
+    assert cache.lookup("Should I switch careers from software engineering to AI research?") is None
+    cache.store("Should I switch careers from software engineering to AI research?", planned)
+    
+    hit = cache.lookup("Should I switch my career from software engineering into AI research?")
+    assert hit is not None and len(hit.factors) == len(planned.factors)
+    assert hit.decision_summary.startswith("Should I switch my career")
+    assert cache.lookup("Should I switch careers from software engineering to AI research?", namespace="other") is None
+    print(f"✅ Similar decision served from cache: {cache.stats()}")
+    
+    cache.store("Should I buy a house in the suburbs?", planned)
+    cache.store("Should I adopt a rescue dog?", planned)
+    assert cache.evictions == 1 and cache.stats()["size"] == 2
+    assert cache.lookup("Should I switch careers from software engineering to AI research?") is None
+    print(f"✅ Least recently used entry evicted: {cache.stats()}")
+    
+    # Partitions are shared by users but keep contexts and timeframes apart
+    from config import settings
+    from src.agents.planner import PlannerAgent
+    from src.agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
+    
+    saved_provider = settings.LLM_PROVIDER
+    settings.LLM_PROVIDER = "fake"
+    try:
+        agent = PlannerAgent(cache=PlannerCache(max_entries=8, threshold=0.6))
+    finally:
+        settings.LLM_PROVIDER = saved_provider
+    decision = "Should I switch careers from software engineering to AI research?"
+    with llm_priority(INTERACTIVE_ANALYSIS, 1):
+        agent.cache.store(decision, planned, agent._cache_partition("10 years in backend", "1 year"))
+        assert agent.cache.lookup(decision, agent._cache_partition("  10 Years in backend ", "1 year")) is not None
+        assert agent.cache.lookup(decision, agent._cache_partition("Just graduated", "1 year")) is None
+        assert agent.cache.lookup(decision, agent._cache_partition("10 years in backend", "5 years")) is None
+    with llm_priority(INTERACTIVE_ANALYSIS, 2):
+        hit = agent.cache.lookup(
+            "Should I switch my career from software engineering into AI research?",
+            agent._cache_partition("10 years in backend", "1 year")
+        )
+        assert hit is not None and hit.decision_summary.startswith("Should I switch my career")
+    print("✅ Other users hit; other contexts and timeframes miss")
+    
+    return True
+
+
+def test_incremental_json_parser():
+    """Test streaming parser emits array items as soon as they complete."""
+    print("\n🧪 Testing Incremental JSON Parser...")
+    
+    import json
+    from src.agents.json_stream import IncrementalJSONParser
+    
+    document = {
+        "factors": [
+            {"name": "Cost {estimate}", "description": "Say \"hi\" [maybe]", "category": "financial"},
+            {"name": "Growth", "description": "Nested", "category": "professional", "extra": {"a": [1, 2]}}
+        ],
+        "decision_summary": "Summary with } and ] inside"
+    }
+    text = "Here you go:\n```json\n" + json.dumps(document) + "\n```"
+    
+    parser = IncrementalJSONParser("factors")
+    seen = []
+    emitted_at = []
+    for i in range(0, len(text), 3):
+        for item in parser.feed(text[i:i + 3]):
+            seen.append(item)
+            emitted_at.append(i)
+    
+    assert seen == document["factors"]
+    assert emitted_at[0] < text.index("Growth")
+    assert json.loads(parser.document()) == document
+    print(f"✅ Emitted {len(seen)} items before the document finished")
+    
+    return True
+
+
+def test_deadline_fallback():
+    """Test deadline helpers and the score-only fallback recommendation."""
+    print("\n🧪 Testing Deadline Fallback...")
+    
+    import time
+    from src.scoring import ScoringEngine
+    from src.workflow.deadline import DeadlineExceeded, call_with_deadline, has_time
+    
+    assert call_with_deadline(None, lambda x: x * 2, 21) == 42
+    assert call_with_deadline(time.time() + 5, lambda x: x * 2, 21) == 42
+    try:
+        call_with_deadline(time.time() + 0.05, time.sleep, 1)
+        assert False, "Expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    assert has_time(None, "research", "scoring", "strategist")
+    assert not has_time(time.time() + 1, "strategist")
+    print("✅ Calls are bounded by the deadline")
+    
+    # A slow LLM call is cancelled at the deadline and gives its slot back
+    import httpx
+    from src.agents.concurrency import AdaptiveConcurrencyLimiter
+    from src.agents.fake_llm import FakeChatModel
+    from src.agents.http_pool import HTTPPool
+    from src.agents.scheduler import llm_deadline
+    
+    limiter = AdaptiveConcurrencyLimiter("deadline-test", initial=1)
+    model = FakeChatModel(first_token_s=5, per_token_s=0, rate_limiter=limiter, callbacks=[limiter.release_handler])
+    started = time.time()
+    try:
+        call_with_deadline(time.time() + 0.2, model.invoke, "hello")
+        assert False, "Expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    assert time.time() - started < 1.0 and limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["decreases"] == 0
+    print(f"✅ Slow call cancelled after {time.time() - started:.2f}s, slot released")
+    
+    # A call queued for a slot stops waiting at the deadline
+    assert limiter.acquire()
+    try:
+        with llm_deadline(time.time() + 0.1):
+            limiter.acquire()
+        assert False, "Expected TimeoutError"
+    except TimeoutError:
+        assert limiter.stats()["queued"] == 0
+    finally:
+        limiter.release()
+    assert limiter.stats()["in_flight"] == 0
+    print("✅ Queued call gives up at the deadline")
+    
+    # Research dispatched from the planner's stream runs in a copy of its
+    # context; a research call that times out while queued leaves the
+    # planner's slot alone
+    from src.agents.concurrency import detached_context
+    limiter = AdaptiveConcurrencyLimiter("deadline-test", initial=1)
+    research = FakeChatModel(first_token_s=0, per_token_s=0, rate_limiter=limiter, callbacks=[limiter.release_handler])
+    
+    def research_call():
+        with llm_deadline(time.time() + 0.05):
+            research.invoke("research")
+    
+    planner = FakeChatModel(first_token_s=0, per_token_s=0, rate_limiter=limiter, callbacks=[limiter.release_handler])
+    for i, _ in enumerate(planner.stream("plan")):
+        if i == 0:
+            try:
+                detached_context().run(research_call)
+                assert False, "Expected TimeoutError"
+            except TimeoutError:
+                pass
+            assert limiter.stats()["in_flight"] == 1 and limiter.stats()["errors"] == 0
+    assert limiter.stats()["in_flight"] == 0 and limiter.stats()["queued"] == 0
+    print("✅ Timed-out research call did not release the planner's slot")
+    
+    request = httpx.Request("POST", "http://llm.invalid/v1/chat/completions", extensions={
+        "timeout": httpx.Timeout(60.0).as_dict()
+    })
+    with llm_deadline(time.time() + 2):
+        HTTPPool("deadline-test", http2=False)._on_request(request)
+    assert all(0 < value <= 2 for value in request.extensions["timeout"].values())
+    print("✅ Pooled requests time out at the deadline")
+    
+    state = create_mock_state()
+    recommendation = ScoringEngine.build_fallback_recommendation(
+        state.decision_input.decision, state.risk_output, state.opportunity_output
+    )
+    expected = ScoringEngine.get_recommendation_category(
+        recommendation.overall_risk_score, recommendation.overall_opportunity_score
+    )
+    assert recommendation.recommendation == expected
+    assert 3 <= len(recommendation.key_insights) <= 5 and recommendation.next_steps
+    print(f"✅ Fallback recommendation: {recommendation.recommendation} ({recommendation.confidence_level:.0%} confidence)")
+    
+    return True
+
+
+def test_singleflight():
+    """Test concurrent identical calls share one execution."""
+    print("\n🧪 Testing Singleflight...")
+    
+    import threading
+    import time
+    from src.utils import SingleFlight
+    
+    flights = SingleFlight()
+    executions = []
+    results = []
+    
+    def work():
+        executions.append(1)
+        time.sleep(0.2)
+        return {"recommendation": "Proceed"}
+    
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("same-decision", work)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(executions) == 1
+    assert len(results) == 5 and all(value == {"recommendation": "Proceed"} for value, _ in results)
+    assert sum(shared for _, shared in results) == 4
+    print(f"✅ 5 concurrent calls, 1 execution: {flights.stats()}")
+    
+    # Finished keys are forgotten, so a later call runs again
+    flights.do("same-decision", work)
+    assert len(executions) == 2 and flights.stats()["in_flight"] == 0
+    print("✅ Later call executed again")
+    
+    return True
+
+
+def test_idempotency_store():
+    """Test Idempotency-Key claims, replays and expiry."""
+    print("\n🧪 Testing Idempotency Store...")
+    
+    from src.api.idempotency import IdempotencyStore, NEW, IN_PROGRESS, COMPLETED, MISMATCH
+    
+    store = IdempotencyStore(os.path.join(tempfile.mkdtemp(), "idempotency.db"), ttl_seconds=60)
+    
+    # The first request claims the key; a retry sees it running
+    assert store.begin(1, "key-1", "body-a") == (NEW, None)
+    assert store.begin(1, "key-1", "body-a") == (IN_PROGRESS, None)
+    assert store.begin(1, "key-1", "body-b") == (MISMATCH, None)
+    assert store.begin(2, "key-1", "body-a") == (NEW, None)
+    print("✅ Key claimed once per user")
+    
+    store.complete(1, "key-1", 201, {"id": 7}, {"X-Run-Id": "abc"})
+    outcome, record = store.begin(1, "key-1", "body-a")
+    assert outcome == COMPLETED
+    assert record == {"status_code": 201, "response": {"id": 7}, "headers": {"X-Run-Id": "abc"}}
+    print("✅ Retry replays the stored response")
+    
+    # Server errors are retried rather than replayed
+    store.begin(1, "key-2", "body-a")
+    store.complete(1, "key-2", 500, {"detail": "Analysis failed"})
+    assert store.get(1, "key-2")["status_code"] == 500
+    assert store.begin(1, "key-2", "body-a") == (NEW, None)
+    print("✅ Stored server error re-executes")
+    
+    # Expired records are dropped
+    store.ttl_seconds = -1
+    assert store.begin(1, "key-1", "body-b") == (NEW, None)
+    assert store.size() == 1
+    print("✅ Expired keys dropped")
+    
+    return True
+
+
+def test_rate_limiter():
+    """Test provider request/token buckets and 429 back-off."""
+    print("\n🧪 Testing Rate Limiter...")
+    
+    import time
+    from src.agents.rate_limit import (
+        ProviderRateLimiter, MemoryBucketBackend, SQLiteBucketBackend, retry_after
+    )
+    
+    path = os.path.join(tempfile.mkdtemp(), "rate_limits.db")
+    for backend in (MemoryBucketBackend(), SQLiteBucketBackend(path)):
+        # 3 requests per minute: a burst of 3, then wait
+        limiter = ProviderRateLimiter("groq", backend, requests_per_minute=3, tokens_per_minute=6000)
+        assert all(limiter.acquire(blocking=False) for _ in range(3))
+        assert not limiter.acquire(blocking=False)
+        
+        # Token debt holds back calls until it is repaid
+        limiter = ProviderRateLimiter("openai", backend, requests_per_minute=600, tokens_per_minute=6000)
+        assert limiter.acquire(blocking=False)
+        limiter.charge_tokens(6010)
+        assert not limiter.acquire(blocking=False)
+        started = time.time()
+        assert limiter.acquire()
+        assert 0.05 <= time.time() - started < 1.0
+        print(f"✅ {backend.name}: request and token buckets pace calls")
+    
+    # A second process sees the same SQLite buckets
+    shared = ProviderRateLimiter("groq", SQLiteBucketBackend(path), requests_per_minute=3)
+    assert not shared.acquire(blocking=False)
+    print("✅ SQLite buckets shared across limiters")
+    
+    # 429s back off for the provider's retry-after time
+    assert retry_after(Exception("Error code: 429 - Please try again in 1m2.5s.")) == 62.5
+    assert retry_after(Exception("Rate limit exceeded")) == 10.0
+    assert retry_after(Exception("Connection refused")) is None
+    limiter = ProviderRateLimiter("ollama", MemoryBucketBackend(), tokens_per_minute=6000)
+    limiter.back_off(0.2)
+    limiter.back_off(0.1)
+    assert not limiter.acquire(blocking=False)
+    started = time.time()
+    assert limiter.acquire()
+    assert 0.1 <= time.time() - started < 0.5
+    assert limiter.stats()["throttled"] == 2
+    print(f"✅ Back-off after 429: {limiter.stats()}")
+    
+    return True
+
+
+def test_adaptive_concurrency():
+    """Test AIMD concurrency limit on LLM calls."""
+    print("\n🧪 Testing Adaptive Concurrency...")
+    
+    import itertools
+    import threading
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from src.agents.concurrency import AdaptiveConcurrencyLimiter
+    
+    limiter = AdaptiveConcurrencyLimiter("fake", initial=1, max_limit=4)
+    model = GenericFakeChatModel(
+        messages=itertools.repeat(AIMessage(content="ok")),
+        rate_limiter=limiter,
+        callbacks=[limiter.release_handler]
+    )
+    
+    # Healthy calls that use the whole limit raise it additively; one call
+    # at a time never fills a limit of 2, so it stops there
+    for _ in range(4):
+        model.invoke("hello")
+    assert limiter.limit == 2 and limiter.increases == 1 and limiter.in_flight == 0
+    assert limiter.stats()["latency_seconds"] is not None
+    print(f"✅ Additive increase: {limiter.stats()}")
+    
+    # The limit caps concurrent calls
+    limiter = AdaptiveConcurrencyLimiter("fake", initial=2)
+    slots = []
+    
+    def hold_slot():
+        limiter.acquire()
+        slots.append(1)
+        barrier.wait()
+        limiter.release(RuntimeError("Error code: 429 - Rate limit reached"))
+    
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=hold_slot) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(slots) == 2
+    
+    # Both 429s come from the same window: halved once
+    assert limiter.limit == 1 and limiter.decreases == 1 and limiter.in_flight == 0
+    print("✅ 429s halve the limit once per window")
+    
+    assert limiter.acquire(blocking=False)
+    assert not limiter.acquire(blocking=False)
+    limiter.release(TimeoutError("Request timed out"))
+    assert limiter.limit == 1 and limiter.decreases == 2
+    print("✅ Limit holds at its minimum")
+    
+    return True
+
+
+def test_llm_scheduler():
+    """Test priority classes, per-user fairness and aging of queued LLM calls."""
+    print("\n🧪 Testing LLM Scheduler...")
+    
+    import threading
+    import time
+    from src.agents.concurrency import AdaptiveConcurrencyLimiter
+    from src.agents.scheduler import (
+        FairQueue, llm_priority, current_priority, INTERACTIVE_CHAT, INTERACTIVE_ANALYSIS, BATCH
+    )
+    from src.workflow.deadline import call_with_deadline
+    
+    limiter = AdaptiveConcurrencyLimiter("fake", initial=1, max_limit=1)
+    order = []
+    
+    def call(name, priority, user_id):
+        with llm_priority(priority, user_id):
+            limiter.acquire()
+            order.append(name)
+            limiter.release()
+    
+    # One call holds the only slot while the others queue up
+    limiter.acquire()
+    threads = []
+    for name, priority, user_id in (
+        ("batch", BATCH, 1),
+        ("analysis-1", INTERACTIVE_ANALYSIS, 1),
+        ("analysis-2", INTERACTIVE_ANALYSIS, 2),
+        ("chat-1", INTERACTIVE_CHAT, 1),
+    ):
+        threads.append(threading.Thread(target=call, args=(name, priority, user_id)))
+        threads[-1].start()
+        time.sleep(0.05)
+    assert limiter.stats()["queued"] == 4
+    limiter.release()
+    for thread in threads:
+        thread.join()
+    
+    # Chat first; user 2 goes before user 1, who was just served
+    assert order == ["chat-1", "analysis-2", "analysis-1", "batch"], order
+    assert limiter.stats()["served_by_priority"]["interactive_analysis"] == 2
+    print(f"✅ Served by priority, then fairly per user: {order}")
+    
+    # Waiting long enough promotes a call past newer interactive ones
+    queue = FairQueue(aging_seconds=0.05)
+    queue.push(BATCH, 1)
+    time.sleep(0.12)
+    queue.push(INTERACTIVE_CHAT, 2)
+    assert queue.pop().priority == BATCH and queue.promoted == 1
+    print("✅ Starved batch call promoted")
+    
+    # Workflow threads keep the caller's priority
+    with llm_priority(INTERACTIVE_CHAT, 7):
+        assert call_with_deadline(time.time() + 5, current_priority) == (INTERACTIVE_CHAT, 7)
+    assert current_priority() == (BATCH, None)
+    print("✅ Priority propagates to deadline threads")
+    
+    return True
+
+
+def test_fake_provider():
+    """Test the offline fake LLM provider and the real graph on top of it."""
+    print("\n🧪 Testing Fake LLM Provider...")
+    
+    from config import settings
+    from src.agents.fake_llm import FakeChatModel, FakeProviderError
+    from src.agents.rate_limit import retry_after
+    from src.schemas import DecisionInput, RiskOutput
+    from src.workflow import DecisionWorkflowRunner
+    
+    model = FakeChatModel(factors=3, first_token_s=0, per_token_s=0)
+    risk = model.with_structured_output(RiskOutput).invoke("Score the risks")
+    assert isinstance(risk, RiskOutput) and len(risk.risk_scores) == 3
+    
+    chunks = list(model.stream(f"Answer as JSON: {RiskOutput.model_json_schema()}"))
+    assert RiskOutput.model_validate_json("".join(c.content for c in chunks))
+    assert sum(c.usage_metadata["total_tokens"] for c in chunks if c.usage_metadata) > 0
+    print("✅ Structured output and streamed JSON are schema-valid")
+    
+    # Same seed, same latencies and failures
+    draws = [
+        [FakeChatModel(seed=seed, latency_distribution="lognormal")._time_to_first_token(0) for _ in range(3)]
+        for seed in (1, 1, 2)
+    ]
+    assert draws[0] == draws[1] != draws[2]
+    try:
+        FakeChatModel(first_token_s=0, per_token_s=0, rate_limit_rate=1.0).invoke("hello")
+        assert False, "Expected an injected 429"
+    except FakeProviderError as e:
+        assert retry_after(e) == 1.0
+    print("✅ Deterministic latency and 429 injection")
+    
+    # The real graph, offline
+    saved = (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+             settings.CHECKPOINTS_ENABLED)
+    settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN = "fake", 0.0, 0.0
+    settings.CHECKPOINTS_ENABLED = False
+    try:
+        state = DecisionWorkflowRunner().run(
+            DecisionInput(decision="Should I move abroad for a new job?")
+        )
+    finally:
+        (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+         settings.CHECKPOINTS_ENABLED) = saved
+    
+    assert state.error is None and state.recommendation is not None
+    assert len(state.risk_output.risk_scores) == settings.FAKE_LLM_FACTORS
+    print(f"✅ Full workflow offline: {state.recommendation.recommendation}")
+    
+    return True
+
+
+def test_cassette():
+    """Test recording LLM calls to a cassette and replaying them offline."""
+    print("\n🧪 Testing LLM Cassette...")
+    
+    from src.agents.cassette import Cassette, CassetteMiss, CassetteRecorder, RecordingGate, ReplayChatModel
+    from src.agents.fake_llm import FakeChatModel
+    from src.schemas import RiskOutput
+    
+    cassette = Cassette(os.path.join(tempfile.mkdtemp(), "cassette.db"))
+    recorder = CassetteRecorder(cassette, "fake", "fake")
+    model = FakeChatModel(
+        factors=3, first_token_s=0.05, per_token_s=0, rate_limiter=RecordingGate(), callbacks=[recorder]
+    )
+    
+    recorded = model.with_structured_output(RiskOutput).invoke("Score the risks")
+    streamed = "".join(c.content for c in model.stream("question: What should I do?"))
+    assert cassette.stats()["interactions"] == 2
+    print("✅ Structured and streamed calls recorded")
+    
+    replay = ReplayChatModel(cassette=cassette, latency_scale=0)
+    assert replay.with_structured_output(RiskOutput).invoke("Score the risks") == recorded
+    chunks = list(replay.stream("question: What should I do?"))
+    assert "".join(c.content for c in chunks) == streamed
+    assert any(c.usage_metadata for c in chunks)
+    print("✅ Replay returns the recorded answers")
+    
+    try:
+        replay.invoke("A prompt that was never recorded")
+        assert False, "Expected a cassette miss"
+    except CassetteMiss:
+        pass
+    assert cassette.stats()["hits"] == 2 and cassette.stats()["misses"] == 1
+    print("✅ Unrecorded prompts miss")
+    
+    # Replayed latency times out at the call's deadline like the fake provider
+    import time
+    from src.agents.scheduler import llm_deadline
+    
+    slow = ReplayChatModel(cassette=cassette, latency_scale=100)
+    started = time.time()
+    try:
+        with llm_deadline(time.time() + 0.2):
+            slow.with_structured_output(RiskOutput).invoke("Score the risks")
+        assert False, "Expected TimeoutError"
+    except TimeoutError:
+        assert time.time() - started < 1.0
+    print("✅ Replayed calls time out at the deadline")
+    
+    return True
+
+
+def test_usage_ledger():
+    """Test per-agent LLM usage accounting and daily quotas."""
+    print("\n🧪 Testing Usage Ledger...")
+    
+    from config import settings
+    from src.auth.database import init_db
+    from src.agents.fake_llm import FakeChatModel
+    from src.agents.ledger import LedgerHandler, call_cost, record_cache_hit
+    from src.agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
+    from src.history import HistoryManager
+    from src.history.usage import QuotaExceeded
+    from src.schemas import RiskOutput
+    
+    saved = (settings.DATABASE_URL, settings.USER_DAILY_TOKEN_QUOTA, settings.USAGE_LEDGER)
+    settings.USAGE_LEDGER = True
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'usage.db')}"
+    try:
+        init_db()
+        model = FakeChatModel(
+            model_name="gpt-4o-mini", factors=3, first_token_s=0, per_token_s=0, callbacks=[LedgerHandler("fake")]
+        )
+        model.with_structured_output(RiskOutput).invoke(
+            "Score the risks", config={"metadata": {"agent": "risk", "user_id": 7}}
+        )
+        model.invoke("question: Why?", config={"metadata": {"agent": "chat", "user_id": 7}})
+        model.invoke("question: Why not?", config={"metadata": {"agent": "chat", "user_id": 8}})
+        
+        usage = HistoryManager.get_usage_summary(7)
+        assert sorted(usage["key"]) == ["chat", "risk"]
+        assert usage["totals"]["calls"] == 2 and usage["totals"]["input_tokens"] > 0
+        risk = usage["key"].index("risk")
+        assert usage["cost"][risk] == round(
+            call_cost("gpt-4o-mini", usage["input_tokens"][risk], usage["output_tokens"][risk]), 6
+        )
+        print(f"✅ Calls attributed per user and agent: {dict(zip(usage['key'], usage['cost']))}")
+        
+        # Cache hits are recorded against the agent's own provider and model
+        with llm_priority(INTERACTIVE_ANALYSIS, 9):
+            record_cache_hit("planner", model)
+        hits = HistoryManager.get_usage_summary(9, group_by="model")
+        assert hits["key"] == ["gpt-4o-mini"] != [settings.MODEL_NAME]
+        assert hits["cache_hits"] == [1] and hits["totals"]["calls"] == 0
+        print("✅ Cache hit recorded for the agent's model")
+        
+        # The quota blocks new work once today's tokens reach it
+        settings.USER_DAILY_TOKEN_QUOTA = usage["totals"]["input_tokens"] + usage["totals"]["output_tokens"]
+        try:
+            HistoryManager.check_usage_quota(7)
+            assert False, "Expected the token quota to be used up"
+        except QuotaExceeded as e:
+            assert 0 < e.retry_after <= 86400
+        assert HistoryManager.check_usage_quota(8)["tokens_used"] < settings.USER_DAILY_TOKEN_QUOTA
+        print("✅ Daily token quota enforced per user")
+    finally:
+        settings.DATABASE_URL, settings.USER_DAILY_TOKEN_QUOTA, settings.USAGE_LEDGER = saved
+    
+    return True
+
+
+def test_prompt_budget():
+    """Test fitting downstream agent prompts to a token budget."""
+    print("\n🧪 Testing Prompt Budget...")
+    
+    from langchain_core.prompts import ChatPromptTemplate
+    from src.agents.prompt_budget import PromptBudget, allocate, compact, count_tokens
+    
+    sentence = "Salaries in research roles start lower but grow faster after a few years."
+    assert count_tokens(sentence) == count_tokens(sentence) > 0
+    
+    short = compact(" ".join([sentence] * 10), 40)
+    assert short.endswith("…") and short.startswith(sentence) and count_tokens(short) <= 40
+    assert compact(sentence, 100) == sentence
+    print(f"✅ Compaction keeps whole sentences: {count_tokens(short)} tokens")
+    
+    assert allocate([10, 500, 20], 130) == [10, 100, 20]
+    print("✅ Short texts keep their full size")
+    
+    prompt = ChatPromptTemplate.from_messages([("human", "Decision: {decision}\n\nResearch:\n{research}")])
+    budget = PromptBudget()
+    fitted = budget.fit(
+        "risk", prompt, 200, {"decision": "Change careers?"},
+        {"research": [("- Salary: ", sentence), ("- Growth: ", " ".join([sentence] * 30))]}
+    )
+    assert count_tokens(prompt.format(**fitted)) <= 200
+    assert fitted["research"].startswith(f"- Salary: {sentence}\n- Growth: ")
+    stats = budget.stats()["risk"]
+    assert stats["compacted"] == 1 and stats["avg_tokens_after"] < stats["avg_tokens_before"]
+    print(f"✅ Prompt fitted to budget: {stats['avg_tokens_before']:.0f} → {stats['avg_tokens_after']:.0f} tokens")
+    
+    return True
+
+
+def test_json_repair():
+    """Test repairing malformed fallback JSON and re-asking for missing fields."""
+    print("\n🧪 Testing JSON Repair...")
+    
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from config import settings
+    from src.agents.json_repair import coerce_scores, repair_json
+    from src.agents.risk import RiskAgent
+    from src.schemas import RiskOutput
+    
+    assert repair_json('```json\n{"a": [1, 2,], "b": {"c": "x",},}\n```') == {"a": [1, 2], "b": {"c": "x"}}
+    assert repair_json('Sure! {"a": 1, "b": [{"x": 1}, {"x": 2, "y": "cut o') == {
+        "a": 1, "b": [{"x": 1}, {"x": 2, "y": "cut o"}]
+    }
+    assert repair_json('{"a": 1, "b": 7') == {"a": 1}
+    print("✅ Fences, trailing commas and truncation repaired")
+    
+    data = coerce_scores(repair_json(
+        '{"risk_scores": [{"factor_name": "Salary", "score": 7/10, "reasoning": "r", "severity": "high"},'
+        ' {"factor_name": "Growth", "score": "12", "reasoning": "r", "severity": "low"}],'
+        ' "overall_risk_level": "65%", "risk_summary": "s"}'
+    ), RiskOutput)
+    output = RiskOutput.model_validate(data)
+    assert [r.score for r in output.risk_scores] == [7.0, 10.0] and output.overall_risk_level == 6.5
+    print("✅ Score strings coerced and clamped")
+    
+    saved = settings.LLM_PROVIDER
+    settings.LLM_PROVIDER = "fake"
+    try:
+        agent = RiskAgent()
+    finally:
+        settings.LLM_PROVIDER = saved
+    agent.llm = FakeListChatModel(responses=[
+        '{"risk_scores": [{"factor_name": "Salary", "score": "6", "reasoning": "Lower pay at first", "sev',
+        '{"risk_scores.0.severity": "medium", "overall_risk_level": 6, "risk_summary": "Moderate"}'
+    ])
+    output = agent._invoke(agent.get_prompt(), RiskOutput, {"decision": "d", "factors": "f", "research": "r"})
+    assert output.risk_scores[0].severity == "medium" and output.risk_summary == "Moderate"
+    assert output.risk_scores[0].reasoning == "Lower pay at first"
+    print("✅ Missing fields filled by a targeted re-ask")
+    
+    return True
+
+
+def test_ollama_structured_output():
+    """Test schema-constrained Ollama output against a local stub server."""
+    print("\n🧪 Testing Ollama Structured Output...")
+    
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from config import settings
+    from src.agents import ollama
+    from src.agents.ollama import ConstrainedChatOllama, model_capabilities
+    from src.agents.risk import RiskAgent
+    from src.schemas import RiskOutput
+    
+    versions = {"new": "0.5.7", "old": "0.4.0", "broken": None}
+    requests = []
+    probes = []
+    answer = {
+        "risk_scores": [{"factor_name": "Salary", "score": 6, "reasoning": "Lower pay", "severity": "medium"}],
+        "overall_risk_level": 6,
+        "risk_summary": "Moderate"
+    }
+    
+    class StubOllama(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def _reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            probes.append(self.server.version)
+            if self.server.version == "broken":
+                self.send_response(200)
+                self.send_header("Content-Length", "4")
+                self.end_headers()
+                self.wfile.write(b"oops")
+                return
+            self._reply({"version": versions[self.server.version]})
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/api/show":
+                return self._reply({"capabilities": ["completion"]})
+            requests.append(body)
+            self._reply({
+                "model": body["model"], "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": json.dumps(answer)},
+                "done": True, "done_reason": "stop", "prompt_eval_count": 10, "eval_count": 20
+            })
+    
+    servers = []
+    for version in versions:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+        server.version = version
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    
+    try:
+        saved = settings.LLM_PROVIDER
+        settings.LLM_PROVIDER = "fake"
+        try:
+            agent = RiskAgent()
+        finally:
+            settings.LLM_PROVIDER = saved
+        kwargs = {"decision": "Change careers?", "factors": "- Salary", "research": "- Salary: lower at first"}
+        
+        new_url = f"http://127.0.0.1:{servers[0].server_port}"
+        assert model_capabilities(new_url, "llama3.2")["structured_output"]
+        agent.llm = ConstrainedChatOllama(model="llama3.2", base_url=new_url)
+        output = agent._invoke(agent.get_prompt(), RiskOutput, kwargs)
+        assert isinstance(output, RiskOutput) and output.risk_summary == "Moderate"
+        assert requests[-1]["format"]["title"] == "RiskOutput"
+        assert "IMPORTANT" not in requests[-1]["messages"][-1]["content"]
+        print("✅ Schema passed as format on Ollama 0.5+")
+        
+        old_url = f"http://127.0.0.1:{servers[1].server_port}"
+        assert not model_capabilities(old_url, "llama2")["structured_output"]
+        agent.llm = ConstrainedChatOllama(model="llama2", base_url=old_url)
+        output = agent._invoke(agent.get_prompt(), RiskOutput, kwargs)
+        assert output.risk_summary == "Moderate"
+        assert requests[-1]["format"] == "json" and "IMPORTANT" in requests[-1]["messages"][-1]["content"]
+        print("✅ Older servers fall back to JSON mode with the schema in the prompt")
+        
+        # A failed detection is remembered for a while instead of probing on every call
+        broken_url = f"http://127.0.0.1:{servers[2].server_port}"
+        assert model_capabilities(broken_url, "llama3.2") == model_capabilities(broken_url, "llama3.2")
+        assert model_capabilities(broken_url, "llama3.2")["detected"] is False
+        assert probes.count("broken") == 1
+        ollama._capabilities[(broken_url, "llama3.2")]["retry_at"] = 0
+        model_capabilities(broken_url, "llama3.2")
+        assert probes.count("broken") == 2
+        print("✅ Unreachable detection cached until its retry time")
+    finally:
+        for server in servers:
+            server.shutdown()
+    
+    return True
+
+
+def test_model_warmup():
+    """Test keeping Ollama models loaded against a local stub server."""
+    print("\n🧪 Testing Model Warm-up...")
+    
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from src.agents.ollama import WarmupManager
+    
+    loaded = {}
+    loads = []
+    
+    class StubOllama(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def _reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            self._reply({"models": [{"name": name, "expires_at": expires} for name, expires in loaded.items()]})
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            loads.append(body)
+            loaded[f"{body['model']}:latest"] = "2024-01-01T00:30:00Z"
+            self._reply({"model": body["model"], "response": "", "done": True, "done_reason": "load"})
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    
+    try:
+        manager = WarmupManager(base_url, ["llama3.2", "qwen2.5", "llama3.2"], interval=60)
+        assert not manager.stats()["ready"]
+        manager.refresh()
+        stats = manager.stats()
+        assert stats["ready"] and len(loads) == 2 and loads[0]["keep_alive"] == "30m"
+        assert stats["models"]["llama3.2"]["warmup_seconds"] is not None
+        print("✅ Configured models loaded with keep-alive")
+        
+        manager.refresh()
+        assert len(loads) == 2
+        del loaded["qwen2.5:latest"]
+        manager.refresh()
+        assert len(loads) == 3 and loads[-1]["model"] == "qwen2.5" and manager.stats()["ready"]
+        print("✅ Only unloaded models are reloaded")
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    manager.refresh()
+    stats = manager.stats()
+    assert not stats["ready"] and stats["models"]["llama3.2"]["error"]
+    print("✅ Unreachable server reported as not ready")
+    
+    # API analyses run on the models the warm-up keeps loaded
+    from config import settings
+    from src.agents import ollama
+    from src.api.main import workflow_runner
+    
+    saved = (settings.LLM_PROVIDER, settings.OLLAMA_WARMUP)
+    try:
+        settings.LLM_PROVIDER = "fake"
+        models = {workflow_runner().model_name, workflow_runner(quick=True).model_name}
+        settings.LLM_PROVIDER, settings.OLLAMA_WARMUP = "ollama", True
+        ollama._warmup = None
+        assert models <= set(ollama.get_warmup_manager().models)
+    finally:
+        ollama._warmup = None
+        settings.LLM_PROVIDER, settings.OLLAMA_WARMUP = saved
+    print(f"✅ API runners use the warmed model {settings.MODEL_NAME}")
+    
+    return True
+
+
+def test_http_pool():
+    """Test chat models sharing one pooled HTTP client per provider."""
+    print("\n🧪 Testing HTTP Pool...")
+    
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from langchain_groq import ChatGroq
+    from config import settings
+    from src.agents.http_pool import HTTPPool, get_http_pool
+    from src.agents.ollama import ConstrainedChatOllama
+    
+    connections = []
+    
+    class StubProvider(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        
+        def log_message(self, *args):
+            pass
+        
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/api/chat":
+                reply = {"model": body["model"], "created_at": "2024-01-01T00:00:00Z",
+                         "message": {"role": "assistant", "content": "OK"}, "done": True, "done_reason": "stop"}
+            else:
+                reply = {"id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "message": {"role": "assistant", "content": "OK"},
+                                      "finish_reason": "stop"}]}
+            data = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProvider)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    
+    try:
+        pool = HTTPPool("groq", http2=False)
+        for _ in range(3):
+            ChatGroq(model="stub", api_key="stub", base_url=url, **pool.chat_model_kwargs()).invoke("Hello")
+        assert len(connections) == 1 and pool.stats()["requests"] == 3
+        assert pool.stats()["idle_connections"] == 1
+        print("✅ Groq models reuse one connection")
+        
+        pool = HTTPPool("ollama", http2=False)
+        for _ in range(3):
+            ConstrainedChatOllama(model="stub", base_url=url, **pool.chat_model_kwargs()).invoke("Hello")
+        assert len(connections) == 2 and pool.stats()["requests"] == 3
+        print("✅ Ollama models reuse one connection")
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    saved = settings.LLM_HTTP_POOL
+    try:
+        assert get_http_pool("fake") is None
+        settings.LLM_HTTP_POOL = False
+        assert get_http_pool("groq") is None
+    finally:
+        settings.LLM_HTTP_POOL = saved
+    assert get_http_pool("groq") is get_http_pool("groq")
+    print("✅ One pool per HTTP provider")
+    
+    return True
+
+
+def test_async_history_manager():
+    """Test async CRUD through the query layer shared with HistoryManager."""
+    print("\n🧪 Testing Async History Manager...")
+    
+    import asyncio
+    from src.auth.database import get_session
+    from src.history.async_history_manager import AsyncHistoryManager
+    
+    user_id = _get_test_user_id("rollupuser", "rollup@example.com")
+    
+    async def crud():
+        before = await AsyncHistoryManager.get_analytics_summary(user_id)
+        decision_id = await AsyncHistoryManager.save_decision(user_id, create_mock_state(), tags=["async"])
+        
+        decision = await AsyncHistoryManager.get_decision_by_id(decision_id)
+        assert decision['decision_text'] == create_mock_state().decision_input.decision
+        assert "async" in await AsyncHistoryManager.get_all_tags(user_id)
+        history = await AsyncHistoryManager.get_user_history(user_id, tags=["async"])
+        assert decision_id in [d['id'] for d in history]
+        
+        # The sync manager reads what the async one wrote
+        assert HistoryManager.get_decision_by_id(decision_id)['id'] == decision_id
+        after_save = await AsyncHistoryManager.get_analytics_summary(user_id)
+        assert after_save['total_decisions'] == before['total_decisions'] + 1
+        print(f"✅ Saved and read decision {decision_id} asynchronously")
+        
+        assert not await AsyncHistoryManager.delete_decision(decision_id, user_id + 1000)
+        assert await AsyncHistoryManager.delete_decision(decision_id, user_id)
+        assert await AsyncHistoryManager.get_decision_by_id(decision_id) is None
+        after_delete = await AsyncHistoryManager.get_analytics_summary(user_id)
+        assert after_delete['total_decisions'] == before['total_decisions']
+        print("✅ Deleted only by its owner, rollup updated")
+    
+    asyncio.run(crud())
+    
+    # Sync sessions share one engine and its connection pool
+    first, second = get_session(), get_session()
+    try:
+        assert first.get_bind() is second.get_bind()
+    finally:
+        first.close()
+        second.close()
+    print("✅ Sync sessions share one engine")
+    
+    return True
+
+
+def test_scoring_modes():
+    """Test separate and combined scoring, and the combined fallback, offline."""
+    print("\n🧪 Testing Scoring Modes...")
+    
+    import time
+    from config import settings
+    from src.agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
+    from src.workflow import DecisionWorkflowRunner
+    
+    saved = (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+             settings.CHECKPOINTS_ENABLED, settings.DATABASE_URL, settings.USAGE_LEDGER)
+    settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN = "fake", 0.0, 0.0
+    settings.CHECKPOINTS_ENABLED, settings.USAGE_LEDGER = False, True
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scoring.db')}"
+    
+    def analyze(user_id, scoring_mode, deadline=None):
+        """Run the graph for a user; returns the state and the agents the ledger saw."""
+        with llm_priority(INTERACTIVE_ANALYSIS, user_id):
+            state = DecisionWorkflowRunner(scoring_mode=scoring_mode).run(
+                DecisionInput(decision="Should I move abroad for a new job?"), deadline=deadline
+            )
+        assert state.error is None and state.recommendation is not None
+        assert len(state.risk_output.risk_scores) == len(state.opportunity_output.opportunity_scores) > 0
+        return state, set(HistoryManager.get_usage_summary(user_id)["key"])
+    
+    try:
+        init_db()
+        
+        state, agents = analyze(1, "separate")
+        assert {"risk", "opportunity"} <= agents and "risk_opportunity" not in agents
+        assert not state.degradations
+        print(f"✅ Separate scoring: {sorted(agents)}")
+        
+        state, agents = analyze(2, "combined")
+        assert "risk_opportunity" in agents and not agents & {"risk", "opportunity"}
+        print(f"✅ Combined scoring: {sorted(agents)}")
+        
+        # Too little time left for two scoring calls: separate mode scores in one
+        state, agents = analyze(3, "separate", deadline=time.time() + 40)
+        assert "risk_opportunity" in agents and not agents & {"risk", "opportunity"}
+        assert any("scored in one call" in d for d in state.degradations)
+        print(f"✅ Fallback to combined scoring: {state.degradations}")
+        
+        try:
+            DecisionWorkflowRunner(scoring_mode="parallel")
+            assert False, "Expected an unsupported scoring mode to be rejected"
+        except ValueError:
+            pass
+    finally:
+        (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+         settings.CHECKPOINTS_ENABLED, settings.DATABASE_URL, settings.USAGE_LEDGER) = saved
+    
+    return True
+
+
+def test_quick_mode():
+    """Test the quick workflow offline and upgrading its result to a full analysis."""
+    print("\n🧪 Testing Quick Mode...")
+    
+    from config import settings
+    from src.agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
+    from src.workflow import DecisionWorkflowRunner
+    
+    saved = (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+             settings.CHECKPOINTS_ENABLED, settings.DATABASE_URL, settings.USAGE_LEDGER)
+    settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN = "fake", 0.0, 0.0
+    settings.CHECKPOINTS_ENABLED, settings.USAGE_LEDGER = False, True
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'quick.db')}"
+    try:
+        init_db()
+        decision_input = DecisionInput(decision="Should I take a sabbatical to travel?", timeframe="6 months")
+        
+        progress = []
+        with llm_priority(INTERACTIVE_ANALYSIS, 1):
+            quick = DecisionWorkflowRunner(quick=True).run(
+                decision_input, progress_callback=lambda step, percent: progress.append(percent)
+            )
+        assert quick.error is None and quick.analysis_mode == "quick"
+        assert quick.planner_output.factors and quick.research_output.analyses
+        assert quick.risk_output and quick.opportunity_output and quick.recommendation
+        assert progress[-1] == 100
+        usage = HistoryManager.get_usage_summary(1)
+        assert sorted(usage["key"]) == ["quick_planner", "quick_strategist", "risk_opportunity"]
+        assert usage["totals"]["calls"] == 3
+        print(f"✅ Quick analysis in {usage['totals']['calls']} calls: {quick.recommendation.recommendation}")
+        
+        # Upgrading keeps the quick run's factors and skips the planner
+        with llm_priority(INTERACTIVE_ANALYSIS, 2):
+            full = DecisionWorkflowRunner(quick=True).upgrade(quick)
+        assert full.error is None and full.analysis_mode == "full"
+        assert full.planner_output.factors == quick.planner_output.factors
+        assert full.decision_input == quick.decision_input
+        agents = set(HistoryManager.get_usage_summary(2)["key"])
+        assert "planner" not in agents and "quick_planner" not in agents and "strategist" in agents
+        print(f"✅ Upgraded to a full analysis with the same {len(full.planner_output.factors)} factors")
+    finally:
+        (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+         settings.CHECKPOINTS_ENABLED, settings.DATABASE_URL, settings.USAGE_LEDGER) = saved
+    
+    return True
+
+
+def test_checkpoint_resume():
+    """Test resuming a failed run from its checkpoints, offline and through the API."""
+    print("\n🧪 Testing Checkpoint Resume...")
+    
+    from fastapi.testclient import TestClient
+    from config import settings
+    from src.agents.planner import PlannerAgent
+    from src.agents.research import ResearchAgent
+    from src.agents.risk import RiskAgent
+    from src.api.main import app, create_access_token
+    from src.workflow import DecisionWorkflowRunner
+    from src.workflow.checkpoints import run_metadata
+    
+    owner = _get_test_user_id("resumeuser", "resume@example.com")
+    other = _get_test_user_id("otheruser", "other@example.com")
+    
+    saved = (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+             settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES)
+    settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN = "fake", 0.0, 0.0
+    settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES = True, False
+    originals = (PlannerAgent.run, ResearchAgent.run, RiskAgent.run)
+    
+    def provider_down(self, **kwargs):
+        raise RuntimeError("provider down")
+    
+    def not_again(self, **kwargs):
+        raise AssertionError(f"{self.name} ran again after it had succeeded")
+    
+    try:
+        # Risk fails after planner and research succeeded
+        RiskAgent.run = provider_down
+        failed = DecisionWorkflowRunner(pipeline_research=False).run(
+            DecisionInput(decision="Should I open a bakery?"),
+            metadata={"user_id": owner, "tags": "resume"}
+        )
+        RiskAgent.run = originals[2]
+        assert failed.error and failed.error.startswith("Risk error")
+        assert failed.planner_output and failed.research_output
+        assert run_metadata(failed.run_id)["user_id"] == owner
+        print(f"✅ Failed run {failed.run_id[:8]} kept its checkpoints")
+        
+        client = TestClient(app)
+        url = f"/api/v1/runs/{failed.run_id}/resume"
+        response = client.post(url, headers={"Authorization": f"Bearer {create_access_token({'user_id': other})}"})
+        assert response.status_code == 404
+        assert run_metadata(failed.run_id) is not None
+        print("✅ Another user cannot resume the run")
+        
+        # The owner resumes from the last good snapshot; completed nodes are not run again
+        PlannerAgent.run = ResearchAgent.run = not_again
+        response = client.post(url, headers={"Authorization": f"Bearer {create_access_token({'user_id': owner})}"})
+        assert response.status_code == 201, response.text
+        body = response.json()
+        assert body["resumed"] is True and body["recommendation"]
+        assert HistoryManager.get_decision_by_id(body["id"])["tags"] == ["resume"]
+        print(f"✅ Resumed from research without repeating planner or research: {body['recommendation']}")
+        
+        assert run_metadata(failed.run_id) is None
+        print("✅ Checkpoints deleted after the resumed run succeeded")
+    finally:
+        PlannerAgent.run, ResearchAgent.run, RiskAgent.run = originals
+        (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+         settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES) = saved
+    
+    return True
+
+
+def test_analysis_coalescing():
+    """Test concurrent identical analyses coalesce per user and time budget only."""
+    print("\n🧪 Testing Analysis Coalescing...")
+    
+    import threading
+    import time
+    from config import settings
+    from src.agents.scheduler import llm_priority, INTERACTIVE_ANALYSIS
+    from src.workflow import DecisionWorkflowRunner
+    from src.workflow.runner import analysis_flights
+    
+    saved = (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+             settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES,
+             settings.DATABASE_URL, settings.USAGE_LEDGER)
+    settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN = "fake", 0.1, 0.0
+    settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES, settings.USAGE_LEDGER = False, True, True
+    settings.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'coalesce.db')}"
+    try:
+        init_db()
+        decision_input = DecisionInput(decision="Should I adopt a dog?")
+        runner = DecisionWorkflowRunner(quick=True)
+        
+        # Two users each send the same analysis twice at the same time
+        users = [1, 1, 2, 2]
+        results = {}
+        barrier = threading.Barrier(len(users))
+        
+        def analyze(slot, user_id):
+            barrier.wait()
+            with llm_priority(INTERACTIVE_ANALYSIS, user_id):
+                results[slot] = runner.run(decision_input, metadata={"user_id": user_id})
+        
+        coalesced = analysis_flights.coalesced
+        threads = [threading.Thread(target=analyze, args=(slot, user)) for slot, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert all(result.error is None for result in results.values())
+        assert analysis_flights.coalesced - coalesced == 2
+        assert results[0].run_id == results[1].run_id and results[2].run_id == results[3].run_id
+        assert results[0].run_id != results[2].run_id
+        print("✅ Each user got one run of their own, shared only with their own duplicate")
+        
+        for user_id in (1, 2):
+            assert HistoryManager.get_usage_summary(user_id)["totals"]["calls"] == 3
+        print("✅ Each user was charged for their own run")
+        
+        # A different time budget is a different analysis
+        now = time.time()
+        assert runner._flight_key(decision_input, None, now + 300) == runner._flight_key(decision_input, None, now + 298)
+        assert runner._flight_key(decision_input, None, now + 300) != runner._flight_key(decision_input, None, now + 30)
+        print("✅ Requests with different timeouts do not coalesce")
+        
+        # Requests that joined one run through the API save it once
+        from fastapi.testclient import TestClient
+        from src.api.main import app, create_access_token
+        
+        user_id = _get_test_user_id("coalesceuser", "coalesce@example.com")
+        headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id})}"}
+        body = {"decision": "Should I learn to play the cello?", "mode": "quick"}
+        responses = []
+        barrier = threading.Barrier(2)
+        
+        def post(client):
+            barrier.wait()
+            responses.append(client.post("/api/v1/decisions/analyze", json=body, headers=headers))
+        
+        coalesced = analysis_flights.coalesced
+        with TestClient(app) as client:
+            threads = [threading.Thread(target=post, args=(client,)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        assert all(response.status_code == 201 for response in responses)
+        assert analysis_flights.coalesced - coalesced == 1
+        assert responses[0].json()["id"] == responses[1].json()["id"]
+        assert len(HistoryManager.get_user_history(user_id)) == 1
+        print("✅ Coalesced API requests share one saved decision")
+    finally:
+        (settings.LLM_PROVIDER, settings.FAKE_LLM_TTFT, settings.FAKE_LLM_PER_TOKEN,
+         settings.CHECKPOINTS_ENABLED, settings.COALESCE_ANALYSES,
+         settings.DATABASE_URL, settings.USAGE_LEDGER) = saved
+    
+    return True
+
+
 def test_pdf_export():
     """Test PDF export."""
     print("\n🧪 Testing PDF Export...")
@@ -394,10 +1918,88 @@ def run_all_tests():
     history_success, decision_id = test_history_manager(user_id)
     results['history'] = history_success
     
-    # Test 4: PDF Export
+    # Test 4: Analytics Rollup
+    results['analytics_rollup'] = test_analytics_rollup()
+    
+    # Test 5: Analytics Timeseries
+    results['analytics_timeseries'] = test_analytics_timeseries()
+    
+    # Test 6: Decision Cache
+    results['decision_cache'] = test_decision_cache()
+    
+    # Test 7: Factor Scores
+    results['factor_scores'] = test_factor_scores()
+    
+    # Test 8: Similar Decisions
+    results['similar_decisions'] = test_similar_decisions()
+    
+    # Test 9: Planner Cache
+    results['planner_cache'] = test_planner_cache()
+    
+    # Test 10: Incremental JSON Parser
+    results['incremental_json'] = test_incremental_json_parser()
+    
+    # Test 11: Deadline Fallback
+    results['deadline_fallback'] = test_deadline_fallback()
+    
+    # Test 12: Singleflight
+    results['singleflight'] = test_singleflight()
+    
+    # Test 13: Idempotency Store
+    results['idempotency'] = test_idempotency_store()
+    
+    # Test 14: Rate Limiter
+    results['rate_limiter'] = test_rate_limiter()
+    
+    # Test 15: Adaptive Concurrency
+    results['adaptive_concurrency'] = test_adaptive_concurrency()
+    
+    # Test 16: LLM Scheduler
+    results['llm_scheduler'] = test_llm_scheduler()
+    
+    # Test 17: Fake LLM Provider
+    results['fake_provider'] = test_fake_provider()
+    
+    # Test 18: LLM Cassette
+    results['cassette'] = test_cassette()
+    
+    # Test 19: Usage Ledger
+    results['usage_ledger'] = test_usage_ledger()
+    
+    # Test 20: Prompt Budget
+    results['prompt_budget'] = test_prompt_budget()
+    
+    # Test 21: JSON Repair
+    results['json_repair'] = test_json_repair()
+    
+    # Test 22: Ollama Structured Output
+    results['ollama_structured_output'] = test_ollama_structured_output()
+    
+    # Test 23: Model Warm-up
+    results['model_warmup'] = test_model_warmup()
+    
+    # Test 24: HTTP Pool
+    results['http_pool'] = test_http_pool()
+    
+    # Test 25: Async History Manager
+    results['async_history'] = test_async_history_manager()
+    
+    # Test 26: Scoring Modes
+    results['scoring_modes'] = test_scoring_modes()
+    
+    # Test 27: Quick Mode
+    results['quick_mode'] = test_quick_mode()
+    
+    # Test 28: Checkpoint Resume
+    results['checkpoint_resume'] = test_checkpoint_resume()
+    
+    # Test 29: Analysis Coalescing
+    results['analysis_coalescing'] = test_analysis_coalescing()
+    
+    # Test 30: PDF Export
     results['pdf_export'] = test_pdf_export()
     
-    # Test 5: Chat Assistant
+    # Test 31: Chat Assistant
     results['chat'] = test_chat_assistant()
     
     # Summary